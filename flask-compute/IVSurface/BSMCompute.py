@@ -1,8 +1,18 @@
 # flask-compute/IVSurface/BSMCompute.py
+import os
 import numpy as np
 from math import log, sqrt, exp
 from scipy.stats import norm
-from .DataSourcing import get_risk_free_rate, get_option_data
+from scipy.special import ndtr
+from .DataSourcing import get_risk_free_rate, load_chain
+from .RationalIV import implied_vol_rational
+from progress import report
+import timing
+
+SIGMA_LOWER = 1e-8
+SIGMA_UPPER = 10.0
+# Contracts per vectorized solver call in solve_chain.
+SOLVE_BATCH_ROWS = int(os.getenv("IV_SOLVE_BATCH_ROWS", 10000))
 
 def black_scholes_call(S, K, T, r, sigma):
     if T <= 0 or sigma <= 0:
@@ -56,27 +66,168 @@ def implied_vol_put(market_price, S, K, T, r=0.0, tol=0.01, max_iter=100):
             sigma = 1e-8
     return sigma
 
-def compute_implied_vols(ticker_str, contract_type="calls", start_date=None, end_date=None):
-    r = get_risk_free_rate()
-    data_list, S = get_option_data(ticker_str, contract_type=contract_type, start_date=start_date, end_date=end_date)
-    ivs, mny, ttes = [], [], []
-    for options_df, T in data_list:
-        for _, row in options_df.iterrows():
-            K = row["strike"]
-            bid = row.get("bid", np.nan)
-            ask = row.get("ask", np.nan)
-            market_price = 0.5 * (bid + ask) if not (np.isnan(bid) or np.isnan(ask)) else row.get("lastPrice", np.nan)
-            if np.isnan(market_price):
-                continue
-            if contract_type == "calls":
-                iv = implied_vol_call(market_price, S, K, T, r=r)
-                money = S / K
+def black_scholes_batch(S, K, T, r, sigma, is_call):
+    """
+    Vectorized Black-Scholes price and vega over arrays of contracts.
+    Returns a tuple: (price, vega, d1, d2)
+    """
+    theta = np.where(is_call, 1.0, -1.0)
+    sqrt_T = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt_T)
+    d2 = d1 - sigma * sqrt_T
+    price = theta * (S * ndtr(theta * d1) - K * np.exp(-r * T) * ndtr(theta * d2))
+    vega = S * np.exp(-0.5 * d1**2) / np.sqrt(2 * np.pi) * sqrt_T
+    return price, vega, d1, d2
+
+def no_arbitrage_mask(market_price, S, K, T, r, is_call):
+    """
+    True where a price lies strictly inside the Black-Scholes no-arbitrage
+    bounds (intrinsic value < price < S for calls, < discounted K for puts).
+    """
+    discounted_K = K * np.exp(-r * T)
+    intrinsic = np.where(is_call, np.maximum(S - discounted_K, 0.0), np.maximum(discounted_K - S, 0.0))
+    upper = np.where(is_call, S, discounted_K)
+    with np.errstate(invalid="ignore"):
+        return (
+            np.isfinite(market_price) & (T > 0) & (S > 0) & (K > 0)
+            & (market_price > intrinsic) & (market_price < upper)
+        )
+
+def implied_vol_batch(market_price, S, K, T, r=0.0, is_call=True, tol=1e-8, max_iter=100, return_d=False):
+    """
+    Solve implied volatility for a whole chain at once.
+    Each element runs a safeguarded Newton iteration: the price is monotone in
+    sigma, so every step tightens a [lo, hi] bracket and any Newton step that
+    leaves it falls back to bisection. Converged elements are masked out of
+    later passes. Prices outside the no-arbitrage bounds, and elements that do
+    not converge, are returned as NaN.
+    With `return_d`, the d1/d2 of each converged sigma are kept as well.
+    Returns ivs, or a tuple: (ivs, d1, d2)
+    """
+    market_price, S, K, T, r, is_call = np.broadcast_arrays(
+        np.asarray(market_price, dtype=float), np.asarray(S, dtype=float),
+        np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+        np.asarray(r, dtype=float), np.asarray(is_call, dtype=bool)
+    )
+    ivs = np.full(market_price.shape, np.nan)
+    idx = np.flatnonzero(no_arbitrage_mask(market_price, S, K, T, r, is_call))
+    price, S, K, T, r, is_call = (a.ravel()[idx] for a in (market_price, S, K, T, r, is_call))
+    sigma = np.full(idx.size, 0.3)
+    lo = np.full(idx.size, SIGMA_LOWER)
+    hi = np.full(idx.size, SIGMA_UPPER)
+    flat_ivs = ivs.reshape(-1)
+    if return_d:
+        d1s, d2s = np.full(ivs.shape, np.nan), np.full(ivs.shape, np.nan)
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        price_guess, vega, d1, d2 = black_scholes_batch(S, K, T, r, sigma, is_call)
+        diff = price_guess - price
+        done = (np.abs(diff) < tol) | (hi - lo < 1e-12)
+        flat_ivs[idx[done]] = sigma[done]
+        if return_d:
+            d1s.reshape(-1)[idx[done]] = d1[done]
+            d2s.reshape(-1)[idx[done]] = d2[done]
+        hi = np.where(diff > 0, sigma, hi)
+        lo = np.where(diff < 0, sigma, lo)
+        with np.errstate(all="ignore"):
+            step = sigma - diff / vega
+        bisect = ~np.isfinite(step) | (step <= lo) | (step >= hi)
+        sigma = np.where(bisect, 0.5 * (lo + hi), step)
+        keep = ~done
+        idx, price, S, K, T, r, is_call, sigma, lo, hi = (
+            a[keep] for a in (idx, price, S, K, T, r, is_call, sigma, lo, hi)
+        )
+    if return_d:
+        return ivs, d1s, d2s
+    return ivs
+
+GREEKS = ("delta", "gamma", "vega", "theta", "rho", "vanna", "volga", "charm")
+
+def bsm_greeks(S, K, T, r, sigma, is_call, d1=None, d2=None):
+    """
+    First- and second-order Black-Scholes Greeks over arrays of contracts in
+    one vectorized pass. Pass the d1/d2 of a converged IV solve to skip
+    recomputing them. Theta and charm are per year; vega, rho, vanna and
+    volga are per unit of vol or rate.
+    Returns a dict of arrays keyed by GREEKS
+    """
+    sqrt_T = np.sqrt(T)
+    if d1 is None or d2 is None:
+        d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * sqrt_T)
+        d2 = d1 - sigma * sqrt_T
+    sign = np.where(is_call, 1.0, -1.0)
+    pdf = np.exp(-0.5 * d1**2) / np.sqrt(2 * np.pi)
+    discounted_K = K * np.exp(-r * T)
+    nd2 = ndtr(sign * d2)
+    vega = S * pdf * sqrt_T
+    return {
+        "delta": sign * ndtr(sign * d1),
+        "gamma": pdf / (S * sigma * sqrt_T),
+        "vega": vega,
+        "theta": -S * pdf * sigma / (2 * sqrt_T) - sign * r * discounted_K * nd2,
+        "rho": sign * T * discounted_K * nd2,
+        "vanna": -pdf * d2 / sigma,
+        "volga": vega * d1 * d2 / sigma,
+        "charm": -pdf * (2 * r * T - d2 * sigma * sqrt_T) / (2 * T * sigma * sqrt_T),
+    }
+
+IV_SOLVERS = {
+    "newton": implied_vol_batch,
+    "rational": implied_vol_rational,
+}
+
+def solve_chain(chain, r, solver="newton", batch_rows=SOLVE_BATCH_ROWS, greeks=False):
+    """
+    Implied vols for every contract of a ChainArrays, solved in vectorized
+    batches of whole expiries of about `batch_rows` contracts so progress
+    can be reported between them. With `greeks`, bsm_greeks of the solved
+    contracts are computed from the d1/d2 the Newton solve converged on.
+    Returns a tuple of arrays for the solved contracts: (ivs, moneyness, time-to-expiry, is_call),
+    plus a dict of Greek arrays when `greeks` is set
+    """
+    if solver not in IV_SOLVERS:
+        raise ValueError(f"solver must be one of {sorted(IV_SOLVERS)}.")
+    if len(chain) == 0:
+        empty = (np.array([]), np.array([]), np.array([]), np.array([], dtype=bool))
+        return empty + ({name: np.array([]) for name in GREEKS},) if greeks else empty
+    order = np.argsort(chain.T, kind="stable")
+    expiry_starts = np.flatnonzero(np.diff(chain.T[order], prepend=np.nan) != 0)
+    cuts = [0]
+    for start in expiry_starts[1:]:
+        if start - cuts[-1] >= batch_rows:
+            cuts.append(start)
+    cuts.append(len(order))
+    price = chain.market_price()
+    # Spot and rate may be scalars or per-contract arrays.
+    spot, r = np.asarray(chain.spot, dtype=float), np.asarray(r, dtype=float)
+    ivs = np.empty(len(chain))
+    keep_d = greeks and solver == "newton"
+    if keep_d:
+        d1, d2 = np.empty(len(chain)), np.empty(len(chain))
+    with timing.span("solve"):
+        for lo, hi in zip(cuts[:-1], cuts[1:]):
+            rows = order[lo:hi]
+            args = (price[rows], spot[rows] if spot.ndim else spot, chain.strike[rows], chain.T[rows])
+            kwargs = dict(r=r[rows] if r.ndim else r, is_call=chain.is_call[rows])
+            if keep_d:
+                ivs[rows], d1[rows], d2[rows] = implied_vol_batch(*args, return_d=True, **kwargs)
             else:
-                iv = implied_vol_put(market_price, S, K, T, r=r)
-                money = K / S
-            if np.isnan(iv):
-                continue
-            ivs.append(iv)
-            mny.append(money)
-            ttes.append(T)
-    return ivs, mny, ttes
+                ivs[rows] = IV_SOLVERS[solver](*args, **kwargs)
+            report("solving", int(np.searchsorted(expiry_starts, hi)), len(expiry_starts))
+    solved = ~np.isnan(ivs)
+    points = ivs[solved], chain.moneyness()[solved], chain.T[solved], chain.is_call[solved]
+    if not greeks:
+        return points
+    with timing.span("greeks"):
+        values = bsm_greeks(spot[solved] if spot.ndim else spot, chain.strike[solved], chain.T[solved],
+                            r[solved] if r.ndim else r, ivs[solved], chain.is_call[solved],
+                            d1[solved] if keep_d else None, d2[solved] if keep_d else None)
+    return points + (values,)
+
+def compute_implied_vols(ticker_str, contract_type="calls", start_date=None, end_date=None, solver="newton"):
+    if solver not in IV_SOLVERS:
+        raise ValueError(f"solver must be one of {sorted(IV_SOLVERS)}.")
+    chain = load_chain(ticker_str, start_date, end_date, contract_types=(contract_type,))
+    ivs, mny, T, _ = solve_chain(chain, get_risk_free_rate(chain.T), solver=solver)
+    return ivs, mny, T
@@ -0,0 +1,177 @@
+from datetime import datetime, date, timedelta
+import os
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import select, cast, Float, delete, func
+
+from db import engine, OptionData, UnderlyingData
+from .DataSourcing import ChainArrays, _stream_arrays
+from progress import report
+import timing
+
+OPTION_ARCHIVE_DIR = os.getenv("OPTION_ARCHIVE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pandera", "options"))
+# Files are sorted by expiry then strike, so row groups this size carry
+# narrow expiry/strike min-max statistics for the reader to skip on.
+ARCHIVE_ROW_GROUP_ROWS = int(os.getenv("OPTION_ARCHIVE_ROW_GROUP_ROWS", 16384))
+# Snapshots older than this many days are deleted from option_data once
+# archived; 0 keeps every row in the database.
+OPTION_DB_RETENTION_DAYS = int(os.getenv("OPTION_DB_RETENTION_DAYS", 0))
+
+PARTITIONING = ds.partitioning(pa.schema([("ticker", pa.string()), ("fetch_date", pa.date32())]), flavor="hive")
+SCHEMA = pa.schema([
+    ("expiration_date", pa.date32()),
+    ("is_call", pa.bool_()),
+    ("strike", pa.float64()),
+    ("bid", pa.float64()),
+    ("ask", pa.float64()),
+    ("last_price", pa.float64()),
+    ("spot", pa.float64()),
+])
+# Given up front so opening the dataset only lists partition directories.
+DATASET_SCHEMA = pa.schema(list(SCHEMA) + list(PARTITIONING.schema))
+
+
+def _day(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    return value.date() if isinstance(value, datetime) else value
+
+def partition_path(ticker, fetch_date, root=OPTION_ARCHIVE_DIR):
+    return os.path.join(root, f"ticker={ticker}", f"fetch_date={_day(fetch_date):%Y-%m-%d}")
+
+def archived_days(ticker, root=OPTION_ARCHIVE_DIR):
+    """
+    Sorted fetch dates archived for `ticker`, from the partition directory
+    names alone.
+    """
+    base = os.path.join(root, f"ticker={ticker}")
+    if not os.path.isdir(base):
+        return []
+    return sorted(_day(name.split("=", 1)[1]) for name in os.listdir(base)
+                  if name.startswith("fetch_date=") and os.path.exists(os.path.join(base, name, "part-0.parquet")))
+
+def archive_day(ticker, fetch_date, root=OPTION_ARCHIVE_DIR):
+    """
+    Write the `ticker` chain fetched on `fetch_date` to its Parquet
+    partition, replacing any earlier copy. Returns the number of rows.
+    """
+    day = _day(fetch_date)
+    day_start = datetime.combine(day, datetime.min.time())
+    spot = select(cast(UnderlyingData.close, Float)).where(
+        UnderlyingData.ticker == ticker, UnderlyingData.date <= day
+    ).order_by(UnderlyingData.date.desc()).limit(1).scalar_subquery()
+    stmt = select(
+        OptionData.expiration_date,
+        OptionData.option_type == "calls",
+        cast(OptionData.strike, Float),
+        cast(OptionData.bid, Float),
+        cast(OptionData.ask, Float),
+        cast(OptionData.last_price, Float),
+        spot,
+    ).where(
+        OptionData.ticker == ticker,
+        OptionData.fetch_date >= day_start,
+        OptionData.fetch_date < day_start + timedelta(days=1),
+    )
+    columns = _stream_arrays(stmt, ["datetime64[D]", bool, float, float, float, float, float])
+    if len(columns[0]) == 0:
+        return 0
+    order = np.lexsort((columns[2], columns[0]))
+    table = pa.Table.from_arrays([pa.array(column[order]) for column in columns], schema=SCHEMA)
+    path = partition_path(ticker, day, root)
+    os.makedirs(path, exist_ok=True)
+    # Dot-prefixed, so dataset discovery skips it while it is written.
+    tmp_path = os.path.join(path, f".part-0.parquet.{os.getpid()}.tmp")
+    try:
+        pq.write_table(table, tmp_path, row_group_size=ARCHIVE_ROW_GROUP_ROWS, compression="zstd")
+        os.replace(tmp_path, os.path.join(path, "part-0.parquet"))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return table.num_rows
+
+def archive_option_data(tickers=None, root=OPTION_ARCHIVE_DIR, retention_days=OPTION_DB_RETENTION_DAYS):
+    """
+    Archive stage run by daily_update: every stored snapshot not yet in the
+    archive, plus today's (which may have grown since it was last written).
+    Then prunes archived snapshots past `retention_days` from option_data.
+    """
+    today = date.today()
+    stmt = select(OptionData.ticker, func.date(OptionData.fetch_date)).distinct()
+    if tickers is not None:
+        stmt = stmt.where(OptionData.ticker.in_(tickers))
+    with engine.connect() as conn:
+        snapshots = sorted((ticker, _day(day)) for ticker, day in conn.execute(stmt))
+    archived = {}
+    for done, (ticker, day) in enumerate(snapshots, 1):
+        if ticker not in archived:
+            archived[ticker] = set(archived_days(ticker, root))
+        if day not in archived[ticker] or day == today:
+            count = archive_day(ticker, day, root)
+            print(f"Archived {count} option rows for {ticker} on {day}")
+        report("archiving", done, len(snapshots))
+    if retention_days > 0:
+        prune_option_data(today - timedelta(days=retention_days), root)
+
+def prune_option_data(before, root=OPTION_ARCHIVE_DIR):
+    """
+    Delete option_data snapshots fetched before `before` whose day is
+    already archived. Returns the number of rows deleted.
+    """
+    with engine.connect() as conn:
+        tickers = [ticker for (ticker,) in conn.execute(select(OptionData.ticker).distinct())]
+    deleted = 0
+    with engine.begin() as conn:
+        for ticker in tickers:
+            for day in archived_days(ticker, root):
+                if day >= before:
+                    break
+                day_start = datetime.combine(day, datetime.min.time())
+                deleted += conn.execute(delete(OptionData).where(
+                    OptionData.ticker == ticker,
+                    OptionData.fetch_date >= day_start,
+                    OptionData.fetch_date < day_start + timedelta(days=1),
+                )).rowcount
+    return deleted
+
+def load_archived_chain(ticker, as_of, start_date=None, end_date=None, contract_types=("calls", "puts"),
+                        root=OPTION_ARCHIVE_DIR):
+    """
+    The chain of `ticker` as it stood on `as_of`: the latest archived
+    snapshot on or before that day, with contracts unexpired at the time
+    and times to expiry measured from it. Only that partition's file is
+    opened, and expiry/type predicates are pushed down to the row-group
+    statistics.
+    Returns a ChainArrays
+    """
+    as_of = _day(as_of)
+    days = [day for day in archived_days(ticker, root) if day <= as_of]
+    if not days:
+        raise ValueError(f"No archived option data for {ticker} on or before {as_of}.")
+    predicate = ds.field("expiration_date") > as_of
+    if start_date:
+        predicate &= ds.field("expiration_date") >= _day(start_date)
+    if end_date:
+        predicate &= ds.field("expiration_date") <= _day(end_date)
+    if len(contract_types) == 1:
+        predicate &= ds.field("is_call") == (contract_types[0] == "calls")
+    with timing.span("read"):
+        path = os.path.join(partition_path(ticker, days[-1], root), "part-0.parquet")
+        dataset = ds.dataset(path, schema=SCHEMA, format="parquet")
+        table = dataset.to_table(columns=list(SCHEMA.names), filter=predicate)
+    with timing.span("convert"):
+        columns = {name: table.column(name).to_numpy() for name in SCHEMA.names}
+        expiration = columns["expiration_date"].astype("datetime64[D]")
+    return ChainArrays(
+        ticker=ticker,
+        spot=float(columns["spot"][0]) if table.num_rows else float("nan"),
+        expiration=expiration,
+        T=(expiration - np.datetime64(as_of, "D")).astype(float) / 365.0,
+        strike=columns["strike"],
+        bid=columns["bid"],
+        ask=columns["ask"],
+        last=columns["last_price"],
+        is_call=columns["is_call"],
+    )
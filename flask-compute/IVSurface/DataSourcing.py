@@ -1,63 +1,161 @@
-from datetime import datetime
-import pandas as pd
+from dataclasses import dataclass
+from datetime import datetime, date
+import numpy as np
 import os
 import sys
+import time
+from sqlalchemy import select, cast, func, Float
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
-from db import SessionLocal, OptionData, UnderlyingData, YieldData
+from db import read_connection, read_session, OptionData, UnderlyingData, YieldData
+from .RateCurve import get_rate_curve
+import timing
+
+OPTION_CHUNK_ROWS = int(os.getenv('OPTION_CHUNK_ROWS', 50000))
 
 
 def get_underlying_price(ticker):
-    session = SessionLocal()
-    record = session.query(UnderlyingData).filter(UnderlyingData.ticker == ticker).order_by(UnderlyingData.date.desc()).first()
-    session.close()
+    with read_session() as session:
+        record = session.query(UnderlyingData).filter(UnderlyingData.ticker == ticker).order_by(UnderlyingData.date.desc()).first()
     if record:
         return float(record.close)
     else:
         raise ValueError("No underlying price data available.")
 
-def get_option_data(ticker, contract_type="calls", start_date=None, end_date=None):
+def latest_fetch_date(ticker):
+    """
+    Scalar subquery for the newest fetch_date of `ticker`. daily_update
+    keeps one snapshot per contract per day, so readers filter on it to
+    see each contract once.
+    """
+    return select(func.max(OptionData.fetch_date)).where(OptionData.ticker == ticker).scalar_subquery()
+
+def _stream_arrays(stmt, dtypes):
+    """
+    Run `stmt` and return one array per selected column, converting each
+    OPTION_CHUNK_ROWS partition as it arrives. NULLs become NaN in float
+    columns.
+    """
+    chunks = []
+    started = time.perf_counter()
+    with read_connection() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=OPTION_CHUNK_ROWS).execute(stmt)
+        for rows in result.partitions():
+            # Fetching and converting interleave; time them separately.
+            timing.add("db", time.perf_counter() - started)
+            with timing.span("convert"):
+                chunks.append([_to_array(col, dtype) for col, dtype in zip(zip(*rows), dtypes)])
+            started = time.perf_counter()
+    timing.add("db", time.perf_counter() - started)
+    if not chunks:
+        return [np.array([], dtype=dtype) for dtype in dtypes]
+    return [np.concatenate(parts) for parts in zip(*chunks)]
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _to_array(values, dtype):
+    if dtype == "datetime64[D]":
+        # Much faster than letting NumPy parse each date object.
+        days = np.fromiter(map(date.toordinal, values), dtype=np.int64, count=len(values))
+        return (days - _EPOCH_ORDINAL).astype("datetime64[D]")
+    return np.array(values, dtype=dtype)
+
+@dataclass
+class ChainArrays:
+    """
+    Calls and puts of one ticker as parallel arrays, plus the spot they
+    are priced against.
+    """
+    ticker: str
+    spot: float
+    expiration: np.ndarray  # datetime64[D]
+    T: np.ndarray  # years to expiry
+    strike: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    last: np.ndarray
+    is_call: np.ndarray
+
+    def __len__(self):
+        return len(self.strike)
+
+    def market_price(self):
+        """
+        Bid/ask mid, or the last trade where either side is missing.
+        """
+        return np.where(np.isnan(self.bid) | np.isnan(self.ask), self.last, 0.5 * (self.bid + self.ask))
+
+    def moneyness(self):
+        """
+        S/K for calls and K/S for puts.
+        """
+        return np.where(self.is_call, self.spot / self.strike, self.strike / self.spot)
+
+def chain_query(ticker, start_date=None, end_date=None, contract_types=("calls", "puts"), today=None):
     """
-    Retrieve option data from the database.
-    Returns a tuple: (list of (DataFrame, time-to-expiry), underlying price S)
+    The load_chain statement: spot close, expiry, is-call flag, strike,
+    bid, ask and last of the unexpired contracts in `ticker`'s latest
+    snapshot.
     """
-    session = SessionLocal()
-    query = session.query(OptionData).filter(OptionData.ticker == ticker, OptionData.option_type == contract_type)
+    today = today or datetime.now().date()
+    spot = select(cast(UnderlyingData.close, Float)).where(
+        UnderlyingData.ticker == ticker
+    ).order_by(UnderlyingData.date.desc()).limit(1).scalar_subquery()
+    stmt = select(
+        spot,
+        OptionData.expiration_date,
+        OptionData.option_type == "calls",
+        cast(OptionData.strike, Float),
+        cast(OptionData.bid, Float),
+        cast(OptionData.ask, Float),
+        cast(OptionData.last_price, Float),
+    ).where(
+        OptionData.ticker == ticker,
+        OptionData.fetch_date == latest_fetch_date(ticker),
+        OptionData.option_type.in_(contract_types),
+        OptionData.expiration_date > today,
+    )
     if start_date:
-        start_date_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-        query = query.filter(OptionData.expiration_date >= start_date_obj)
+        stmt = stmt.where(OptionData.expiration_date >= datetime.strptime(start_date, "%Y-%m-%d").date())
     if end_date:
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-        query = query.filter(OptionData.expiration_date <= end_date_obj)
-    records = query.all()
-    session.close()
-    # Group records by expiration date
-    data_dict = {}
-    for rec in records:
-        exp_date = rec.expiration_date
-        data_dict.setdefault(exp_date, []).append({
-            "strike": float(rec.strike),
-            "bid": float(rec.bid),
-            "ask": float(rec.ask),
-            "lastPrice": float(rec.last_price)
-        })
-    data_list = []
-    now = datetime.now()
-    for exp_date, recs in data_dict.items():
-        T = (exp_date - now.date()).days / 365.0
-        if T <= 0:
-            continue
-        df = pd.DataFrame(recs)
-        data_list.append((df, T))
-    S = get_underlying_price(ticker)
-    return data_list, S
-
-def get_risk_free_rate():
-    """
-    Retrieve the risk-free rate from yield data (using 3-Month T-bill data)
-    """
-    return 0.042
+        stmt = stmt.where(OptionData.expiration_date <= datetime.strptime(end_date, "%Y-%m-%d").date())
+    return stmt
+
+def load_chain(ticker, start_date=None, end_date=None, contract_types=("calls", "puts")):
+    """
+    Unexpired calls and puts of `ticker` from its latest snapshot, with the
+    latest spot close as a scalar subquery, fetched in one statement on one
+    connection.
+    Returns a ChainArrays
+    """
+    today = datetime.now().date()
+    stmt = chain_query(ticker, start_date, end_date, contract_types, today)
+    spots, expiration, is_call, strike, bid, ask, last = _stream_arrays(
+        stmt, [float, "datetime64[D]", bool, float, float, float, float]
+    )
+    if len(spots) and np.isnan(spots[0]):
+        raise ValueError("No underlying price data available.")
+    return ChainArrays(
+        ticker=ticker,
+        spot=float(spots[0]) if len(spots) else float("nan"),
+        expiration=expiration,
+        T=(expiration - np.datetime64(today, "D")).astype(float) / 365.0,
+        strike=strike,
+        bid=bid,
+        ask=ask,
+        last=last,
+        is_call=is_call,
+    )
+
+def get_risk_free_rate(T=0.25):
+    """
+    Risk-free rate for time(s) to expiry `T` in years from the cached
+    Treasury term structure; the 3-month rate by default.
+    Returns a float for scalar `T`, else an array shaped like it
+    """
+    rates = get_rate_curve()(T)
+    return float(rates) if np.ndim(T) == 0 else rates
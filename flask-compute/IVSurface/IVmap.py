@@ -1,30 +1,77 @@
+import logging
+import os
 import numpy as np
-from scipy.interpolate import griddata
 import plotly.graph_objs as go
-from .BSMCompute import compute_implied_vols
+from .BSMCompute import solve_chain
+from .DataSourcing import load_chain, get_risk_free_rate
+from .SurfaceFit import SURFACE_FIT, fit_surface
+from progress import report
+import timing
 
-def generate_iv_surface_html(ticker_symbol, start_date, end_date):
-    print(f"Generating IV Surface for {ticker_symbol}")
-    ivs_calls, mny_calls, ttes_calls = compute_implied_vols(ticker_symbol, "calls", start_date, end_date)
-    ivs_puts, mny_puts, ttes_puts = compute_implied_vols(ticker_symbol, "puts", start_date, end_date)
-    ivs = np.array(ivs_calls + ivs_puts)
-    mny = np.array(mny_calls + mny_puts)
-    ttes = np.array(ttes_calls + ttes_puts)
+GRID_SIZE = int(os.getenv("IV_GRID_SIZE", 50))
+MAX_GRID_SIZE = 200
+# The smile fit models total variance, so Greeks use the generic fits; the
+# triangulation of a chain is shared by all of its Greek surfaces.
+GREEK_SURFACE_FITS = ("delaunay", "griddata")
+GREEK_SURFACE_FIT = os.getenv("GREEK_SURFACE_FIT", "delaunay")
 
-    if len(ivs) == 0:
-        return f"<p>No option data found for {ticker_symbol} with the chosen parameters.</p>"
+logger = logging.getLogger(__name__)
 
+def parse_grid_size(value=None):
+    """
+    The "Grid Size" parameter as an int in [2, MAX_GRID_SIZE]; GRID_SIZE
+    when it is not given.
+    """
+    if value is None or value == "":
+        return GRID_SIZE
+    try:
+        size = value if isinstance(value, int) and not isinstance(value, bool) else int(str(value).strip())
+    except ValueError:
+        size = None
+    if size is None or not 2 <= size <= MAX_GRID_SIZE:
+        raise ValueError(f"Grid Size must be an integer from 2 to {MAX_GRID_SIZE}.")
+    return size
+
+def compute_surface_points(ticker_symbol, start_date=None, end_date=None, solver="newton", greeks=False, as_of=None):
+    """
+    Implied vols for calls and puts of a ticker, and with `greeks` their
+    Greeks from the same solve. With `as_of`, the chain is read from the
+    Parquet archive as it stood on that day instead of from the database,
+    and priced with the Treasury curve of that day.
+    Returns a tuple of arrays: (ivs, moneyness, time-to-expiry, is_call),
+    plus a dict of Greek arrays when `greeks` is set
+    """
+    report("loading chain")
+    if as_of:
+        from .ChainArchive import load_archived_chain, _day
+        from .RateCurve import load_rate_curve
+        chain = load_archived_chain(ticker_symbol, as_of, start_date, end_date)
+        rates = load_rate_curve(as_of=_day(as_of))(chain.T)
+    else:
+        chain = load_chain(ticker_symbol, start_date, end_date)
+        rates = get_risk_free_rate(chain.T)
+    solved = solve_chain(chain, rates, solver=solver, greeks=greeks)
+    mny = solved[1]
     mask = (mny >= -7) & (mny <= 7)
-    ivs, mny, ttes = ivs[mask], mny[mask], ttes[mask]
-    if len(ivs) == 0:
-        return f"<p>After filtering, no data remains for {ticker_symbol}.</p>"
+    points = tuple(a[mask] for a in solved[:4])
+    if greeks:
+        return points + ({name: values[mask] for name, values in solved[4].items()},)
+    return points
 
+def grid_surface(ivs, mny, ttes, size=GRID_SIZE, method=SURFACE_FIT, is_call=None):
+    """
+    Interpolate scattered (moneyness, tte, iv) points onto a size x size grid
+    with one of SurfaceFit.SURFACE_FITS.
+    """
     grid_mny, grid_ttes = np.meshgrid(
-        np.linspace(min(mny), max(mny), 50),
-        np.linspace(min(ttes), max(ttes), 50)
+        np.linspace(min(mny), max(mny), size),
+        np.linspace(min(ttes), max(ttes), size)
     )
-    grid_ivs = griddata((mny, ttes), ivs, (grid_mny, grid_ttes), method='cubic')
+    with timing.span("interpolate"):
+        grid_ivs = fit_surface(ivs, mny, ttes, grid_mny, grid_ttes, method=method, is_call=is_call)
+    return grid_mny, grid_ttes, grid_ivs
 
+def surface_figure_json(ticker_symbol, grid_mny, grid_ttes, grid_ivs, quantity="Implied Volatility"):
     surface = go.Surface(
         x=grid_mny,
         y=grid_ttes,
@@ -32,12 +79,69 @@ def generate_iv_surface_html(ticker_symbol, start_date, end_date):
         colorscale='Viridis'
     )
     layout = go.Layout(
-        title=f"Implied Volatility Surface for {ticker_symbol}",
+        title=f"{quantity} Surface for {ticker_symbol}",
         scene=dict(
             xaxis_title="Moneyness (S/K or K/S)",
             yaxis_title="Time to Expiry (Years)",
-            zaxis_title="Implied Volatility"
+            zaxis_title=quantity
         )
     )
-    fig = go.Figure(data=[surface], layout=layout)
-    return fig.to_json()
+    with timing.span("serialize"):
+        fig = go.Figure(data=[surface], layout=layout)
+        return fig.to_json()
+
+def generate_iv_surface_html(ticker_symbol, start_date, end_date, solver="newton", fit=None, grid_size=None,
+                             as_of=None):
+    logger.info("Generating IV surface for %s", ticker_symbol)
+    from .SurfaceStore import load_materialized_surface
+    fit = fit or SURFACE_FIT
+    grid_size = parse_grid_size(grid_size)
+    materialized = load_materialized_surface(ticker_symbol) if solver == "newton" and not as_of else None
+    if materialized is not None:
+        default_grid = fit == SURFACE_FIT and grid_size == GRID_SIZE
+        if not (start_date or end_date) and default_grid and materialized.grid is not None:
+            return surface_figure_json(ticker_symbol, *materialized.grid)
+        ivs, mny, ttes, is_call = materialized.slice(start_date, end_date)
+    else:
+        ivs, mny, ttes, is_call = compute_surface_points(ticker_symbol, start_date, end_date, solver=solver, as_of=as_of)
+
+    if len(ivs) == 0:
+        return f"<p>No option data found for {ticker_symbol} with the chosen parameters.</p>"
+
+    report("fitting surface")
+    grid = grid_surface(ivs, mny, ttes, size=grid_size, method=fit, is_call=is_call)
+    report("rendering")
+    return surface_figure_json(ticker_symbol if not as_of else f"{ticker_symbol} as of {as_of}", *grid)
+
+def generate_greek_surface_html(ticker_symbol, greek, start_date, end_date, contract_type="calls", solver="newton",
+                                fit=None, grid_size=None):
+    """
+    Surface of one BSMCompute.GREEKS value for the calls or the puts of a
+    ticker. Uses the Greeks materialized with the IV points when they are
+    current, and otherwise solves the chain once for IVs and Greeks.
+    """
+    logger.info("Generating %s surface for %s", greek, ticker_symbol)
+    from .SurfaceStore import load_materialized_surface
+    if contract_type not in ("calls", "puts"):
+        raise ValueError("contract type must be 'calls' or 'puts'.")
+    fit = fit or GREEK_SURFACE_FIT
+    if fit not in GREEK_SURFACE_FITS:
+        raise ValueError(f"Greek surface fit must be one of {sorted(GREEK_SURFACE_FITS)}.")
+    grid_size = parse_grid_size(grid_size)
+    is_call = contract_type == "calls"
+    materialized = load_materialized_surface(ticker_symbol) if solver == "newton" else None
+    if materialized is not None and materialized.greeks is not None:
+        values, mny, ttes = materialized.slice_greek(greek, start_date, end_date, is_call)
+    else:
+        _, mny, ttes, calls, greeks = compute_surface_points(ticker_symbol, start_date, end_date, solver=solver,
+                                                             greeks=True)
+        rows = calls == is_call
+        values, mny, ttes = greeks[greek][rows], mny[rows], ttes[rows]
+
+    if len(values) == 0:
+        return f"<p>No option data found for {ticker_symbol} with the chosen parameters.</p>"
+
+    report("fitting surface")
+    grid = grid_surface(values, mny, ttes, size=grid_size, method=fit)
+    report("rendering")
+    return surface_figure_json(ticker_symbol, *grid, quantity=f"{greek.capitalize()} ({contract_type})")
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+import numpy as np
+from scipy.interpolate import PchipInterpolator
+from sqlalchemy import select, func, cast, Float
+
+from db import read_connection, YieldData, get_data_version
+from YieldCurve.data import parse_maturity
+import timing
+
+# Rate used for every expiry while no Treasury yields are stored.
+DEFAULT_RATE = float(os.getenv("RISK_FREE_RATE", 0.042))
+# Seconds a loaded curve is served before the yield data version is checked
+# again. Worker processes pick up new yields within this window; the process
+# that ingests them calls invalidate_rate_curve() instead of waiting.
+RATE_CURVE_TTL = float(os.getenv("RATE_CURVE_TTL", 60))
+
+
+class RateCurve:
+    """
+    Continuously compounded risk-free rates by maturity in years, PCHIP
+    interpolated (monotone between tenors, no overshoot) and flat beyond
+    the shortest and longest one.
+    """
+    def __init__(self, maturities, rates, version=None):
+        order = np.argsort(maturities)
+        self.maturities = np.asarray(maturities, dtype=float)[order]
+        self.rates = np.asarray(rates, dtype=float)[order]
+        self.version = version
+        self._pchip = PchipInterpolator(self.maturities, self.rates) if len(self.maturities) > 1 else None
+
+    def __call__(self, T):
+        """
+        r(T) for a scalar or an array of times to expiry, evaluated once per
+        distinct expiry.
+        """
+        T = np.asarray(T, dtype=float)
+        if len(self.rates) == 0:
+            return np.full(T.shape, DEFAULT_RATE)
+        if self._pchip is None:
+            return np.full(T.shape, self.rates[0])
+        expiries, inverse = np.unique(T, return_inverse=True)
+        rates = self._pchip(np.clip(expiries, self.maturities[0], self.maturities[-1]))
+        return rates[inverse].reshape(T.shape)
+
+def load_rate_curve(version=None, as_of=None):
+    """
+    Curve through the latest close of every stored Treasury series, or the
+    latest on or before the date `as_of`. Yields are stored in percent on a
+    bond-equivalent (semi-annual) basis and are converted to continuous
+    compounding for Black-Scholes.
+    """
+    latest = select(YieldData.ticker, func.max(YieldData.date).label("date"))
+    if as_of is not None:
+        latest = latest.where(YieldData.date <= as_of)
+    latest = latest.group_by(YieldData.ticker).subquery()
+    stmt = select(YieldData.label, cast(YieldData.close, Float)).join(
+        latest, (YieldData.ticker == latest.c.ticker) & (YieldData.date == latest.c.date)
+    )
+    with timing.span("db"):
+        with read_connection() as conn:
+            rows = conn.execute(stmt).all()
+    maturities, rates = [], []
+    for label, close in rows:
+        months = parse_maturity(label)
+        if isinstance(months, int) and close is not None:
+            maturities.append(months / 12.0)
+            rates.append(2.0 * np.log1p(close / 200.0))
+    return RateCurve(maturities, rates, version)
+
+_state = {"curve": None, "checked": float("-inf")}
+_lock = threading.Lock()
+
+def get_rate_curve(clock=time.monotonic):
+    """
+    The process-wide curve, reloaded only when the yield data version has
+    changed, which is checked at most once per RATE_CURVE_TTL.
+    """
+    with _lock:
+        now = clock()
+        curve = _state["curve"]
+        if curve is not None and now - _state["checked"] < RATE_CURVE_TTL:
+            return curve
+        version = get_data_version(None)
+        if curve is None or curve.version != version:
+            curve = _state["curve"] = load_rate_curve(version)
+        _state["checked"] = now
+        return curve
+
+def invalidate_rate_curve():
+    """
+    Check the yield data version on the next get_rate_curve() call.
+    """
+    with _lock:
+        _state["checked"] = float("-inf")
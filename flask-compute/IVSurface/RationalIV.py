@@ -0,0 +1,200 @@
+# flask-compute/IVSurface/RationalIV.py
+"""
+Closed-form-initialized implied volatility solver, following the structure of
+Jäckel's "Let's Be Rational" (2015).
+
+Prices are normalized to the out-of-the-money Black call b(x, s) with
+x = ln(F/K) <= 0 and s = sigma * sqrt(T). The range of b is split into four
+branches around the inflection point s_c = sqrt(2|x|); each branch has a
+rational cubic initial guess that is within about 1% of the root (10% in the
+far lower wing). Two third-order Householder steps on a branch-specific
+objective then take the guess to machine precision.
+"""
+import numpy as np
+from scipy.special import erf, erfcx, erfinv, ndtr, ndtri
+
+SQRT_2 = np.sqrt(2.0)
+SQRT_3 = np.sqrt(3.0)
+SQRT_2PI = np.sqrt(2.0 * np.pi)
+LOWER_MAP_SCALE = 2.0 * np.pi / (3.0 * SQRT_3)
+
+def normalized_black(x, s):
+    """
+    Normalized Black call price for x <= 0. Uses the scaled complementary
+    error function in the lower wing, where the direct formula cancels.
+    """
+    x, s = np.broadcast_arrays(x, s)
+    b = np.empty(x.shape)
+    with np.errstate(all="ignore"):
+        d1 = x / s + 0.5 * s
+        d2 = x / s - 0.5 * s
+        tail = d1 < -1
+        xt, st = x[tail], s[tail]
+        b[tail] = 0.5 * np.exp(-0.5 * (xt * xt / (st * st) + 0.25 * st * st)) * (
+            erfcx(-d1[tail] / SQRT_2) - erfcx(-d2[tail] / SQRT_2)
+        )
+        direct = ~tail
+        xd = x[direct]
+        b[direct] = 0.5 * np.exp(0.5 * xd) * (erf(d1[direct] / SQRT_2) - erf(d2[direct] / SQRT_2)) + (
+            2 * np.sinh(0.5 * xd) * ndtr(d2[direct])
+        )
+    return b
+
+def normalized_vega(x, s):
+    with np.errstate(all="ignore"):
+        return np.exp(-0.5 * (x * x / (s * s) + 0.25 * s * s)) / SQRT_2PI
+
+def _rational_cubic(v, x_l, x_r, y_l, y_r, d_l, d_r, r):
+    h = x_r - x_l
+    t = (v - x_l) / h
+    omt = 1 - t
+    numerator = y_r * t**3 + (r * y_r - h * d_r) * t**2 * omt + (r * y_l + h * d_l) * t * omt**2 + y_l * omt**3
+    return numerator / (1 + (r - 3) * t * omt)
+
+def _minimum_control(d_l, d_r, slope):
+    """
+    Smallest rational cubic control parameter that keeps the interpolant
+    monotone and convex (or concave) between the nodes.
+    """
+    with np.errstate(all="ignore"):
+        monotone = (d_l + d_r) / slope
+        convex = np.maximum((d_r - slope) / (slope - d_l), (slope - d_l) / (d_r - slope))
+        convex = np.where((d_r - slope) * (slope - d_l) > 0, convex, 0.0)
+    return np.nan_to_num(np.maximum(np.maximum(monotone, convex), 0.0), nan=0.0, posinf=1e6)
+
+def _control_fit_right(x_l, x_r, y_l, y_r, d_l, d_r, second_r):
+    slope = (y_r - y_l) / (x_r - x_l)
+    with np.errstate(all="ignore"):
+        r = (0.5 * (x_r - x_l) * second_r + (d_r - d_l)) / (d_r - slope)
+    return np.maximum(np.nan_to_num(r, nan=3.0, posinf=1e6, neginf=3.0), _minimum_control(d_l, d_r, slope))
+
+def _control_fit_left(x_l, x_r, y_l, y_r, d_l, d_r, second_l):
+    slope = (y_r - y_l) / (x_r - x_l)
+    with np.errstate(all="ignore"):
+        r = (0.5 * (x_r - x_l) * second_l + (d_r - d_l)) / (slope - d_l)
+    return np.maximum(np.nan_to_num(r, nan=3.0, posinf=1e6, neginf=3.0), _minimum_control(d_l, d_r, slope))
+
+def _branch_nodes(x):
+    """
+    Nodes (s_l, b_l), (s_c, b_c), (s_u, b_u) splitting the price range into
+    the lower, two middle and upper branches.
+    """
+    b_max = np.exp(0.5 * x)
+    s_c = np.sqrt(-2 * x)
+    b_c = normalized_black(x, s_c)
+    v_c = normalized_vega(x, s_c)
+    s_u = s_c + (b_max - b_c) / v_c
+    b_u = normalized_black(x, s_u)
+    s_l = np.maximum(s_c - b_c / v_c, 0.0)
+    b_l = np.zeros_like(x)
+    b_l[s_l > 0] = normalized_black(x[s_l > 0], s_l[s_l > 0])
+    return b_max, (s_l, b_l), (s_c, b_c), (s_u, b_u)
+
+def _initial_guess(beta, x, nodes):
+    b_max, (s_l, b_l), (s_c, b_c), (s_u, b_u) = nodes
+    s = np.empty_like(beta)
+    lower, upper = beta < b_l, beta > b_u
+    with np.errstate(all="ignore"):
+        # Middle branches interpolate s(b) directly; s''(b) = 0 at the inflection point.
+        m = ~lower & ~upper
+        bm, xm, sl, sc, su = beta[m], x[m], s_l[m], s_c[m], s_u[m]
+        bl, bc, bu = b_l[m], b_c[m], b_u[m]
+        dl, dc, du = 1 / normalized_vega(xm, sl), 1 / normalized_vega(xm, sc), 1 / normalized_vega(xm, su)
+        zero = np.zeros_like(bm)
+        below = bm < bc
+        r_low_mid = _control_fit_right(bl, bc, sl, sc, dl, dc, zero)
+        r_high_mid = _control_fit_left(bc, bu, sc, su, dc, du, zero)
+        s[m] = np.where(
+            below,
+            _rational_cubic(bm, bl, bc, sl, sc, dl, dc, r_low_mid),
+            _rational_cubic(bm, bc, bu, sc, su, dc, du, r_high_mid),
+        )
+
+        # Lower branch: f = c |x| Phi(-|x| / (sqrt(3) s))^3 matches b asymptotically as s -> 0.
+        bm, xm, sl, bl = beta[lower], x[lower], s_l[lower], b_l[lower]
+        zero, one = np.zeros_like(bm), np.ones_like(bm)
+        z_l = xm / (SQRT_3 * sl)
+        f_l = LOWER_MAP_SCALE * -xm * ndtr(z_l)**3
+        df_ds = LOWER_MAP_SCALE * xm * xm * ndtr(z_l)**2 * np.exp(-0.5 * z_l * z_l) * SQRT_3 / (SQRT_2PI * sl * sl)
+        f_prime_l = df_ds / normalized_vega(xm, sl)
+        r_low = np.maximum(3.0, _minimum_control(one, f_prime_l, f_l / bl))
+        f = _rational_cubic(bm, zero, bl, zero, f_l, one, f_prime_l, r_low)
+        f = np.where(f > 0, f, bm)
+        s[lower] = xm / (SQRT_3 * ndtri(np.cbrt(f / (LOWER_MAP_SCALE * -xm))))
+
+        # Upper branch: f = Phi(-s/2) tends to (b_max - b) / 2 as s -> infinity.
+        bm, xm, su, bu, bmax = beta[upper], x[upper], s_u[upper], b_u[upper], b_max[upper]
+        zero, one = np.zeros_like(bm), np.ones_like(bm)
+        f_u = ndtr(-0.5 * su)
+        f_prime_u = -0.5 * np.exp(-0.125 * su * su) / (SQRT_2PI * normalized_vega(xm, su))
+        r_high = np.maximum(3.0, _minimum_control(f_prime_u, -0.5 * one, -f_u / (bmax - bu)))
+        f = _rational_cubic(bm, bu, bmax, f_u, zero, f_prime_u, -0.5 * one, r_high)
+        f = np.where((f > 0) & (f < 0.5), f, 0.5 * (bmax - bm) / bmax)
+        s[upper] = -2 * ndtri(f)
+    return s
+
+def _householder_step(beta, x, s, nodes):
+    """
+    One third-order Householder step. The lower branch solves ln b = ln beta
+    and the upper branch ln(b_max - b) = ln(b_max - beta), which are close
+    to linear in s where b itself is exponentially flat.
+    """
+    b_max, (_, b_l), _, (_, b_u) = nodes
+    with np.errstate(all="ignore"):
+        b = normalized_black(x, s)
+        vega = normalized_vega(x, s)
+        h2 = x * x / s**3 - s / 4
+        h3 = h2**2 - 3 * x * x / s**4 - 0.25
+
+        q = vega / b
+        nu_lower = (np.log(beta) - np.log(b)) / q
+        h2_lower = h2 - q
+        h3_lower = h3 - 3 * h2 * q + 2 * q * q
+
+        w = vega / (b_max - b)
+        nu_upper = (np.log(b_max - b) - np.log(b_max - beta)) / w
+        h2_upper = h2 + w
+        h3_upper = h3 + 3 * h2 * w + 2 * w * w
+
+        lower, upper = beta < b_l, beta > b_u
+        nu = np.where(lower, nu_lower, np.where(upper, nu_upper, (beta - b) / vega))
+        h2 = np.where(lower, h2_lower, np.where(upper, h2_upper, h2))
+        h3 = np.where(lower, h3_lower, np.where(upper, h3_upper, h3))
+        return s + nu * (1 + 0.5 * h2 * nu) / (1 + nu * (h2 + h3 * nu / 6))
+
+def implied_vol_rational(market_price, S, K, T, r=0.0, is_call=True, iterations=2):
+    """
+    Vectorized implied volatility with a closed-form initial guess and
+    `iterations` Householder steps. Same signature and NaN conventions as
+    BSMCompute.implied_vol_batch.
+    """
+    market_price, S, K, T, r, is_call = np.broadcast_arrays(
+        np.asarray(market_price, dtype=float), np.asarray(S, dtype=float),
+        np.asarray(K, dtype=float), np.asarray(T, dtype=float),
+        np.asarray(r, dtype=float), np.asarray(is_call, dtype=bool)
+    )
+    with np.errstate(all="ignore"):
+        forward = S * np.exp(r * T)
+        x = np.log(forward / K)
+        beta = market_price * np.exp(r * T) / np.sqrt(forward * K)
+        # In-the-money prices are mapped to the out-of-the-money option by parity.
+        itm = np.where(is_call, x > 0, x < 0)
+        beta = np.where(itm, beta - np.abs(2 * np.sinh(0.5 * x)), beta)
+        x = -np.abs(x)
+        valid = np.isfinite(beta) & np.isfinite(x) & (T > 0) & (beta > 0) & (beta < np.exp(0.5 * x))
+
+    ivs = np.full(market_price.shape, np.nan)
+    flat_ivs = ivs.reshape(-1)
+    idx = np.flatnonzero(valid)
+    beta, x, T = beta.ravel()[idx], x.ravel()[idx], T.ravel()[idx]
+
+    at_the_money = x == 0
+    flat_ivs[idx[at_the_money]] = 2 * SQRT_2 * erfinv(beta[at_the_money]) / np.sqrt(T[at_the_money])
+
+    idx, beta, x, T = idx[~at_the_money], beta[~at_the_money], x[~at_the_money], T[~at_the_money]
+    nodes = _branch_nodes(x)
+    s = _initial_guess(beta, x, nodes)
+    for _ in range(iterations):
+        s = _householder_step(beta, x, s, nodes)
+    flat_ivs[idx] = np.where(s > 0, s, np.nan) / np.sqrt(T)
+    return ivs
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy.interpolate import griddata, CloughTocher2DInterpolator, make_lsq_spline
+from scipy.spatial import Delaunay, cKDTree
+
+# The original griddata fit unless configured otherwise.
+SURFACE_FIT = os.getenv("IV_SURFACE_FIT", "griddata")
+TRIANGULATION_CACHE_SIZE = int(os.getenv("IV_TRIANGULATION_CACHE_SIZE", 32))
+# Interior knots of each expiry's least-squares smile spline, at most one
+# per SMILE_POINTS_PER_KNOT distinct strikes.
+SMILE_KNOTS = int(os.getenv("IV_SMILE_KNOTS", 4))
+SMILE_POINTS_PER_KNOT = 6
+
+
+def fit_griddata(ivs, mny, ttes, grid_mny, grid_ttes):
+    """
+    The original path: a fresh Delaunay + Clough-Tocher fit per call, NaN
+    outside the convex hull of the points.
+    """
+    return griddata((mny, ttes), ivs, (grid_mny, grid_ttes), method='cubic')
+
+
+class _Triangulation:
+    """
+    Delaunay triangulation and nearest-neighbour tree of one point set, in
+    coordinates rescaled to the unit square.
+    """
+    def __init__(self, mny, ttes):
+        self.lo = np.array([mny.min(), ttes.min()])
+        self.span = np.array([np.ptp(mny), np.ptp(ttes)])
+        self.span[self.span == 0] = 1.0
+        points = self.scale(mny, ttes)
+        self.delaunay = Delaunay(points)
+        self.tree = cKDTree(points)
+
+    def scale(self, mny, ttes):
+        return (np.column_stack([np.ravel(mny), np.ravel(ttes)]) - self.lo) / self.span
+
+_triangulations = OrderedDict()
+_triangulations_lock = threading.Lock()
+
+def get_triangulation(mny, ttes):
+    """
+    Triangulation of the (moneyness, tte) points, reused across calls for the
+    same points, e.g. the same chain gridded at another size or for another
+    quantity over the same contracts.
+    """
+    digest = hashlib.sha1(np.ascontiguousarray(mny, dtype=float).tobytes())
+    digest.update(np.ascontiguousarray(ttes, dtype=float).tobytes())
+    key = digest.hexdigest()
+    with _triangulations_lock:
+        tri = _triangulations.get(key)
+        if tri is not None:
+            _triangulations.move_to_end(key)
+            return tri
+    tri = _Triangulation(np.asarray(mny, dtype=float), np.asarray(ttes, dtype=float))
+    with _triangulations_lock:
+        _triangulations[key] = tri
+        while len(_triangulations) > TRIANGULATION_CACHE_SIZE:
+            _triangulations.popitem(last=False)
+    return tri
+
+def fit_delaunay(ivs, mny, ttes, grid_mny, grid_ttes):
+    """
+    Clough-Tocher cubic on a cached triangulation; grid points outside the
+    convex hull take the nearest quote instead of NaN.
+    """
+    tri = get_triangulation(mny, ttes)
+    targets = tri.scale(grid_mny, grid_ttes)
+    grid_ivs = CloughTocher2DInterpolator(tri.delaunay, ivs)(targets)
+    holes = np.isnan(grid_ivs)
+    if holes.any():
+        _, nearest = tri.tree.query(targets[holes])
+        grid_ivs[holes] = np.asarray(ivs)[nearest]
+    return grid_ivs.reshape(np.shape(grid_mny))
+
+
+def _fit_smile(x, w, grid_x):
+    """
+    Least-squares cubic spline of total variance against log(K/S) for one
+    expiry, with knots at quantiles of the quotes, held flat beyond the
+    quoted range. Thin expiries fall back to a parabola or a line.
+    """
+    unique_x, inverse = np.unique(x, return_inverse=True)
+    # Repeated quotes of one strike; average them.
+    mean_w = np.bincount(inverse, weights=w) / np.bincount(inverse)
+    clipped = np.clip(grid_x, unique_x[0], unique_x[-1])
+    knots = min(SMILE_KNOTS, len(unique_x) // SMILE_POINTS_PER_KNOT)
+    if knots >= 1:
+        interior = np.quantile(unique_x, np.linspace(0, 1, knots + 2)[1:-1])
+        t = np.concatenate([[unique_x[0]] * 4, interior, [unique_x[-1]] * 4])
+        try:
+            return make_lsq_spline(unique_x, mean_w, t, k=3)(clipped)
+        except (ValueError, np.linalg.LinAlgError):
+            pass
+    degree = min(2, len(unique_x) - 1)
+    return np.polyval(np.polyfit(unique_x, mean_w, degree), clipped)
+
+def _fit_smiles(ivs, x, ttes, grid_x, grid_t):
+    """
+    Smiles of one contract type at each expiry, interpolated linearly in
+    total variance between expiries and at constant vol beyond the first
+    and last. None when no expiry has two quotes.
+    """
+    expiries, inverse = np.unique(ttes, return_inverse=True)
+    counts = np.bincount(inverse)
+    smiles = []
+    kept = []
+    for i, expiry in enumerate(expiries):
+        if counts[i] < 2:
+            continue
+        rows = inverse == i
+        smiles.append(_fit_smile(x[rows], ivs[rows] ** 2 * expiry, grid_x))
+        kept.append(expiry)
+    if not kept:
+        return None
+    expiries = np.array(kept)
+    smiles = np.maximum(np.array(smiles), 0.0)
+    t = np.clip(grid_t, expiries[0], expiries[-1])
+    upper = np.clip(np.searchsorted(expiries, t), 1, len(expiries) - 1) if len(expiries) > 1 else np.zeros(len(t), dtype=int)
+    lower = np.maximum(upper - 1, 0)
+    span = expiries[upper] - expiries[lower]
+    weight = np.divide(t - expiries[lower], span, out=np.zeros_like(t), where=span > 0)[:, None]
+    w = (1 - weight) * smiles[lower] + weight * smiles[upper]
+    w *= (grid_t / t)[:, None]
+    return np.sqrt(w / grid_t[:, None])
+
+def fit_smile(ivs, mny, ttes, grid_mny, grid_ttes, is_call=None):
+    """
+    Per-expiry smile fit in total variance w = iv^2 * T against log(K/S).
+    Calls and puts are fitted separately, since the plotted moneyness
+    (S/K for calls, K/S for puts) puts opposite strikes at the same x;
+    each is evaluated at the strike a grid column stands for and the two
+    are averaged by quote count. Without `is_call` every quote is taken as
+    a call. Cost is linear in the quotes.
+    """
+    ivs, mny, ttes = (np.asarray(a, dtype=float) for a in (ivs, mny, ttes))
+    is_call = np.ones(len(ivs), dtype=bool) if is_call is None else np.asarray(is_call, dtype=bool)
+    grid_x = np.log(grid_mny[0])
+    grid_t = grid_ttes[:, 0]
+    surfaces, counts = [], []
+    # log(K/S) is -log(S/K) for calls and log(K/S) for puts.
+    for calls, sign in ((True, -1.0), (False, 1.0)):
+        rows = is_call == calls
+        surface = _fit_smiles(ivs[rows], sign * np.log(mny[rows]), ttes[rows], sign * grid_x, grid_t) if rows.any() else None
+        if surface is not None:
+            surfaces.append(surface)
+            counts.append(rows.sum())
+    if not surfaces:
+        return np.full(np.shape(grid_mny), np.nan)
+    return np.average(np.array(surfaces), axis=0, weights=counts)
+
+
+SURFACE_FITS = {
+    "griddata": fit_griddata,
+    "delaunay": fit_delaunay,
+    "smile": fit_smile,
+}
+
+def fit_surface(ivs, mny, ttes, grid_mny, grid_ttes, method=SURFACE_FIT, is_call=None):
+    """
+    `is_call` is only used by the smile fit, which models calls and puts
+    separately.
+    """
+    if method not in SURFACE_FITS:
+        raise ValueError(f"surface fit must be one of {sorted(SURFACE_FITS)}.")
+    if method == "smile":
+        return fit_smile(ivs, mny, ttes, grid_mny, grid_ttes, is_call=is_call)
+    return SURFACE_FITS[method](ivs, mny, ttes, grid_mny, grid_ttes)
@@ -0,0 +1,146 @@
+from datetime import datetime, date
+import time
+import numpy as np
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from db import SessionLocal, OptionData, IVSurfaceData, get_surface_version, read_session
+from .IVmap import compute_surface_points, grid_surface
+import timing
+
+
+def _to_json(values):
+    """
+    Nested lists with NaN replaced by None; JSON columns reject NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), None, values).tolist()
+
+def _from_json(values):
+    return np.array(values, dtype=float)
+
+class MaterializedSurface:
+    """
+    IV points and gridded surface solved by daily_update for one ticker.
+    """
+    def __init__(self, record):
+        self.as_of = record.as_of
+        self.ivs = _from_json(record.points["iv"])
+        self.mny = _from_json(record.points["moneyness"])
+        self.ttes = _from_json(record.points["tte"])
+        self.is_call = np.array(record.points.get("is_call", []), dtype=bool)
+        # The stored grid's time axis is only exact on the day it was built,
+        # and Greeks move with time to expiry, so both are dropped after.
+        fresh = self.as_of == date.today()
+        if record.grid and fresh:
+            self.grid = tuple(_from_json(record.grid[k]) for k in ("moneyness", "tte", "iv"))
+        else:
+            self.grid = None
+        if "greeks" in record.points and fresh:
+            self.greeks = {name: _from_json(values) for name, values in record.points["greeks"].items()}
+        else:
+            self.greeks = None
+
+    def _keep(self, start_date=None, end_date=None):
+        today = date.today()
+        ttes = self.ttes - (today - self.as_of).days / 365.0
+        keep = ttes > 0
+        if start_date:
+            keep &= ttes >= (datetime.strptime(start_date, "%Y-%m-%d").date() - today).days / 365.0
+        if end_date:
+            keep &= ttes <= (datetime.strptime(end_date, "%Y-%m-%d").date() - today).days / 365.0
+        return keep, ttes
+
+    def slice(self, start_date=None, end_date=None):
+        """
+        Points whose expiry falls in [start_date, end_date], with time to
+        expiry measured from today.
+        Returns a tuple: (ivs, moneyness, tte, is_call or None for records without it)
+        """
+        keep, ttes = self._keep(start_date, end_date)
+        is_call = self.is_call[keep] if len(self.is_call) == len(self.ivs) else None
+        return self.ivs[keep], self.mny[keep], ttes[keep], is_call
+
+    def slice_greek(self, greek, start_date=None, end_date=None, is_call=True):
+        """
+        Like slice(), for one Greek of the calls or the puts.
+        Returns a tuple: (values, moneyness, tte)
+        """
+        keep, ttes = self._keep(start_date, end_date)
+        keep &= self.is_call == is_call
+        return self.greeks[greek][keep], self.mny[keep], ttes[keep]
+
+def materialize_iv_surface(ticker):
+    """
+    Solve and persist the IV points, their Greeks and the default grid for
+    `ticker`, replacing any earlier materialization. Returns the number of
+    points.
+    """
+    version = get_surface_version(ticker)
+    ivs, mny, ttes, is_call, greeks = compute_surface_points(ticker, greeks=True)
+    grid = None
+    if len(ivs):
+        grid_mny, grid_ttes, grid_ivs = grid_surface(ivs, mny, ttes, is_call=is_call)
+        grid = {"moneyness": _to_json(grid_mny), "tte": _to_json(grid_ttes), "iv": _to_json(grid_ivs)}
+    record = IVSurfaceData(
+        ticker=ticker,
+        as_of=date.today(),
+        data_version=version,
+        points={
+            "iv": _to_json(ivs),
+            "moneyness": _to_json(mny),
+            "tte": _to_json(ttes),
+            "is_call": is_call.tolist(),
+            "greeks": {name: _to_json(values) for name, values in greeks.items()},
+        },
+        grid=grid,
+        fetch_date=datetime.utcnow()
+    )
+    session = SessionLocal()
+    try:
+        session.query(IVSurfaceData).filter(IVSurfaceData.ticker == ticker).delete()
+        session.add(record)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    return len(ivs)
+
+def materialize_iv_surfaces(tickers=None):
+    """
+    Precompute stage run at the end of daily_update, for every stored ticker
+    unless `tickers` is given.
+    """
+    if tickers is None:
+        session = SessionLocal()
+        try:
+            tickers = [t for (t,) in session.query(OptionData.ticker).distinct()]
+        finally:
+            session.close()
+    for ticker in tickers:
+        start = time.perf_counter()
+        try:
+            count = materialize_iv_surface(ticker)
+            print(f"Materialized {count} IV points for {ticker} in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            print(f"Error materializing IV surface for {ticker}: {e}")
+
+def load_materialized_surface(ticker):
+    """
+    Latest materialized surface for `ticker`, or None when there is none or
+    the option, underlying or yield data has changed since it was built.
+    """
+    with timing.span("db"):
+        with read_session() as session:
+            record = session.query(IVSurfaceData).filter(IVSurfaceData.ticker == ticker).order_by(IVSurfaceData.id.desc()).first()
+        if record is None or record.data_version != get_surface_version(ticker):
+            return None
+    with timing.span("convert"):
+        return MaterializedSurface(record)
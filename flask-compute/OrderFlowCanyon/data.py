@@ -1,34 +1,36 @@
-import databento as db
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
-from .utils import create_orderbook
-from dotenv import load_dotenv
+from .downsample import bucket_orderbook
+from .store import OrderBookStore
 import os
 
-def get_data(ticker='TSLA', start_date=None, end_date=None):
-  load_dotenv()
-  DATABENTO_KEY = os.getenv("API_KEY")
-  client = db.Historical(DATABENTO_KEY)
+ORDER_FLOW_RESOLUTION = int(os.getenv("ORDER_FLOW_RESOLUTION", 500))
+ORDER_FLOW_AGGREGATION = os.getenv("ORDER_FLOW_AGGREGATION", "last")
 
+_store = None
+
+def get_store():
+  global _store
+  if _store is None:
+    _store = OrderBookStore()
+  return _store
+
+def get_data(ticker='TSLA', start_date=None, end_date=None, store=None,
+             resolution=ORDER_FLOW_RESOLUTION, aggregation=ORDER_FLOW_AGGREGATION):
+  """
+  Order book of `ticker` over [start_date, end_date) downsampled to at most
+  `resolution` time buckets, whatever the length of the range.
+  """
   if start_date is None:
     start_date = datetime.now() - timedelta(days=3)
   if end_date is None:
     end_date = datetime.now() - timedelta(days=1)
-  symbols = [ticker]
 
-  df = client.timeseries.get_range(
-      dataset="XNAS.ITCH",
-      schema="mbp-10",
-      symbols=symbols,
-      start=start_date,
-      end=end_date,
-      limit=10_000,
-  ).to_df()
-
-  apx, bpx, avc, bvc, times = create_orderbook(df)
+  store = store or get_store()
+  frames = store.iter_frames(ticker, start_date, end_date)
+  try:
+    apx, bpx, avc, bvc, times = bucket_orderbook(frames, start_date, end_date, resolution, aggregation)
+  finally:
+    frames.close()
   return apx, bpx, avc, bvc, times
-
-
-
-
@@ -0,0 +1,127 @@
+import time
+import numpy as np
+import pandas as pd
+from .utils import DEPTH, level_block
+from .store import to_utc
+import timing
+
+RESOLUTION = 500
+OVERSAMPLE = 16
+MODES = ('last', 'mean', 'max-depth')
+
+def timestamps_ns(frame, column='ts_recv'):
+  """
+  Integer nanosecond timestamps of a Databento frame, from its index when
+  `column` names it (ts_recv in to_df() output) or from a column.
+  """
+  values = frame.index if frame.index.name == column else frame[column]
+  return pd.DatetimeIndex(pd.to_datetime(values, utc=True)).as_unit('ns').asi8
+
+class BucketAggregator:
+  """
+  Folds mbp-10 rows into `count` equal wall-clock buckets over
+  [start_ns, end_ns). State is O(count * depth) whatever the input size:
+
+    last       the book at the latest record in the bucket
+    mean       level-wise mean of prices and cumulative volumes
+    max-depth  the book with the most cumulative ask + bid volume
+  """
+  def __init__(self, start_ns, end_ns, count, depth=DEPTH, mode='last'):
+    if mode not in MODES:
+      raise ValueError(f"mode must be one of {MODES}.")
+    self.start_ns = start_ns
+    self.width = max(1, -(-(end_ns - start_ns) // count))
+    self.count = count
+    self.mode = mode
+    fill = 0.0 if mode == 'mean' else np.nan
+    self.books = [np.full((count, depth), fill) for _ in range(4)]
+    self.key = np.full(count, -np.inf)
+    self.rows = np.zeros(count, dtype=np.int64)
+
+  def add(self, ts, apx, bpx, avc, bvc):
+    idx = (ts - self.start_ns) // self.width
+    keep = (idx >= 0) & (idx < self.count)
+    if not keep.all():
+      idx, ts, apx, bpx, avc, bvc = idx[keep], ts[keep], apx[keep], bpx[keep], avc[keep], bvc[keep]
+    if len(idx) == 0:
+      return
+    self.rows += np.bincount(idx, minlength=self.count)
+    books = (apx, bpx, avc, bvc)
+    if self.mode == 'mean':
+      for total, values in zip(self.books, books):
+        for level in range(total.shape[1]):
+          total[:, level] += np.bincount(idx, weights=values[:, level], minlength=self.count)
+      return
+    key = (ts - self.start_ns).astype(float) if self.mode == 'last' else avc[:, -1] + bvc[:, -1]
+    rows, buckets = _argmax_per_group(idx, key)
+    # Ties go to the later chunk, which is later in time.
+    better = key[rows] >= self.key[buckets]
+    rows, buckets = rows[better], buckets[better]
+    self.key[buckets] = key[rows]
+    for state, values in zip(self.books, books):
+      state[buckets] = values[rows]
+
+  def result(self, resolution):
+    """
+    Non-empty buckets merged, in order, into at most `resolution` rows.
+    Returns a tuple: (apx, bpx, avc, bvc, times) with times as
+    datetime64[ns] bucket starts
+    """
+    depth = self.books[0].shape[1]
+    filled = np.flatnonzero(self.rows)
+    if len(filled) == 0:
+      empty = np.empty((0, depth))
+      return empty, empty, empty, empty, np.empty((0, depth), dtype='datetime64[ns]')
+    groups = np.arange(len(filled)) * min(resolution, len(filled)) // len(filled)
+    starts = np.flatnonzero(np.diff(groups, prepend=-1))
+    if self.mode == 'mean':
+      rows = np.add.reduceat(self.rows[filled], starts)[:, None]
+      books = [np.add.reduceat(state[filled], starts) / rows for state in self.books]
+    else:
+      picks, _ = _argmax_per_group(groups, self.key[filled])
+      books = [state[filled[picks]] for state in self.books]
+    times = (self.start_ns + filled[starts] * self.width).astype('datetime64[ns]')
+    return (*books, np.repeat(times[:, None], depth, axis=1))
+
+def _argmax_per_group(groups, key):
+  """
+  Index of the largest `key` within each group, and the group it belongs to.
+  """
+  order = np.lexsort((key, groups))
+  sorted_groups = groups[order]
+  last = np.flatnonzero(np.append(sorted_groups[1:] != sorted_groups[:-1], True))
+  return order[last], sorted_groups[last]
+
+def bucket_orderbook(frames, start, end, resolution=RESOLUTION, mode='last', depth=DEPTH,
+                     time_column='ts_recv', oversample=OVERSAMPLE):
+  """
+  Downsample a stream of mbp-10 frames covering [start, end) into at most
+  `resolution` snapshots of `depth` levels.
+
+  Rows are first folded into resolution * oversample wall-clock buckets;
+  empty ones (nights, weekends, halts) are dropped and the rest merged
+  into `resolution` rows, so sessions fill the output evenly.
+  """
+  start_ns = to_utc(start).value
+  end_ns = to_utc(end).value
+  aggregator = BucketAggregator(start_ns, end_ns, resolution * oversample, depth, mode)
+  started = time.perf_counter()
+  for frame in frames:
+    # Reading the next chunk (download, DBN decode) and bucketing it
+    # interleave; time them separately.
+    timing.add('read', time.perf_counter() - started)
+    with timing.span('bucket'):
+      rows = slice(None)
+      avc = np.cumsum(level_block(frame, 'ask_sz', rows, depth), axis=1)
+      bvc = np.cumsum(level_block(frame, 'bid_sz', rows, depth), axis=1)
+      aggregator.add(
+        timestamps_ns(frame, time_column),
+        level_block(frame, 'ask_px', rows, depth),
+        level_block(frame, 'bid_px', rows, depth),
+        avc,
+        bvc,
+      )
+    started = time.perf_counter()
+  timing.add('read', time.perf_counter() - started)
+  with timing.span('bucket'):
+    return aggregator.result(resolution)
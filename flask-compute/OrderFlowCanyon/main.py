@@ -2,70 +2,78 @@ import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
 from .data import get_data
+import timing
 
-def generate_order_flow_html(ticker, start_date=None, end_date=None):
+def generate_order_flow_html(ticker, start_date=None, end_date=None, aggregation=None):
     """
     Generates a 3D surface Plotly JSON for order flow data.
-    The logic and data gathering remain unchanged; we simply
-    wrap them in a function that returns the figure's JSON.
+    The book is downsampled to fixed time buckets by get_data, so the
+    surface size does not grow with the requested range.
     """
     
     TICKER = ticker
 
     # Gather data
-    apx, bpx, avc, bvc, times = get_data(TICKER, start_date=start_date, end_date=end_date)
-    # Prepare figure exactly as before
-    op = 0.8
-    scaler = 8
-    inds = np.arange(500, len(apx), scaler)
+    kwargs = {"aggregation": aggregation} if aggregation else {}
+    apx, bpx, avc, bvc, times = get_data(TICKER, start_date=start_date, end_date=end_date, **kwargs)
+    if len(apx) == 0:
+        return f"<p>No order book data found for {ticker} with the chosen parameters.</p>"
+    return order_flow_figure_json(ticker, apx, bpx, avc, bvc, times)
 
-    fig = go.Figure(
-        data=[
-            go.Surface(
-                x=apx[inds],
-                y=np.arange(len(apx[inds])),
-                z=avc[inds],
-                colorscale='OrRd',
-                opacity=op
-            )
-        ]
-    )
+def order_flow_figure_json(ticker, apx, bpx, avc, bvc, times):
+    with timing.span('serialize'):
+        op = 0.8
+        tick_inds = np.linspace(0, len(apx) - 1, min(4, len(apx))).astype(int)
+        tick_text = pd.DatetimeIndex(times[tick_inds, 0]).strftime("%m-%d %H:%M").tolist()
 
-    fig.add_surface(
-        x=bpx[inds],
-        y=np.arange(len(bpx[inds])),
-        z=bvc[inds],
-        colorscale='BuGn',
-        opacity=op
-    )
+        fig = go.Figure(
+            data=[
+                go.Surface(
+                    x=apx,
+                    y=np.arange(len(apx)),
+                    z=avc,
+                    colorscale='OrRd',
+                    opacity=op
+                )
+            ]
+        )
 
-    fig.update_layout(
-        scene=dict(
-            xaxis=dict(
-                nticks=4, 
-                range=[min(apx[inds].min(), bpx[inds].min()), 
-                       max(apx[inds].max(), bpx[inds].max())],
-            ),
-            yaxis=dict(
-                nticks=4,
-                range=[0, len(apx[inds])]
-            ),
-            zaxis=dict(
-                nticks=4,
-                range=[0, max(avc[inds].max(), bvc[inds].max())]
+        fig.add_surface(
+            x=bpx,
+            y=np.arange(len(bpx)),
+            z=bvc,
+            colorscale='BuGn',
+            opacity=op
+        )
+
+        fig.update_layout(
+            scene=dict(
+                xaxis=dict(
+                    nticks=4, 
+                    range=[min(apx.min(), bpx.min()), 
+                           max(apx.max(), bpx.max())],
+                ),
+                yaxis=dict(
+                    tickvals=tick_inds.tolist(),
+                    ticktext=tick_text,
+                    range=[0, len(apx)]
+                ),
+                zaxis=dict(
+                    nticks=4,
+                    range=[0, max(avc.max(), bvc.max())]
+                ),
             ),
-        ),
-        margin=dict(l=0, r=0, b=0, t=0),
-    )
+            margin=dict(l=0, r=0, b=0, t=0),
+        )
 
-    fig.update_layout(
-        scene=dict(
-            xaxis_title="Price",
-            yaxis_title="Time",
-            zaxis_title="CumulativeVolume"
-        ),
-        title = f"Order Flow of {ticker}"
-    )
+        fig.update_layout(
+            scene=dict(
+                xaxis_title="Price",
+                yaxis_title="Time",
+                zaxis_title="CumulativeVolume"
+            ),
+            title = f"Order Flow of {ticker}"
+        )
 
-    # Return the Plotly figure as JSON (instead of showing it)
-    return fig.to_json()
+        # Return the Plotly figure as JSON (instead of showing it)
+        return fig.to_json()
@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import pandas as pd
+from progress import report
+
+DBN_STORE_DIR = os.getenv("DBN_STORE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "pandera", "dbn"))
+DBN_CHUNK_ROWS = int(os.getenv("DBN_CHUNK_ROWS", 250_000))
+DATASET = "XNAS.ITCH"
+SCHEMA = "mbp-10"
+
+def read_dbn_chunks(path, chunk_rows):
+  """
+  DataFrames of at most `chunk_rows` records from a DBN/zstd file, indexed
+  by ts_recv like Databento's to_df().
+  """
+  import databento as db
+  return db.DBNStore.from_file(path).to_df(count=chunk_rows)
+
+def default_client():
+  import databento as db
+  from dotenv import load_dotenv
+  load_dotenv()
+  return db.Historical(os.getenv("API_KEY"))
+
+def to_utc(value):
+  stamp = pd.Timestamp(value)
+  return stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp.tz_convert("UTC")
+
+class OrderBookStore:
+  """
+  Raw Databento downloads kept on disk as one DBN/zstd file per
+  symbol and UTC day:
+
+      <root>/<dataset>/<schema>/<symbol>/<YYYY-MM-DD>.dbn.zst
+
+  Only complete past days are kept; the current day is downloaded to a
+  temporary file on every request. `client` and `reader` default to
+  Databento's and can be replaced by fakes in tests.
+  """
+  def __init__(self, root=DBN_STORE_DIR, client=None, reader=read_dbn_chunks, dataset=DATASET, schema=SCHEMA):
+    self.root = root
+    self._client = client
+    self.reader = reader
+    self.dataset = dataset
+    self.schema = schema
+
+  @property
+  def client(self):
+    if self._client is None:
+      self._client = default_client()
+    return self._client
+
+  def path(self, symbol, day):
+    return os.path.join(self.root, self.dataset, self.schema, symbol, f"{day:%Y-%m-%d}.dbn.zst")
+
+  def is_complete(self, day):
+    return day + pd.Timedelta(days=1) <= pd.Timestamp.now(tz="UTC").normalize()
+
+  def _download(self, symbol, day, path):
+    self.client.timeseries.get_range(
+      dataset=self.dataset,
+      schema=self.schema,
+      symbols=[symbol],
+      start=day,
+      end=day + pd.Timedelta(days=1),
+      path=path,
+    )
+
+  def fetch_day(self, symbol, day):
+    """
+    Local file holding `symbol` on `day`, downloading it if needed.
+    Returns a tuple: (path, temporary) where temporary files are the
+    caller's to delete.
+    """
+    path = self.path(symbol, day)
+    if os.path.exists(path):
+      return path, False
+    if not self.is_complete(day):
+      fd, tmp_path = tempfile.mkstemp(suffix=".dbn.zst")
+      os.close(fd)
+      self._download(symbol, day, tmp_path)
+      return tmp_path, True
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+      self._download(symbol, day, tmp_path)
+      os.replace(tmp_path, path)
+    finally:
+      if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    return path, False
+
+  def iter_frames(self, symbol, start, end, chunk_rows=DBN_CHUNK_ROWS):
+    """
+    Records of `symbol` with ts_recv in [start, end), as DataFrames of at
+    most `chunk_rows` rows in time order. Only one chunk is held at a time.
+    """
+    start, end = to_utc(start), to_utc(end)
+    day = start.normalize()
+    days = int(-(-(end - day) // pd.Timedelta(days=1)))
+    done = 0
+    while day < end:
+      path, temporary = self.fetch_day(symbol, day)
+      try:
+        for frame in self.reader(path, chunk_rows):
+          if day < start or day + pd.Timedelta(days=1) > end:
+            frame = frame[(frame.index >= start) & (frame.index < end)]
+          if len(frame):
+            yield frame
+      finally:
+        if temporary:
+          os.remove(path)
+      done += 1
+      report("reading days", done, days)
+      day += pd.Timedelta(days=1)
+
+  def clear(self, symbol=None):
+    target = os.path.join(self.root, self.dataset, self.schema, *([symbol] if symbol else []))
+    shutil.rmtree(target, ignore_errors=True)
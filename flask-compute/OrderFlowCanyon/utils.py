@@ -1,51 +1,44 @@
 import pandas as pd
 import numpy as np
 
-def create_snapshot(df, ti):
-  depth = 10
-  ask_prices = []
-  bid_prices = []
+DEPTH = 10
+STRIDE = 10
 
-  ask_vols = []
-  bid_vols = []
+def level_columns(field, depth=DEPTH):
+  """
+  mbp-10 column names for one field across levels, e.g. bid_px_00..bid_px_09.
+  """
+  return [f'{field}_{i:02d}' for i in range(depth)]
 
-  for i in range(depth):
-    bv = f'bid_sz_0{i}'
-    av = f'ask_sz_0{i}'
-    bp = f'bid_px_0{i}'
-    ap = f'ask_px_0{i}'
-    
-    ask_vols.append(df.iloc[ti][av])
-    bid_vols.append(df.iloc[ti][bv])
-    bid_prices.append(df.iloc[ti][bp])
-    ask_prices.append(df.iloc[ti][ap])
+def level_block(df, field, rows, depth=DEPTH):
+  """
+  (len(rows), depth) array of one field, copying only the selected rows.
+  """
+  return np.column_stack([df[col].to_numpy()[rows] for col in level_columns(field, depth)])
 
-  #bid_vols = np.array(bid_vols) * -1
+def create_snapshot(df, ti, depth=DEPTH):
+  row = df.iloc[ti]
+  ask_vols = row[level_columns('ask_sz', depth)].tolist()
+  bid_vols = row[level_columns('bid_sz', depth)].tolist()
+  ask_prices = row[level_columns('ask_px', depth)].tolist()
+  bid_prices = row[level_columns('bid_px', depth)].tolist()
   return ask_vols, bid_vols, ask_prices, bid_prices
 
-def create_orderbook(df):
-  times = []
-  ask_vols_t = []
-  bid_vols_t = []
-  ask_prices_t = []
-  bid_prices_t = []
-  for ti in range(0, len(df), 10):
-    ask_vols, bid_vols, ask_prices, bid_prices = create_snapshot(df, ti)
-    ask_vols_t.append(ask_vols)
-    bid_vols_t.append(bid_vols)
-    ask_prices_t.append(ask_prices)
-    bid_prices_t.append(bid_prices)
-    snapshot_time = df.iloc[ti]['ts_in_delta']
-    times.append([snapshot_time] * 10)
+def create_orderbook(df, stride=STRIDE, depth=DEPTH):
+  """
+  Every `stride`-th mbp-10 row as (N, depth) level arrays. Each column block
+  is sliced out of the frame once; volumes are cumulated across levels.
+  Returns a tuple: (ask prices, bid prices, cumulative ask volume,
+  cumulative bid volume, snapshot times)
+  """
+  rows = slice(0, len(df), stride)
+  apx = level_block(df, 'ask_px', rows, depth)
+  bpx = level_block(df, 'bid_px', rows, depth)
+  avx = level_block(df, 'ask_sz', rows, depth)
+  bvx = level_block(df, 'bid_sz', rows, depth)
+  ts = df['ts_in_delta'].to_numpy()[rows]
+  times = np.repeat(ts[:, None], depth, axis=1)
 
-  apx = np.array(ask_prices_t)
-  bpx = np.array(bid_prices_t)
-  avx = np.array(ask_vols_t)
-  bvx = np.array(bid_vols_t)
-  times = np.array(times)
-
-  #avc = np.fliplr( np.cumsum( np.fliplr(avx), axis=1 ) )
-  #bvc = np.fliplr( np.cumsum( np.fliplr(bvx), axis=1 ) )
   avc = np.cumsum( avx, axis=1 )
   bvc = np.cumsum( bvx, axis=1 )
-  return apx, bpx, avc, bvc, times
\ No newline at end of file
+  return apx, bpx, avc, bvc, times
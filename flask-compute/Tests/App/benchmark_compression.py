@@ -0,0 +1,98 @@
+"""
+Response bytes and latency of each content coding per graph type.
+
+    python Tests/App/benchmark_compression.py
+
+Figures are built by the real generators from synthetic data at their
+default sizes. "first ms" is how long until the first compressed byte
+can be sent: the whole body for one-shot compression, the first
+STREAM_CHUNK_BYTES block when the body is streamed (at least
+STREAM_MIN_BYTES). "total ms" is the full compression.
+"""
+import json
+import os
+import statistics
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import compression
+from payloads import encode_payload
+
+def iv_surface(size=50, seed=0):
+    from IVSurface.IVmap import surface_figure_json
+    rng = np.random.default_rng(seed)
+    mny, tte = np.meshgrid(np.linspace(0.6, 1.4, size), np.geomspace(7 / 365, 2.0, size))
+    ivs = 0.18 + 0.02 * tte + (0.12 * np.log(mny) ** 2) / np.sqrt(tte) + rng.normal(0, 0.002, mny.shape)
+    return surface_figure_json("AAPL", mny, tte, ivs)
+
+def order_flow(rows=100_000, seed=0):
+    from OrderFlowCanyon.downsample import bucket_orderbook
+    from OrderFlowCanyon.main import order_flow_figure_json
+    from OrderFlowCanyon.utils import DEPTH, level_columns
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2025-01-02 14:30", periods=rows, freq="200ms", tz="UTC", name="ts_recv")
+    mid = 250 + np.cumsum(rng.normal(0, 0.005, rows))
+    frame = pd.DataFrame(index=index)
+    for level in range(DEPTH):
+        frame[level_columns('ask_px')[level]] = mid + 0.01 * (level + 1)
+        frame[level_columns('bid_px')[level]] = mid - 0.01 * (level + 1)
+        frame[level_columns('ask_sz')[level]] = rng.integers(1, 500, rows)
+        frame[level_columns('bid_sz')[level]] = rng.integers(1, 500, rows)
+    book = bucket_orderbook([frame], index[0], index[-1] + pd.Timedelta(seconds=1))
+    return order_flow_figure_json("AAPL", *book)
+
+def yield_curve(days=750):
+    from YieldCurve.main import yield_curve_figure_json
+    maturities = np.array([1, 2, 3, 4, 6, 12, 24, 36, 60, 84, 120, 240, 360])
+    dates = pd.bdate_range("2022-01-03", periods=days).strftime("%Y-%m-%d").to_numpy()
+    z = 4.0 + np.cumsum(np.random.default_rng(0).normal(0, 0.03, (days, 1)), axis=0) + np.log1p(maturities) / 10
+    return yield_curve_figure_json(maturities, dates, z)
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def measure(body, coding, level, repeat=5):
+    if coding is None:
+        return {"bytes": len(body), "first": 0.0, "total": 0.0}
+    compressed = compression.compress(body, coding, level)
+    total = median_ms(lambda: compression.compress(body, coding, level), repeat)
+    if len(body) >= compression.STREAM_MIN_BYTES:
+        first = median_ms(lambda: next(compression.iter_compressed(compression.iter_bytes(body), coding, level)), repeat)
+    else:
+        first = total
+    return {"bytes": len(compressed), "first": first, "total": total}
+
+CODINGS = ((None, None), ("gzip", 1), ("gzip", 6), ("gzip", 9), ("zstd", 1), ("zstd", 3), ("zstd", 9), ("zstd", 19))
+
+
+if __name__ == "__main__":
+    figures = (("IVMap / Greek surfaces (50x50)", iv_surface), ("IVMap (200x200)", lambda: iv_surface(200)),
+               ("OrderFlowCanyon", order_flow), ("USFixedIncomeYield", yield_curve))
+    for label, build in figures:
+        fig_json = build()
+        for fmt in ("json", "bdata"):
+            if fmt == "json":
+                body = b"".join(compression.iter_json_body(fig_json))
+                assert json.loads(body) == {"plotly_json": fig_json}
+            else:
+                body = encode_payload(fig_json, fmt).encode("utf-8")
+            print(f"{label}, {fmt}: {len(body) / 1024:,.0f} KiB")
+            print(f"  {'coding':<12}{'KiB':>10}{'ratio':>8}{'first ms':>10}{'total ms':>10}")
+            for coding, level in CODINGS:
+                result = measure(body, coding, level)
+                name = f"{coding}:{level}" if coding else "identity"
+                print(f"  {name:<12}{result['bytes'] / 1024:>10,.1f}{len(body) / result['bytes']:>8.1f}"
+                      f"{result['first']:>10.2f}{result['total']:>10.2f}")
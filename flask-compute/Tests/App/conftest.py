@@ -0,0 +1,66 @@
+import os
+import sys
+import numpy as np
+import plotly.graph_objs as go
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import app as app_module
+import compute_cache
+import timing
+import workers
+from jobs import JobRunner, JobStore
+
+def make_surface_json(size=50):
+    mny, tte = np.meshgrid(np.linspace(0.5, 1.5, size), np.linspace(0.02, 2.0, size))
+    iv = 0.2 + 0.1 * (mny - 1) ** 2 + 0.01 * tte
+    return go.Figure(data=[go.Surface(x=mny, y=tte, z=iv, colorscale="Viridis")],
+                     layout=go.Layout(title="IV σ")).to_json()
+
+@pytest.fixture
+def surface_json():
+    """
+    Builds the Plotly JSON of a `size` x `size` IV surface.
+    """
+    return make_surface_json
+
+@pytest.fixture
+def calls():
+    return []
+
+@pytest.fixture
+def version():
+    """
+    The data_version `client` reports; set ["value"] to change it.
+    """
+    return {"value": "v1"}
+
+@pytest.fixture
+def fake_generate(calls):
+    """
+    The generate_graph behind `client`. Modules override this fixture for
+    other results.
+    """
+    def fake_generate(graph_type, parameters):
+        calls.append(graph_type)
+        return make_surface_json()
+    return fake_generate
+
+@pytest.fixture
+def client(monkeypatch, fake_generate, version):
+    """
+    Test client whose graphs come from `fake_generate`, computed in a
+    thread pool, with empty caches, jobs and histograms.
+    """
+    monkeypatch.setattr(app_module, "generate_graph", fake_generate)
+    monkeypatch.setattr(app_module, "data_version", lambda graph_type, parameters: version["value"])
+    monkeypatch.setattr(app_module, "compute_pool", workers.ComputePool(workers=0))
+    monkeypatch.setattr(app_module, "job_runner", JobRunner(JobStore()))
+    timing.histograms.clear()
+    compute_cache.result_cache.clear()
+    yield app_module.app.test_client()
+    compute_cache.result_cache.clear()
@@ -0,0 +1,54 @@
+import gzip
+import json
+import os
+import sys
+import pytest
+import zstandard
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import compression
+from compression import negotiate_encoding, parse_levels, iter_compressed, iter_json_body
+
+def test_negotiation():
+    assert negotiate_encoding("gzip, deflate, br, zstd") == "zstd"
+    assert negotiate_encoding("gzip;q=1.0, zstd;q=0.5") == "gzip"
+    assert negotiate_encoding("zstd;q=0, *") == "gzip"
+    assert negotiate_encoding("deflate") is None
+    assert negotiate_encoding(None) is None
+
+def test_levels_per_graph_type():
+    levels = parse_levels("OrderFlowCanyon=1, IVMap=9", 6, "GZIP_LEVELS")
+    assert levels["OrderFlowCanyon"] == 1 and levels["IVMap"] == 9 and levels["USFixedIncomeYield"] == 6
+    with pytest.raises(ValueError):
+        parse_levels("Nope=1", 6, "GZIP_LEVELS")
+
+def test_streamed_json_body_matches_jsonify(surface_json):
+    fig_json = surface_json()
+    body = b"".join(iter_json_body(fig_json, chunk_size=1000))
+    assert json.loads(body) == {"plotly_json": fig_json}
+    blocks = list(iter_compressed(iter_json_body(fig_json, chunk_size=1000), "gzip", 6))
+    # Every chunk is flushed as its own block rather than held back to the end.
+    assert len(blocks) > 10
+    assert gzip.decompress(b"".join(blocks)) == body
+
+def test_compute_responses_are_compressed_when_accepted(client, calls, monkeypatch):
+    body = {"graphType": "IVMap", "parameters": {"Ticker": "AAPL"}}
+    plain = client.post("/compute", json=body)
+    assert "Content-Encoding" not in plain.headers and "Accept-Encoding" in plain.headers["Vary"]
+    small = client.post("/compute", json=body, headers={"Accept-Encoding": "gzip"})
+    assert small.headers["Content-Encoding"] == "gzip" and small.content_length < len(plain.data) / 2
+    assert json.loads(gzip.decompress(small.data)) == plain.get_json()
+    # Above STREAM_MIN_BYTES the body is compressed as it is sent.
+    monkeypatch.setattr(compression, "STREAM_MIN_BYTES", 1)
+    streamed = client.post("/compute", json=dict(body, format="bdata"), headers={"Accept-Encoding": "zstd"})
+    assert streamed.content_length is None and streamed.headers["Content-Encoding"] == "zstd"
+    compact = zstandard.ZstdDecompressor().decompressobj().decompress(streamed.data)
+    assert compact == client.post("/compute", json=dict(body, format="bdata")).data
+    # ...and cached once sent.
+    again = client.post("/compute", json=dict(body, format="bdata"), headers={"Accept-Encoding": "zstd"})
+    assert again.content_length == len(streamed.data) and again.data == streamed.data
+    assert calls == ["IVMap"]
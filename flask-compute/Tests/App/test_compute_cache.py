@@ -0,0 +1,120 @@
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+import app as app_module
+import compute_cache
+import graphs
+import migrations
+from compute_cache import MemoryCache, DiskCache, ResultCache, make_key
+from db import engine, Base, data_version_queries
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2, max_bytes=100)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    # Reading "a" makes "b" the oldest.
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None and cache.get("a") == "1" and cache.get("c") == "3"
+
+def test_memory_cache_byte_bound():
+    cache = MemoryCache(max_entries=10, max_bytes=10)
+    cache.set("a", "x" * 4)
+    cache.set("b", "x" * 4)
+    cache.set("c", "x" * 4)
+    assert cache.get("a") is None and cache.size == 8
+    # Replacing an entry frees its old size.
+    cache.set("b", "x")
+    assert cache.size == 5
+    # A value larger than the whole budget is not stored and evicts nothing.
+    cache.set("d", "x" * 11)
+    assert cache.get("d") is None and cache.get("c") == "x" * 4
+
+def test_disk_cache_evicts_oldest_files_past_max_bytes(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    for age, key in enumerate(("a", "b")):
+        cache.set(key, b"x" * 4)
+        # Explicit mtimes; writes within one clock tick would tie.
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    cache.set("c", b"x" * 4)
+    assert cache.get("a") is None
+    assert cache.get("b") == b"x" * 4 and cache.get("c") == b"x" * 4
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 10
+
+def test_disk_hits_are_promoted_and_invalidate_clears_both_tiers(tmp_path, monkeypatch):
+    cache = ResultCache(memory=MemoryCache(), disk=DiskCache(str(tmp_path)))
+    cache.set("a", "text")
+    cache.memory.clear()
+    assert cache.get("a") == "text" and cache.memory.get("a") == "text"
+    monkeypatch.setattr(compute_cache, "result_cache", cache)
+    compute_cache.invalidate()
+    assert cache.get("a") is None and list(tmp_path.iterdir()) == []
+
+def test_keys_normalize_parameters_and_include_the_version():
+    assert make_key("IVMap", {"Ticker": " AAPL ", "End Date": ""}, "v1") == make_key("IVMap", {"Ticker": "AAPL"}, "v1")
+    assert make_key("IVMap", {"Ticker": "AAPL"}, "v1") != make_key("IVMap", {"Ticker": "AAPL"}, "v2")
+
+@pytest.fixture
+def fake_generate(calls, version):
+    def fake_generate(graph_type, parameters):
+        calls.append(version["value"])
+        return f'{{"data": [], "version": "{version["value"]}"}}'
+    return fake_generate
+
+def test_changed_data_version_misses_the_cache(client, calls, version):
+    body = {"graphType": "USFixedIncomeYield", "parameters": {}}
+    first = client.post("/compute", json=body).get_json()
+    assert client.post("/compute", json=body).get_json() == first
+    assert calls == ["v1"]
+    version["value"] = "v2"
+    assert "v2" in client.post("/compute", json=body).get_json()["plotly_json"]
+    assert calls == ["v1", "v2"]
+
+def test_unfinished_data_is_computed_every_time_and_never_cached(client, calls, version):
+    version["value"] = None
+    body = {"graphType": "OrderFlowCanyon", "parameters": {"Ticker": "TSLA"}}
+    client.post("/compute", json=body)
+    client.post("/compute", json=body)
+    assert calls == [None, None] and compute_cache.result_cache.memory.size == 0
+
+def test_order_flow_ranges_reaching_today_are_not_cached():
+    today = date.today()
+    past = {"Start Date": (today - timedelta(days=5)).isoformat(), "End Date": (today - timedelta(days=2)).isoformat()}
+    assert graphs.data_version("OrderFlowCanyon", past) == graphs.data_version("OrderFlowCanyon", past) is not None
+    live = dict(past, **{"End Date": (today + timedelta(days=1)).isoformat()})
+    assert graphs.data_version("OrderFlowCanyon", live) is None
+
+@pytest.fixture
+def schema():
+    Base.metadata.create_all(bind=engine)
+    migrations.upgrade()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.mark.skipif(engine.dialect.name != "sqlite", reason="asserts SQLite plan text")
+def test_data_version_queries_are_index_seeks(schema):
+    for stmt in data_version_queries("TEST") + data_version_queries(None):
+        plan = migrations.explain(stmt)
+        assert [line for line in plan if line.startswith("SCAN")] == ["SCAN CONSTANT ROW"], plan
+
+def test_cache_hit_runs_only_the_version_queries(client, calls, schema, monkeypatch):
+    monkeypatch.setattr(app_module, "data_version", graphs.data_version)
+    body = {"graphType": "IVMap", "parameters": {"Ticker": "TEST"}}
+    client.post("/compute", json=body)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        client.post("/compute", json=body)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(calls) == 1
+    assert len(statements) == len(data_version_queries("TEST") + data_version_queries(None))
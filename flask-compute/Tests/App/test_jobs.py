@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import threading
+import time
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from jobs import JobStore, JobStoreFull
+from progress import report
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_store_expires_finished_jobs_and_bounds_running_ones():
+    clock = Clock()
+    store = JobStore(max_entries=2, ttl=10, clock=clock)
+    first = store.create(graphType="IVMap")
+    second = store.create(graphType="IVMap")
+    with pytest.raises(JobStoreFull):
+        store.create(graphType="IVMap")
+    store.update(first["id"], status="done", result="{}")
+    # A finished job makes room for a new one.
+    third = store.create(graphType="IVMap")
+    assert store.get(first["id"]) is None and len(store) == 2
+    store.update(second["id"], status="failed", error="boom")
+    clock.now = 11
+    assert store.get(second["id"]) is None
+    assert store.get(third["id"])["status"] == "queued"
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+@pytest.fixture
+def fake_generate(release):
+    def fake_generate(graph_type, parameters):
+        for expiry in range(1, 4):
+            report("solving", expiry, 3)
+            if expiry == 2:
+                release.wait(5)
+        if parameters.get("Ticker") == "FAIL":
+            raise RuntimeError("no data")
+        return json.dumps({"data": [{"type": "surface", "z": [[0.1, 0.2], [0.3, 0.4]]}], "layout": {}})
+    return fake_generate
+
+def poll(client, job_id, until):
+    for _ in range(200):
+        status = client.get(f"/jobs/{job_id}").get_json()
+        if until(status):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job stuck at {status}")
+
+def test_job_reports_progress_then_result(client, release):
+    submitted = client.post("/jobs", json={"graphType": "IVMap", "parameters": {"Ticker": "AAPL"}})
+    assert submitted.status_code == 202
+    job_id = submitted.get_json()["job_id"]
+    running = poll(client, job_id, lambda s: s["progress"] and s["progress"]["done"] == 2)
+    assert running["status"] == "running" and running["progress"] == {"stage": "solving", "done": 2, "total": 3}
+    assert client.get(f"/jobs/{job_id}/result").status_code == 409
+    release.set()
+    done = poll(client, job_id, lambda s: s["status"] == "done")
+    assert json.loads(client.get(done["result_url"]).get_json()["plotly_json"])["data"][0]["z"][1] == [0.3, 0.4]
+    assert client.get(done["result_url"] + "?format=bdata").mimetype == "application/vnd.plotly.v1+json"
+    # Cached now, so a repeat job is done immediately.
+    again = client.post("/jobs", json={"graphType": "IVMap", "parameters": {"Ticker": "AAPL"}}).get_json()
+    assert again["status"] == "done"
+
+def test_failed_and_unknown_jobs(client, release):
+    release.set()
+    job_id = client.post("/jobs", json={"graphType": "IVMap", "parameters": {"Ticker": "FAIL"}}).get_json()["job_id"]
+    failed = poll(client, job_id, lambda s: s["status"] == "failed")
+    assert failed["error"] == "no data"
+    assert client.get(f"/jobs/{job_id}/result").status_code == 500
+    assert client.get("/jobs/nope").status_code == 404
+    assert client.post("/jobs", json={"graphType": "Heatmap"}).status_code == 400
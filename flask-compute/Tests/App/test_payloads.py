@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+import numpy as np
+import plotly.graph_objs as go
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import compute_cache
+from payloads import negotiate_format, to_bdata, to_arrow, from_arrow, decode_typed_array
+
+def test_negotiation():
+    assert negotiate_format(None, "application/json, text/plain, */*") == "json"
+    assert negotiate_format(None, "application/vnd.apache.arrow.stream") == "arrow"
+    assert negotiate_format("bdata", "application/vnd.apache.arrow.stream") == "bdata"
+    with pytest.raises(ValueError):
+        negotiate_format("csv")
+
+def test_bdata_is_smaller_and_float32_exact_enough(surface_json):
+    fig_json = surface_json()
+    compact = json.loads(to_bdata(fig_json))
+    trace = compact["data"][0]
+    assert trace["z"]["dtype"] == "f4" and trace["z"]["shape"] == "50, 50"
+    # The meshgrid axes collapse to vectors.
+    assert decode_typed_array(trace["x"]).shape == (50,)
+    original = decode_typed_array(json.loads(fig_json)["data"][0]["z"])
+    assert np.allclose(decode_typed_array(trace["z"]), original, rtol=1e-6)
+    assert len(to_bdata(fig_json)) * 3 < len(json.dumps({"plotly_json": fig_json}))
+
+def test_keeps_float64_when_float32_would_lose_precision():
+    prices = np.array([600000.13, 600000.14, 600000.15])
+    fig_json = go.Figure(data=[go.Scatter(x=prices, y=[1, 2, 3])]).to_json()
+    trace = json.loads(to_bdata(fig_json))["data"][0]
+    assert trace["x"]["dtype"] == "f8"
+    assert trace["y"]["dtype"] in ("i1", "u1")
+
+def test_arrow_round_trip(surface_json):
+    fig_json = surface_json()
+    figure = from_arrow(to_arrow(fig_json))
+    original = json.loads(fig_json)
+    assert figure["layout"]["title"] == original["layout"]["title"]
+    assert figure["data"][0]["z"].dtype == np.float32
+    assert np.allclose(figure["data"][0]["z"], decode_typed_array(original["data"][0]["z"]), rtol=1e-6)
+
+def test_compute_formats_share_one_generation(client, calls):
+    body = {"graphType": "IVMap", "parameters": {"Ticker": "AAPL"}}
+    default = client.post("/compute", json=body)
+    assert "plotly_json" in default.get_json()
+    compact = client.post("/compute", json=dict(body, format="bdata"))
+    assert compact.mimetype == "application/vnd.plotly.v1+json"
+    assert json.loads(compact.data)["data"][0]["z"]["dtype"] == "f4"
+    arrow = client.post("/compute", json=body, headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert from_arrow(arrow.data)["data"][0]["z"].shape == (50, 50)
+    assert calls == ["IVMap"]
+    assert client.post("/compute", json=dict(body, format="csv")).status_code == 400
+
+def test_disk_cache_round_trips_bytes(tmp_path):
+    cache = compute_cache.ResultCache(disk=compute_cache.DiskCache(str(tmp_path)))
+    cache.set("a", b"\x00arrow")
+    cache.set("b", "text")
+    fresh = compute_cache.ResultCache(disk=compute_cache.DiskCache(str(tmp_path)))
+    assert fresh.get("a") == b"\x00arrow" and fresh.get("b") == "text"
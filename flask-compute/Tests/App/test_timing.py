@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+import time
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import timing
+
+def test_spans_only_recorded_when_sampled():
+    with timing.tracing() as trace:
+        for _ in range(2):
+            with timing.span("solve"):
+                time.sleep(0.005)
+        timing.merge({"db": 0.25})
+    assert list(trace.spans) == ["solve", "db"]
+    assert trace.spans["solve"] >= 0.01 and trace.spans["db"] == 0.25
+    assert timing.server_timing(trace).startswith("solve;dur=")
+    with timing.tracing(sample=False) as trace:
+        with timing.span("solve"):
+            pass
+    assert trace is None and timing.current() is None
+    assert not timing.sampled(0.0) and timing.sampled(1.0)
+
+def test_histogram_buckets_are_cumulative():
+    histograms = timing.Histograms(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.05, 0.5):
+        histograms.observe("solve", "IVMap", seconds)
+    text = histograms.render()
+    assert 'compute_stage_seconds_bucket{stage="solve",graph_type="IVMap",le="0.01"} 1' in text
+    assert 'compute_stage_seconds_bucket{stage="solve",graph_type="IVMap",le="0.1"} 2' in text
+    assert 'compute_stage_seconds_bucket{stage="solve",graph_type="IVMap",le="+Inf"} 3' in text
+    assert 'compute_stage_seconds_count{stage="solve",graph_type="IVMap"} 3' in text
+
+@pytest.fixture
+def fake_generate():
+    def fake_generate(graph_type, parameters):
+        with timing.span("solve"):
+            time.sleep(0.002)
+        return json.dumps({"data": [{"type": "surface", "z": [[0.1, 0.2], [0.3, 0.4]]}], "layout": {}})
+    return fake_generate
+
+def test_compute_reports_server_timing_and_metrics(client, monkeypatch):
+    body = {"graphType": "IVMap", "parameters": {"Ticker": "AAPL"}}
+    header = client.post("/compute", json=body).headers["Server-Timing"]
+    stages = [part.split(";")[0] for part in header.split(", ")]
+    # Spans recorded on the compute worker are merged into the request.
+    assert stages == ["cache", "compute", "solve", "total"]
+    metrics = client.get("/metrics")
+    assert "Server-Timing" not in metrics.headers
+    assert 'compute_stage_seconds_count{stage="solve",graph_type="IVMap"} 1' in metrics.data.decode()
+    monkeypatch.setattr(timing, "sampled", lambda sample_rate=0.0: False)
+    assert "Server-Timing" not in client.post("/compute", json=body).headers
@@ -0,0 +1,30 @@
+import os
+import sys
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import app as app_module
+import warmup
+import workers
+
+def test_ready_flips_after_warmup(monkeypatch):
+    monkeypatch.setitem(warmup._state, "ready", False)
+    http = app_module.app.test_client()
+    assert http.get("/health/ready").status_code == 503
+    warmup.start_warmup(graph_types="IVMap,USFixedIncomeYield", pool=workers.ComputePool(workers=0)).join()
+    response = http.get("/health/ready")
+    assert response.status_code == 200
+    status = response.get_json()
+    assert status["graph_types"] == ["IVMap", "USFixedIncomeYield"]
+    assert "IVSurface.IVmap" in status["imports"] and "OrderFlowCanyon.main" not in status["imports"]
+    assert {"database", "compute_pool", "IVMap", "USFixedIncomeYield"} <= set(status["steps"])
+
+def test_synthetic_order_flow_and_config():
+    warmup.warm_order_flow()
+    assert warmup.parse_graph_types(" IVMap , ") == ["IVMap"]
+    with pytest.raises(ValueError):
+        warmup.parse_graph_types("IVMap,Heatmap")
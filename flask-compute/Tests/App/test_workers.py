@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+import time
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from workers import COMPUTE_LIMITS, ComputePool, ComputeTimeout, parse_limits
+
+def slow_graph(graph_type, parameters):
+    time.sleep(parameters.get("sleep", 0.2))
+    return f"{graph_type}:{parameters.get('Ticker')}"
+
+def test_identical_requests_share_one_computation():
+    calls = []
+    def graph(graph_type, parameters):
+        calls.append(graph_type)
+        return slow_graph(graph_type, parameters)
+    pool = ComputePool(workers=0, limits={"IVMap": 4})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.run("k", "IVMap", {"Ticker": "AAPL"}, graph)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["IVMap:AAPL"] * 5
+    assert calls == ["IVMap"]
+    assert pool.run("k", "IVMap", {"Ticker": "AAPL", "sleep": 0}, graph) and len(calls) == 2
+
+def test_limits_and_timeouts():
+    pool = ComputePool(workers=0, timeout=0.3, limits={"IVMap": 1, "USFixedIncomeYield": 1})
+    def hold_slot():
+        with pytest.raises(ComputeTimeout):
+            pool.run("a", "IVMap", {"sleep": 0.6}, slow_graph)
+    first = threading.Thread(target=hold_slot)
+    first.start()
+    time.sleep(0.05)
+    # The only IVMap slot is busy, but other graph types are not held up.
+    with pytest.raises(ComputeTimeout):
+        pool.run("b", "IVMap", {"sleep": 0}, slow_graph)
+    assert pool.run("c", "USFixedIncomeYield", {"sleep": 0}, slow_graph) == "USFixedIncomeYield:None"
+    with pytest.raises(ComputeTimeout):
+        pool.run("d", "USFixedIncomeYield", {"sleep": 1}, slow_graph)
+    first.join()
+
+def test_process_pool_runs_graphs():
+    pool = ComputePool(workers=1, limits="IVMap=1")
+    try:
+        assert pool.run("k", "IVMap", {"Ticker": "MSFT", "sleep": 0}, slow_graph) == "IVMap:MSFT"
+    finally:
+        pool.shutdown()
+    with pytest.raises(ValueError):
+        parse_limits("Heatmap=2", 4)
+
+@pytest.mark.skipif("COMPUTE_LIMITS" in os.environ, reason="asserts the default limits")
+def test_default_limits_cap_every_chain_solving_type():
+    limits = parse_limits(COMPUTE_LIMITS, 16)
+    assert limits.pop("USFixedIncomeYield") == 16
+    assert set(limits.values()) == {2} and "VannaSurface" in limits
@@ -0,0 +1,324 @@
+"""
+Throughput and peak memory of every compute stage on synthetic data.
+
+    python Tests/Benchmarks/benchmark_suite.py --size medium
+    python Tests/Benchmarks/benchmark_suite.py --size medium --compare latest
+    python Tests/Benchmarks/benchmark_suite.py --size small --stages iv_solve_newton,surface_fit_smile
+
+Each stage is timed `--repeat` times (median reported), then run once more
+under tracemalloc for its peak allocation. Results are written to
+BENCHMARK_RESULTS_DIR (Tests/Benchmarks/results by default) as
+<timestamp>-<commit>-<size>.json. --compare takes one of those files, or
+"latest" for the newest earlier run of the same size, and exits non-zero
+if any stage got slower by more than --tolerance.
+
+Database stages run on SQLite at DATABASE_URL (a temporary file by
+default). Its tables are dropped and reseeded, so never point it at a
+real database.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import partial
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+for path in (root_dir, current_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/pandera_benchmark_suite.db")
+
+import numpy as np
+import synthetic
+
+RESULTS_DIR = os.getenv("BENCHMARK_RESULTS_DIR", os.path.join(current_dir, "results"))
+
+# (expiries, strikes per side), mbp-10 rows, years of yields.
+SIZES = {
+    "tiny": {"chain": (3, 10), "book_rows": 2_000, "yield_days": 60},
+    "small": {"chain": (10, 50), "book_rows": 50_000, "yield_days": 365},
+    "medium": {"chain": (40, 250), "book_rows": 500_000, "yield_days": 3_650},
+    "production": {"chain": (60, 1_000), "book_rows": 2_000_000, "yield_days": 10_950},
+}
+
+class Stage:
+    """
+    A benchmarked callable. `setup(size)` runs once, untimed, and returns
+    (state, items); `run(state)` is what gets timed, processing `items`
+    `unit` per call.
+    """
+    def __init__(self, name, unit, setup, run, teardown=None):
+        self.name = name
+        self.unit = unit
+        self.setup = setup
+        self.run = run
+        self.teardown = teardown
+
+def drop_tables(state=None):
+    from db import engine, Base
+    Base.metadata.drop_all(bind=engine)
+
+def book_window(rows):
+    import pandas as pd
+    start = pd.Timestamp("2025-01-02 14:30", tz="UTC")
+    return start, start + pd.Timedelta(milliseconds=rows)
+
+# Setups
+
+def chain_setup(size):
+    chain = synthetic.option_chain(*size["chain"])
+    return chain, len(chain)
+
+def points_setup(size):
+    from IVSurface.BSMCompute import solve_chain
+    ivs, mny, ttes, _ = solve_chain(synthetic.option_chain(*size["chain"]), synthetic.RATE)
+    return (ivs, mny, ttes), len(ivs)
+
+def options_db_setup(size):
+    from db import engine, Base, OptionData, UnderlyingData
+    drop_tables()
+    Base.metadata.create_all(bind=engine)
+    options, underlying = synthetic.option_rows(synthetic.option_chain(*size["chain"]))
+    with engine.begin() as conn:
+        conn.execute(UnderlyingData.__table__.insert(), underlying)
+        for start in range(0, len(options), 50_000):
+            conn.execute(OptionData.__table__.insert(), options[start:start + 50_000])
+    return None, len(options)
+
+def yields_db_setup(size):
+    from db import engine, Base, YieldData
+    drop_tables()
+    Base.metadata.create_all(bind=engine)
+    rows = synthetic.yield_rows(size["yield_days"])
+    with engine.begin() as conn:
+        conn.execute(YieldData.__table__.insert(), rows)
+    return None, len(rows)
+
+def book_frame_setup(size):
+    # create_orderbook works on one in-memory frame; cap it at 1M rows.
+    rows = min(size["book_rows"], 1_000_000)
+    frame = next(synthetic.mbp10_frames(rows, chunk_rows=rows))
+    return frame.reset_index(), rows // 10
+
+def book_frames_setup(size):
+    # Generated up front so only bucketing is timed (about 250 bytes a row).
+    frames = list(synthetic.mbp10_frames(size["book_rows"]))
+    return frames, size["book_rows"]
+
+def bucketed_book_setup(size):
+    from OrderFlowCanyon.downsample import bucket_orderbook
+    rows = size["book_rows"]
+    return bucket_orderbook(synthetic.mbp10_frames(rows), *book_window(rows)), 1
+
+def yield_surface_setup(size):
+    days = size["yield_days"]
+    z = 4 + np.cumsum(np.random.default_rng(0).normal(0, 0.03, (days, 4)), axis=0)
+    dates = np.arange(np.datetime64("2000-01-01"), np.datetime64("2000-01-01") + days)
+    return (np.array([3, 60, 120, 360]), dates, z), 1
+
+def iv_grid_setup(size):
+    from IVSurface.IVmap import grid_surface
+    points, _ = points_setup(size)
+    return grid_surface(*points), 1
+
+def iv_figure_setup(size):
+    from IVSurface.IVmap import surface_figure_json
+    grid, _ = iv_grid_setup(size)
+    return surface_figure_json("SYN", *grid), 1
+
+# Timed runs
+
+def solve(chain, solver):
+    from IVSurface.BSMCompute import solve_chain
+    solve_chain(chain, synthetic.RATE, solver=solver)
+
+def fit(points, method):
+    from IVSurface import SurfaceFit
+    from IVSurface.IVmap import grid_surface
+    # Cold fits: the triangulation cache would otherwise serve repeats.
+    SurfaceFit._triangulations.clear()
+    grid_surface(*points, method=method)
+
+def load_chain(state):
+    from IVSurface.DataSourcing import load_chain
+    load_chain("SYN")
+
+def iv_surface(state):
+    from IVSurface.IVmap import generate_iv_surface_html
+    generate_iv_surface_html("SYN", None, None)
+
+def snapshots(frame):
+    from OrderFlowCanyon.utils import create_orderbook
+    create_orderbook(frame)
+
+def buckets(frames):
+    from OrderFlowCanyon.downsample import bucket_orderbook
+    bucket_orderbook(frames, *book_window(sum(len(frame) for frame in frames)))
+
+def yield_data(state):
+    from datetime import date
+    from YieldCurve.data import get_yield_data
+    get_yield_data(date(1900, 1, 1), date.today())
+
+def iv_figure(grid):
+    from IVSurface.IVmap import surface_figure_json
+    surface_figure_json("SYN", *grid)
+
+def order_flow_figure(book):
+    from OrderFlowCanyon.main import order_flow_figure_json
+    order_flow_figure_json("SYN", *book)
+
+def yield_figure(xyz):
+    from YieldCurve.main import yield_curve_figure_json
+    yield_curve_figure_json(*xyz)
+
+def payload(fig_json, fmt):
+    from payloads import encode_payload
+    encode_payload(fig_json, fmt)
+
+STAGES = [
+    Stage("iv_solve_newton", "options", chain_setup, partial(solve, solver="newton")),
+    Stage("iv_solve_rational", "options", chain_setup, partial(solve, solver="rational")),
+    Stage("surface_fit_smile", "points", points_setup, partial(fit, method="smile")),
+    Stage("surface_fit_delaunay", "points", points_setup, partial(fit, method="delaunay")),
+    Stage("surface_fit_griddata", "points", points_setup, partial(fit, method="griddata")),
+    Stage("load_chain_sqlite", "options", options_db_setup, load_chain, drop_tables),
+    Stage("iv_surface_end_to_end", "options", options_db_setup, iv_surface, drop_tables),
+    Stage("orderbook_snapshots", "snapshots", book_frame_setup, snapshots),
+    Stage("orderbook_buckets", "records", book_frames_setup, buckets),
+    Stage("yield_data_sqlite", "rows", yields_db_setup, yield_data, drop_tables),
+    Stage("figure_iv_surface", "figures", iv_grid_setup, iv_figure),
+    Stage("figure_order_flow", "figures", bucketed_book_setup, order_flow_figure),
+    Stage("figure_yield_curve", "figures", yield_surface_setup, yield_figure),
+    Stage("payload_bdata", "figures", iv_figure_setup, partial(payload, fmt="bdata")),
+    Stage("payload_arrow", "figures", iv_figure_setup, partial(payload, fmt="arrow")),
+]
+
+def measure(bench, size, repeat):
+    state, items = bench.setup(size)
+    try:
+        bench.run(state)  # warm caches and imports
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            bench.run(state)
+            times.append(time.perf_counter() - started)
+        tracemalloc.start()
+        try:
+            bench.run(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        if bench.teardown:
+            bench.teardown(state)
+    median = statistics.median(times)
+    return {
+        "items": int(items),
+        "unit": bench.unit,
+        "repeat": repeat,
+        "median_s": median,
+        "min_s": min(times),
+        "throughput": items / median if median > 0 else float("inf"),
+        "peak_bytes": peak,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_suite(size_name="small", stages=None, repeat=5):
+    if not os.environ["DATABASE_URL"].startswith("sqlite"):
+        raise SystemExit("The benchmark suite reseeds its database; set DATABASE_URL to a SQLite URL.")
+    size = SIZES[size_name]
+    selected = [bench for bench in STAGES if not stages or bench.name in stages]
+    unknown = set(stages or ()) - {bench.name for bench in STAGES}
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)}")
+    results = {}
+    for bench in selected:
+        results[bench.name] = measure(bench, size, repeat)
+        print(format_row(bench.name, results[bench.name]))
+    return {
+        "meta": {
+            "size": size_name,
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+def format_row(name, result):
+    return (f"{name:<24} {result['median_s'] * 1000:>10.2f} ms {result['throughput']:>14,.0f} {result['unit']}/s"
+            f" {result['peak_bytes'] / 2**20:>9.1f} MiB peak")
+
+def save(report, directory=RESULTS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    meta = report["meta"]
+    path = os.path.join(directory, f"{meta['timestamp']}-{meta['commit']}-{meta['size']}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+def latest(size_name, directory=RESULTS_DIR, exclude=None):
+    paths = sorted(p for p in glob.glob(os.path.join(directory, f"*-{size_name}.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+def compare(report, baseline, tolerance=1.25):
+    """
+    Print current vs baseline median times and return the stages slower
+    than `tolerance` times their baseline.
+    """
+    regressions = []
+    print(f"\n{'stage':<24} {'baseline':>12} {'current':>12} {'ratio':>7}  (baseline {baseline['meta']['commit']})")
+    for name, result in report["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["median_s"] / before["median_s"] if before["median_s"] > 0 else float("inf")
+        flag = "  SLOWER" if ratio > tolerance else ""
+        print(f"{name:<24} {before['median_s'] * 1000:>9.2f} ms {result['median_s'] * 1000:>9.2f} ms {ratio:>6.2f}x{flag}")
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", choices=list(SIZES), default="small")
+    parser.add_argument("--stages", help="comma-separated stage names (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compare", help='results file, or "latest" for the last run of this size')
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    parser.add_argument("--list", action="store_true", help="list stage names and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(bench.name for bench in STAGES))
+        raise SystemExit(0)
+    report = run_suite(args.size, args.stages.split(",") if args.stages else None, args.repeat)
+    path = save(report)
+    print(f"\nSaved {path}")
+    if args.compare:
+        baseline_path = latest(args.size, exclude=path) if args.compare == "latest" else args.compare
+        if baseline_path is None:
+            print("No earlier run to compare with.")
+        else:
+            with open(baseline_path) as f:
+                regressions = compare(report, json.load(f), args.tolerance)
+            if regressions:
+                print(f"\nRegressed beyond {args.tolerance}x: {', '.join(regressions)}")
+                raise SystemExit(1)
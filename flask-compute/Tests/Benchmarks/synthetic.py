@@ -0,0 +1,93 @@
+"""
+Deterministic synthetic inputs for the benchmark suite: option chains
+priced off a known vol surface, mbp-10 books and Treasury yield
+histories. The same (size, seed) always gives the same data.
+"""
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+
+from IVSurface.BSMCompute import black_scholes_batch
+from IVSurface.DataSourcing import ChainArrays
+from OrderFlowCanyon.utils import DEPTH, level_columns
+
+RATE = 0.042
+YIELD_SERIES = (("3month", "^IRX"), ("5year", "^FVX"), ("10year", "^TNX"), ("30year", "^TYX"))
+
+def true_iv(mny, ttes):
+    k = np.log(mny)
+    return 0.18 + 0.02 * ttes + (0.12 * k ** 2 - 0.04 * k) / np.sqrt(ttes)
+
+def option_chain(expiries, strikes, spot=100.0, seed=0):
+    """
+    ChainArrays of `expiries` x `strikes` calls and as many puts, quoted
+    with a 2% bid/ask spread around the Black-Scholes price on true_iv.
+    """
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(date.today(), "D")
+    days = np.unique(np.geomspace(7, 730, expiries).astype(int))
+    days = np.concatenate([days, days[-1] + np.arange(1, expiries - len(days) + 1)])
+    expiration = np.repeat(today + days.astype("timedelta64[D]"), 2 * strikes)
+    T = np.repeat(days / 365.0, 2 * strikes)
+    width = np.repeat(0.15 + 0.35 * np.sqrt(days / 365.0), 2 * strikes)
+    strike = spot * np.exp(width * rng.uniform(-1, 1, len(T)))
+    is_call = np.tile(np.repeat([True, False], strikes), expiries)
+    sigma = true_iv(np.where(is_call, spot / strike, strike / spot), T)
+    price = black_scholes_batch(spot, strike, T, RATE, sigma, is_call)[0]
+    return ChainArrays(ticker="SYN", spot=spot, expiration=expiration, T=T, strike=strike,
+                       bid=price * 0.99, ask=price * 1.01, last=price, is_call=is_call)
+
+def option_rows(chain, fetch_date=None):
+    """
+    OptionData/UnderlyingData insert rows for a ChainArrays.
+    Returns a tuple: (option rows, underlying rows)
+    """
+    fetch_date = fetch_date or datetime.combine(date.today(), datetime.min.time())
+    expiration = chain.expiration.astype(object)
+    options = [
+        {"ticker": chain.ticker, "expiration_date": expiration[i], "option_type": "calls" if chain.is_call[i] else "puts",
+         "strike": float(chain.strike[i]), "bid": float(chain.bid[i]), "ask": float(chain.ask[i]),
+         "last_price": float(chain.last[i]), "fetch_date": fetch_date}
+        for i in range(len(chain))
+    ]
+    underlying = [{"ticker": chain.ticker, "date": date.today(), "close": chain.spot, "fetch_date": fetch_date}]
+    return options, underlying
+
+def mbp10_frames(rows, chunk_rows=250_000, depth=DEPTH, start="2025-01-02 14:30", seed=0):
+    """
+    mbp-10 frames indexed by ts_recv, like OrderBookStore.iter_frames
+    output: a random-walk mid with levels a cent apart, one record per
+    millisecond. Generated a chunk at a time, so production sizes do not
+    need the whole book in memory.
+    """
+    rng = np.random.default_rng(seed)
+    mid = 250.0
+    start = pd.Timestamp(start, tz="UTC")
+    for offset in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - offset)
+        path = mid + np.cumsum(rng.normal(0, 0.005, n))
+        mid = float(path[-1])
+        index = pd.DatetimeIndex(start + pd.to_timedelta(np.arange(offset, offset + n), unit="ms"), name="ts_recv")
+        columns = {"ts_in_delta": rng.integers(1_000, 200_000, n).astype(np.int32)}
+        for field, sign in (("bid_px", -1), ("ask_px", 1)):
+            for i, column in enumerate(level_columns(field, depth)):
+                columns[column] = np.round(path + sign * 0.01 * (i + 1), 2)
+        for field in ("bid_sz", "ask_sz"):
+            for column in level_columns(field, depth):
+                columns[column] = rng.integers(1, 1_000, n).astype(np.uint32)
+        yield pd.DataFrame(columns, index=index)
+
+def yield_rows(days, seed=0):
+    """
+    YieldData insert rows: `days` daily closes for each Treasury series,
+    as a random walk around a term structure.
+    """
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    fetch_date = datetime.utcnow()
+    rows = []
+    for level, (label, ticker) in zip((4.0, 4.2, 4.4, 4.6), YIELD_SERIES):
+        closes = level + np.cumsum(rng.normal(0, 0.03, days))
+        rows += [{"label": label, "ticker": ticker, "date": today - timedelta(days=d), "close": float(closes[d]),
+                  "fetch_date": fetch_date} for d in range(days)]
+    return rows
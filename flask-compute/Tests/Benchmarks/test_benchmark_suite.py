@@ -0,0 +1,39 @@
+import copy
+import json
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+for path in (root_dir, current_dir):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import numpy as np
+import benchmark_suite
+import synthetic
+from IVSurface.BSMCompute import solve_chain
+
+def test_synthetic_chain_is_deterministic_and_solvable():
+    chain = synthetic.option_chain(4, 20, seed=7)
+    again = synthetic.option_chain(4, 20, seed=7)
+    assert np.array_equal(chain.strike, again.strike) and len(chain) == 160
+    ivs, mny, ttes, _ = solve_chain(chain, synthetic.RATE)
+    # Mid prices are the model prices, so the solver recovers the surface
+    # everywhere but a few low-vega short-dated quotes.
+    assert len(ivs) >= 0.95 * len(chain)
+    error = np.abs(ivs - synthetic.true_iv(mny, ttes))
+    assert np.median(error) < 1e-4 and np.mean(error < 2e-3) >= 0.95
+
+def test_tiny_suite_runs_saves_and_compares(tmp_path):
+    report = benchmark_suite.run_suite("tiny", repeat=1)
+    assert set(report["results"]) == {bench.name for bench in benchmark_suite.STAGES}
+    for result in report["results"].values():
+        assert result["throughput"] > 0 and result["peak_bytes"] > 0
+    path = benchmark_suite.save(report, str(tmp_path))
+    assert benchmark_suite.latest("tiny", str(tmp_path)) == path
+    with open(path) as f:
+        baseline = json.load(f)
+    slower = copy.deepcopy(report)
+    slower["results"]["iv_solve_newton"]["median_s"] *= 2
+    assert benchmark_suite.compare(slower, baseline, tolerance=1.5) == ["iv_solve_newton"]
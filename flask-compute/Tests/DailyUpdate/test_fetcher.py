@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from fetcher import AlphaVantageClient, TokenBucket, run_concurrently
+
+class StubAlphaVantage(BaseHTTPRequestHandler):
+    """
+    Answers like Alpha Vantage after a short delay. The first `throttle`
+    requests get a rate-limit notice and the next `errors` a 503. With a
+    `barrier`, each request is held until that many are in flight at once.
+    """
+    delay = 0.05
+    throttle = 0
+    errors = 0
+    barrier = None
+    calls = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        with self.lock:
+            cls = type(self)
+            cls.calls.append(params)
+            n = len(cls.calls)
+        time.sleep(self.delay)
+        if self.barrier is not None:
+            try:
+                self.barrier.wait()
+            except threading.BrokenBarrierError:
+                return self._reply(500, {})
+        if n <= self.throttle:
+            self._reply(200, {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."})
+        elif n <= self.throttle + self.errors:
+            self._reply(503, {})
+        else:
+            self._reply(200, {"symbol": params.get("symbol"), "data": [{"strike": "100"}]})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub(**attrs):
+    handler = type("Handler", (StubAlphaVantage,), dict(attrs, calls=[]))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler, f"http://127.0.0.1:{server.server_port}/query"
+
+def test_concurrent_fetch_overlaps_requests():
+    tickers = [f"T{i}" for i in range(8)]
+    # Requests only complete once all eight are in flight together.
+    server, handler, url = start_stub(delay=0.0, barrier=threading.Barrier(len(tickers), timeout=5))
+    try:
+        client = AlphaVantageClient("demo", base_url=url, requests_per_minute=6000, retries=0)
+        results = run_concurrently(
+            [(t, lambda t=t: client.query(function="HISTORICAL_OPTIONS", symbol=t)) for t in tickers],
+            max_workers=8
+        )
+    finally:
+        server.shutdown()
+    assert {t: r and r["symbol"] for t, r in results.items()} == {t: t for t in tickers}
+    assert all(call["apikey"] == "demo" for call in handler.calls)
+
+def test_retries_throttle_notices_and_server_errors():
+    server, handler, url = start_stub(delay=0.0, throttle=1, errors=1)
+    try:
+        client = AlphaVantageClient("demo", base_url=url, requests_per_minute=6000, backoff=0.01)
+        data = client.query(function="TIME_SERIES_DAILY", symbol="AAPL")
+    finally:
+        server.shutdown()
+    assert data["symbol"] == "AAPL"
+    assert len(handler.calls) == 3
+
+def test_failed_jobs_are_reported_not_raised():
+    server, handler, url = start_stub(delay=0.0, errors=100)
+    try:
+        client = AlphaVantageClient("demo", base_url=url, requests_per_minute=6000, retries=1, backoff=0.01)
+        results = run_concurrently([("AAPL", lambda: client.query(function="TIME_SERIES_DAILY", symbol="AAPL"))])
+    finally:
+        server.shutdown()
+    assert results == {"AAPL": None}
+    assert len(handler.calls) == 2
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+    def __call__(self):
+        return self.now
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def test_token_bucket_limits_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=50, capacity=1, clock=clock, sleep=clock.sleep)
+    for _ in range(11):
+        bucket.acquire()
+    # One token up front, then ten more at 50 per second.
+    assert len(clock.sleeps) == 10 and abs(clock.now - 0.2) < 1e-9
+    # Tokens accrue while idle, up to the capacity.
+    clock.now += 10
+    bucket.acquire()
+    assert len(clock.sleeps) == 10
+    bucket.acquire()
+    assert len(clock.sleeps) == 11
@@ -0,0 +1,69 @@
+import os
+import sys
+from datetime import date, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from db import engine, Base, SessionLocal, OptionData, YieldData
+import daily_update
+
+TODAY = date.today()
+
+def days_ago(n):
+    return (TODAY - timedelta(days=n)).isoformat()
+
+@pytest.fixture
+def schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_underlying_only_ingests_past_the_watermark(schema):
+    series = {days_ago(n): {"4. close": str(100 + n)} for n in (3, 2)}
+    assert daily_update.update_underlying_data("TEST", {"Time Series (Daily)": series})["inserted"] == 2
+    assert daily_update.get_watermark("underlying", "TEST") == TODAY - timedelta(days=2)
+    # Entries at or before the watermark are not parsed, so a malformed
+    # old entry no longer matters.
+    series = {days_ago(3): {"4. close": "n/a"}, days_ago(2): {}, days_ago(1): {"4. close": "101"}}
+    result = daily_update.update_underlying_data("TEST", {"Time Series (Daily)": series})
+    assert (result["inserted"], result["skipped"]) == (1, 0)
+    assert daily_update.get_watermark("underlying", "TEST") == TODAY - timedelta(days=1)
+
+def test_yields_skip_stored_and_missing_entries(schema):
+    payload = {m: {"data": [{"date": days_ago(n), "value": "4.1"} for n in (2, 3)]}
+               for m in daily_update.YIELDS_INFO.values()}
+    assert daily_update.update_yield_data(payload)["inserted"] == 8
+    payload["3month"]["data"] = [{"date": days_ago(0), "value": "."}, {"date": days_ago(1), "value": "4.2"}] \
+        + payload["3month"]["data"]
+    result = daily_update.update_yield_data(payload)
+    assert (result["inserted"], result["skipped"]) == (1, 0)
+    assert daily_update.get_watermark("yields", "3month") == TODAY - timedelta(days=1)
+    assert daily_update.get_watermark("yields", "5year") == TODAY - timedelta(days=2)
+    session = SessionLocal()
+    try:
+        assert session.query(YieldData).count() == 9
+    finally:
+        session.close()
+
+def test_options_download_is_skipped_once_today_is_stored(schema, monkeypatch):
+    calls = []
+    chain = {"data": [{"type": "call", "expiration": days_ago(-30), "strike": "100", "bid": "1", "ask": "1.2",
+                       "last": "1.1"}]}
+    monkeypatch.setattr(daily_update, "fetch_option_data", lambda ticker: calls.append(ticker) or chain)
+    assert daily_update.update_option_data("TEST")["inserted"] == 1
+    assert daily_update.update_option_data("TEST")["inserted"] == 0
+    assert calls == ["TEST"]
+    # An empty payload does not mark the day as stored.
+    monkeypatch.setattr(daily_update, "fetch_option_data", lambda ticker: calls.append(ticker) or {"data": []})
+    daily_update.update_option_data("OTHER")
+    daily_update.update_option_data("OTHER")
+    assert calls == ["TEST", "OTHER", "OTHER"]
+    session = SessionLocal()
+    try:
+        assert session.query(OptionData).count() == 1
+    finally:
+        session.close()
@@ -0,0 +1,114 @@
+"""
+Seed a synthetic options/underlying/yield dataset and time the hot read
+paths on the original ticker-only indexes and after migrations.upgrade().
+
+    python Tests/Database/benchmark_indexes.py --tickers 50 --days 20
+
+Runs against DATABASE_URL (SQLite file by default) and refuses any other
+backend, since the tables are dropped and reseeded.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/pandera_index_benchmark.db")
+
+from db import engine, Base, OptionData, UnderlyingData, YieldData
+import migrations
+
+def seed(tickers=50, days=20, expiries=12, strikes=40, seed=0):
+    """
+    `days` daily snapshots of `expiries` x `strikes` calls and puts for each
+    of `tickers` symbols, a year of closes per symbol and a year of yields.
+    """
+    rng = np.random.default_rng(seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    today = date.today()
+    symbols = [f"T{i:04d}" for i in range(tickers)]
+    option_rows, underlying_rows, yield_rows = [], [], []
+    for symbol in symbols:
+        spot = float(rng.uniform(20, 500))
+        for d in range(365):
+            underlying_rows.append({"ticker": symbol, "date": today - timedelta(days=d),
+                                    "close": spot * (1 + 0.01 * rng.standard_normal()), "fetch_date": datetime.utcnow()})
+        for d in range(days):
+            fetch_date = datetime.combine(today - timedelta(days=d), datetime.min.time())
+            for e in range(expiries):
+                expiration = today + timedelta(days=7 + 30 * e - d)
+                for k in np.linspace(0.5, 1.5, strikes) * spot:
+                    for option_type in ("calls", "puts"):
+                        mid = float(rng.uniform(0.1, 50))
+                        option_rows.append({
+                            "ticker": symbol, "expiration_date": expiration, "option_type": option_type,
+                            "strike": float(k), "bid": mid * 0.98, "ask": mid * 1.02, "last_price": mid,
+                            "fetch_date": fetch_date
+                        })
+    for label, ticker in (("3month", "^IRX"), ("5year", "^FVX"), ("10year", "^TNX"), ("30year", "^TYX")):
+        for d in range(3650):
+            yield_rows.append({"label": label, "ticker": ticker, "date": today - timedelta(days=d),
+                               "close": float(rng.uniform(1, 5)), "fetch_date": datetime.utcnow()})
+    with engine.begin() as conn:
+        for model, rows in ((OptionData, option_rows), (UnderlyingData, underlying_rows), (YieldData, yield_rows)):
+            for start in range(0, len(rows), 50000):
+                conn.execute(model.__table__.insert(), rows[start:start + 50000])
+    print(f"Seeded {len(option_rows)} option, {len(underlying_rows)} underlying and {len(yield_rows)} yield rows")
+    return symbols
+
+def drop_to_original_schema():
+    """
+    Drop the hot-path and unique indexes, leaving only the per-column
+    id/ticker indexes the tables originally had.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in migrations.HOT_PATH_INDEXES or index.unique:
+                index.drop(bind=engine, checkfirst=True)
+
+def time_queries(symbols, repeat=20):
+    """
+    Median wall time in ms of each hot query, cycling through `symbols`.
+    """
+    timings = {}
+    with engine.connect() as conn:
+        for name in migrations.hot_queries():
+            samples = []
+            for i in range(repeat):
+                stmt = migrations.hot_queries(symbols[i % len(symbols)])[name]
+                start = time.perf_counter()
+                conn.execute(stmt).fetchall()
+                samples.append((time.perf_counter() - start) * 1000)
+            timings[name] = statistics.median(samples)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if not os.environ["DATABASE_URL"].startswith("sqlite"):
+        raise SystemExit("The index benchmark reseeds its database; set DATABASE_URL to a SQLite URL.")
+
+    symbols = seed(args.tickers, args.days)
+    drop_to_original_schema()
+    before = time_queries(symbols, args.repeat)
+    print("Plans with the original ticker-only indexes:")
+    migrations.print_plans(symbols[0])
+    migrations.upgrade()
+    after = time_queries(symbols, args.repeat)
+    print("Plans with hot-path indexes:")
+    migrations.print_plans(symbols[0])
+
+    print(f"{'query':<20}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in before:
+        print(f"{name:<20}{before[name]:>12.2f}{after[name]:>12.2f}{before[name] / after[name]:>9.1f}x")
@@ -0,0 +1,63 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from sqlalchemy import event
+from db import engine, Base, SessionLocal, UnderlyingData, bulk_upsert
+import daily_update
+
+TODAY = date.today()
+FETCH = datetime.combine(TODAY, datetime.min.time())
+KEY = ["ticker", "date"]
+
+def closes(*pairs):
+    return [{"ticker": "TEST", "date": TODAY - timedelta(days=n), "close": close, "fetch_date": FETCH}
+            for n, close in pairs]
+
+def stored():
+    session = SessionLocal()
+    try:
+        return {(row.date - TODAY).days: float(row.close) for row in session.query(UnderlyingData)}
+    finally:
+        session.close()
+
+@pytest.fixture
+def schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_conflicting_rows_are_skipped(schema):
+    assert bulk_upsert(UnderlyingData, closes((1, 100.0), (2, 101.0)), KEY) == (2, 0)
+    # Duplicates within one call count as skipped too.
+    assert bulk_upsert(UnderlyingData, closes((1, 200.0), (3, 102.0), (3, 103.0)), KEY) == (1, 2)
+    assert stored() == {-1: 100.0, -2: 101.0, -3: 103.0}
+
+def test_update_columns_overwrite_conflicting_rows(schema):
+    bulk_upsert(UnderlyingData, closes((1, 100.0), (2, 101.0)), KEY)
+    assert bulk_upsert(UnderlyingData, closes((1, 200.0), (3, 102.0)), KEY, update_columns=["close"]) == (2, 0)
+    assert stored() == {-1: 200.0, -2: 101.0, -3: 102.0}
+
+def test_rows_are_sent_in_batches(schema):
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append(parameters)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        written = bulk_upsert(UnderlyingData, closes(*((n, 100.0 + n) for n in range(5))), KEY, batch_size=2)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert written == (5, 0) and len(stored()) == 5
+    # Three batches of at most two rows, four columns each.
+    assert [len(parameters) for parameters in statements] == [8, 8, 4]
+
+def test_ingest_reports_inserted_and_skipped(schema):
+    daily_update.ingest(UnderlyingData, closes((1, 100.0)), KEY, "TEST")
+    result = daily_update.ingest(UnderlyingData, closes((1, 100.0), (2, 101.0)), KEY, "TEST")
+    assert result["table"] == "underlying_data"
+    assert (result["inserted"], result["skipped"]) == (1, 1) and result["seconds"] >= 0
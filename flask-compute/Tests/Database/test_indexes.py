@@ -0,0 +1,41 @@
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from sqlalchemy import text
+from db import engine, Base
+import migrations
+
+@pytest.fixture
+def schema():
+    Base.metadata.create_all(bind=engine)
+    migrations.upgrade()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.mark.skipif(engine.dialect.name != "sqlite", reason="asserts SQLite plan text")
+def test_hot_queries_use_composite_indexes(schema):
+    plans = {name: " ".join(migrations.explain(stmt)) for name, stmt in migrations.hot_queries().items()}
+    assert "ix_option_data_ticker_fetch (ticker=? AND fetch_date=?" in plans["option_chain"]
+    assert "ix_option_data_ticker_fetch" in plans["option_version"]
+    assert "SCAN option_data" not in plans["option_chain"] + plans["option_version"]
+    assert "uq_underlying_data_ticker_date" in plans["underlying_price"]
+    assert "TEMP B-TREE" not in plans["underlying_price"]
+    assert "ix_yield_data_date" in plans["yield_range"]
+
+def test_upgrade_is_idempotent(schema):
+    assert migrations.upgrade() == []
+    assert sorted(migrations.downgrade()) == sorted(migrations.HOT_PATH_INDEXES)
+    assert sorted(migrations.upgrade()) == sorted(migrations.HOT_PATH_INDEXES)
+
+def test_upgrade_drops_retired_indexes(schema):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_option_data_ticker_type_expiration "
+                          "ON option_data (ticker, option_type, expiration_date)"))
+    migrations.upgrade()
+    assert "ix_option_data_ticker_type_expiration" not in migrations._existing_indexes("option_data")
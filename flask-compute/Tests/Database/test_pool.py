@@ -0,0 +1,76 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from sqlalchemy import create_engine, text
+import db
+from db import engine, Base, SessionLocal, OptionData, UnderlyingData
+from IVSurface.DataSourcing import get_underlying_price, load_chain
+
+@pytest.fixture
+def schema():
+    Base.metadata.create_all(bind=engine)
+    today = date.today()
+    fetch = datetime.combine(today, datetime.min.time())
+    session = SessionLocal()
+    session.add(UnderlyingData(ticker="TEST", date=today, close=100.0, fetch_date=fetch))
+    session.add(OptionData(ticker="TEST", expiration_date=today + timedelta(days=30), option_type="calls",
+                           strike=100.0, bid=1.0, ask=1.2, last_price=1.1, fetch_date=fetch))
+    session.commit()
+    session.close()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def checkouts():
+    return db.pool_metrics.counts.get(("primary", "checkout"), 0)
+
+def read_all():
+    db.get_data_version("TEST")
+    load_chain("TEST")
+    return get_underlying_price("TEST")
+
+def test_request_scope_shares_one_connection(schema):
+    before = checkouts()
+    read_all()
+    assert checkouts() - before == 3
+    before = checkouts()
+    with db.request_scope():
+        assert read_all() == 100.0
+        with db.read_connection() as conn:
+            # No transaction is left open between reads.
+            assert not conn.in_transaction()
+        db.release_connection()
+        db.get_data_version("TEST")
+    assert checkouts() - before == 2
+
+def test_reads_route_to_replica_unless_primary_requested(schema, tmp_path, monkeypatch):
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    with replica.begin() as conn:
+        conn.execute(text("CREATE TABLE marker (name TEXT)"))
+        conn.execute(text("INSERT INTO marker VALUES ('replica')"))
+    monkeypatch.setattr(db, "read_engine", replica)
+    with db.request_scope():
+        with db.read_connection() as conn:
+            assert conn.execute(text("SELECT name FROM marker")).scalar() == "replica"
+        with db.primary_reads(), db.read_connection() as conn:
+            assert conn.execute(text("SELECT count(*) FROM underlying_data")).scalar() == 1
+    replica.dispose()
+
+def test_pool_settings_and_metrics(monkeypatch):
+    captured = {}
+    monkeypatch.setattr(db, "create_engine", lambda url, **kwargs: captured.update(kwargs))
+    db.make_engine("postgresql://user@db/pandera")
+    assert captured == dict(pool_size=db.DB_POOL_SIZE, max_overflow=db.DB_MAX_OVERFLOW,
+                            pool_timeout=db.DB_POOL_TIMEOUT, pool_recycle=db.DB_POOL_RECYCLE,
+                            pool_pre_ping=db.DB_POOL_PRE_PING)
+    with db.read_connection() as conn:
+        conn.execute(text("SELECT 1"))
+    text_metrics = db.pool_metrics.render()
+    assert 'db_pool_events_total{pool="primary",event="checkout"}' in text_metrics
+    assert 'db_pool_wait_seconds_count{pool="primary",operation="checkout"}' in text_metrics
@@ -0,0 +1,73 @@
+"""
+Latency and fit error of the IV surface fits against a known surface.
+
+    python Tests/IVSurface/benchmark_surface_fit.py
+
+Quotes are sampled from a smooth smile/term-structure surface with noise,
+on realistic chains (strikes clustered around the money, more of them at
+short expiries), then gridded by each SurfaceFit backend.
+"""
+import os
+import statistics
+import sys
+import time
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from IVSurface import SurfaceFit
+from IVSurface.IVmap import grid_surface
+
+def true_iv(mny, ttes):
+    k = np.log(mny)
+    return 0.18 + 0.02 * ttes + (0.12 * k ** 2 - 0.04 * k) / np.sqrt(ttes)
+
+def synthetic_chain(expiries=12, strikes=60, noise=0.003, seed=0):
+    rng = np.random.default_rng(seed)
+    ttes = np.geomspace(7 / 365, 2.0, expiries)
+    mny, tte = [], []
+    for t in ttes:
+        width = 0.15 + 0.35 * np.sqrt(t)
+        # Shorter expiries list a narrower strike range.
+        k = rng.uniform(-width, width, 2 * strikes)
+        mny.append(np.exp(k))
+        tte.append(np.full(len(k), t))
+    mny, tte = np.concatenate(mny), np.concatenate(tte)
+    ivs = true_iv(mny, tte) + rng.normal(0, noise, len(mny))
+    return ivs, mny, tte
+
+def measure(method, chain, size=50, repeat=5, warm=True):
+    ivs, mny, ttes = chain
+    samples = []
+    for _ in range(repeat):
+        if not warm:
+            SurfaceFit._triangulations.clear()
+        start = time.perf_counter()
+        grid_mny, grid_ttes, grid_ivs = grid_surface(ivs, mny, ttes, size=size, method=method)
+        samples.append((time.perf_counter() - start) * 1000)
+    # Error is scored inside the quotes' convex hull only; beyond it every
+    # fit is extrapolating.
+    inside = SurfaceFit.get_triangulation(mny, ttes).delaunay.find_simplex(
+        SurfaceFit.get_triangulation(mny, ttes).scale(grid_mny, grid_ttes)
+    ).reshape(grid_mny.shape) >= 0
+    error = (grid_ivs - true_iv(grid_mny, grid_ttes))[inside]
+    return {
+        "ms": statistics.median(samples),
+        "nan": np.isnan(grid_ivs).mean(),
+        "rmse": np.sqrt(np.nanmean(error ** 2)),
+        "max": np.nanmax(np.abs(error)),
+    }
+
+
+if __name__ == "__main__":
+    for label, chain in (("12 x 120 quotes", synthetic_chain()), ("40 x 1000 quotes", synthetic_chain(40, 500))):
+        print(label)
+        print(f"  {'fit':<18}{'ms':>9}{'nan %':>8}{'rmse':>10}{'max err':>10}  (error inside the hull)")
+        for name, method, warm in (("griddata", "griddata", True), ("delaunay (cold)", "delaunay", False),
+                                   ("delaunay (warm)", "delaunay", True), ("smile", "smile", True)):
+            r = measure(method, chain, warm=warm)
+            print(f"  {name:<18}{r['ms']:>9.2f}{100 * r['nan']:>8.1f}{r['rmse']:>10.4f}{r['max']:>10.4f}")
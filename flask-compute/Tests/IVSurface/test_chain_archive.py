@@ -0,0 +1,84 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from db import engine, Base, SessionLocal, OptionData, UnderlyingData
+from IVSurface import ChainArchive
+from IVSurface.ChainArchive import archive_option_data, archived_days, load_archived_chain, partition_path
+
+TODAY = date.today()
+DAYS = (TODAY - timedelta(days=10), TODAY - timedelta(days=3))
+
+@pytest.fixture
+def history(tmp_path):
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    for i, day in enumerate(DAYS):
+        fetch = datetime.combine(day, datetime.min.time())
+        session.add(UnderlyingData(ticker="TEST", date=day, close=100.0 + i, fetch_date=fetch))
+        for days in (5, 30, 90):
+            for option_type in ("calls", "puts"):
+                for strike in (90.0, 100.0, 110.0):
+                    session.add(OptionData(ticker="TEST", expiration_date=day + timedelta(days=days),
+                                           option_type=option_type, strike=strike, bid=1.0 + i, ask=1.2 + i,
+                                           last_price=1.1 + i, fetch_date=fetch))
+    session.commit()
+    session.close()
+    yield str(tmp_path)
+    Base.metadata.drop_all(bind=engine)
+
+def test_archive_is_partitioned_and_sorted_with_statistics(history, monkeypatch):
+    monkeypatch.setattr(ChainArchive, "ARCHIVE_ROW_GROUP_ROWS", 6)
+    archive_option_data(root=history)
+    assert archived_days("TEST", history) == list(DAYS)
+    path = os.path.join(partition_path("TEST", DAYS[0], history), "part-0.parquet")
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_rows == 18 and metadata.num_row_groups == 3
+    stats = [metadata.row_group(i).column(0).statistics for i in range(3)]
+    # Sorted by expiry, so each row group covers one expiry.
+    assert [(s.min, s.max) for s in stats] == [(DAYS[0] + timedelta(days=d),) * 2 for d in (5, 30, 90)]
+    # Only the matching partition is a candidate fragment.
+    dataset = ds.dataset(history, schema=ChainArchive.DATASET_SCHEMA, format="parquet",
+                         partitioning=ChainArchive.PARTITIONING)
+    fragments = list(dataset.get_fragments(filter=ds.field("fetch_date") == DAYS[1]))
+    assert len(fragments) == 1 and "fetch_date=" + DAYS[1].isoformat() in fragments[0].path
+
+def test_load_as_of_reads_latest_snapshot_before_the_day(history, monkeypatch):
+    archive_option_data(root=history)
+    opened, dataset = [], ds.dataset
+    def spy(source, **kwargs):
+        opened.append(source)
+        return dataset(source, **kwargs)
+    monkeypatch.setattr(ds, "dataset", spy)
+    chain = load_archived_chain("TEST", DAYS[0] + timedelta(days=6), root=history)
+    # The first snapshot, without the expiry that had passed by then.
+    assert chain.spot == 100.0 and len(chain) == 12
+    assert np.allclose(chain.bid, 1.0)
+    assert np.allclose(np.unique(chain.T * 365), [24, 84])
+    # Only the chosen snapshot's file is opened, not the whole archive.
+    assert opened == [os.path.join(partition_path("TEST", DAYS[0], history), "part-0.parquet")]
+    calls = load_archived_chain("TEST", DAYS[1], contract_types=("calls",),
+                                end_date=(DAYS[1] + timedelta(days=30)).isoformat(), root=history)
+    assert calls.spot == 101.0 and len(calls) == 6 and calls.is_call.all()
+    with pytest.raises(ValueError):
+        load_archived_chain("TEST", DAYS[0] - timedelta(days=1), root=history)
+
+def test_prune_keeps_recent_and_unarchived_rows(history):
+    archive_option_data(root=history, retention_days=5)
+    session = SessionLocal()
+    try:
+        remaining = {fetch.date() for (fetch,) in session.query(OptionData.fetch_date).distinct()}
+    finally:
+        session.close()
+    assert remaining == {DAYS[1]}
+    # Archived rows stay readable after they leave the database.
+    assert len(load_archived_chain("TEST", DAYS[0], root=history)) == 18
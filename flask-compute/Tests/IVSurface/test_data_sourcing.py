@@ -0,0 +1,63 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from sqlalchemy import event
+from db import engine, Base, SessionLocal, OptionData, UnderlyingData
+from IVSurface.DataSourcing import load_chain
+
+@pytest.fixture
+def chain():
+    Base.metadata.create_all(bind=engine)
+    today = date.today()
+    fetch = datetime.combine(today, datetime.min.time())
+    session = SessionLocal()
+    session.add(UnderlyingData(ticker="TEST", date=today, close=100.0, fetch_date=fetch))
+    for days in (-5, 30, 90):
+        for strike in (90.0, 100.0, 110.0):
+            session.add(OptionData(ticker="TEST", expiration_date=today + timedelta(days=days), option_type="calls",
+                                   strike=strike, bid=None if strike == 110.0 else 1.5, ask=2.5, last_price=2.0,
+                                   fetch_date=fetch))
+    session.add(OptionData(ticker="TEST", expiration_date=today + timedelta(days=30), option_type="puts",
+                           strike=100.0, bid=1.0, ask=1.2, last_price=1.1, fetch_date=fetch))
+    session.commit()
+    session.close()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def add_stale_snapshot():
+    stale = datetime.combine(date.today() - timedelta(days=1), datetime.min.time())
+    session = SessionLocal()
+    for strike in (90.0, 100.0, 110.0, 120.0):
+        session.add(OptionData(ticker="TEST", expiration_date=date.today() + timedelta(days=30), option_type="calls",
+                               strike=strike, bid=9.0, ask=9.5, last_price=9.2, fetch_date=stale))
+    session.commit()
+    session.close()
+
+def test_load_chain_fetches_calls_puts_and_spot_in_one_statement(chain):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        loaded = load_chain("TEST")
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert len(statements) == 1
+    assert loaded.spot == 100.0
+    assert len(loaded) == 7 and loaded.is_call.sum() == 6
+    assert (loaded.T > 0).all()
+    assert np.allclose(loaded.moneyness()[~loaded.is_call], 1.0)
+    assert np.isclose(loaded.market_price()[loaded.strike == 110.0], 2.0).all()
+
+def test_load_chain_ignores_older_snapshots(chain):
+    add_stale_snapshot()
+    loaded = load_chain("TEST")
+    assert len(loaded) == 7 and 120.0 not in loaded.strike
+    assert not (loaded.ask == 9.5).any()
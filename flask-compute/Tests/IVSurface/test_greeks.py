@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from IVSurface import SurfaceStore
+from IVSurface.BSMCompute import GREEKS, black_scholes_batch, bsm_greeks, implied_vol_batch, solve_chain
+from IVSurface.DataSourcing import ChainArrays
+from graphs import generate_graph
+from payloads import decode_typed_array
+
+S, R = 100.0, 0.03
+
+def make_chain():
+    K = np.tile(np.linspace(80.0, 125.0, 10), 6)
+    T = np.repeat(np.linspace(0.1, 1.5, 3), 20)
+    is_call = np.tile(np.repeat([True, False], 10), 3)
+    sigma = 0.2 + 0.3 * np.log(K / S) ** 2
+    price = black_scholes_batch(S, K, T, R, sigma, is_call)[0]
+    chain = ChainArrays(ticker="TEST", spot=S, expiration=np.full(len(K), np.datetime64("2030-01-01")), T=T,
+                        strike=K, bid=price, ask=price, last=price, is_call=is_call)
+    return chain, sigma
+
+def test_greeks_match_finite_differences():
+    chain, sigma = make_chain()
+    K, T, is_call = chain.strike, chain.T, chain.is_call
+    greeks = bsm_greeks(S, K, T, R, sigma, is_call)
+    price = lambda S=S, T=T, r=R, sigma=sigma: black_scholes_batch(S, K, T, r, sigma, is_call)[0]
+    delta = lambda sigma=sigma, T=T: bsm_greeks(S, K, T, R, sigma, is_call)["delta"]
+    vega = lambda sigma: bsm_greeks(S, K, T, R, sigma, is_call)["vega"]
+    h = 1e-4
+    expected = {
+        "delta": (price(S=S + h) - price(S=S - h)) / (2 * h),
+        "gamma": (price(S=S + h) - 2 * price() + price(S=S - h)) / h**2,
+        "vega": (price(sigma=sigma + h) - price(sigma=sigma - h)) / (2 * h),
+        "theta": -(price(T=T + h) - price(T=T - h)) / (2 * h),
+        "rho": (price(r=R + h) - price(r=R - h)) / (2 * h),
+        "vanna": (delta(sigma=sigma + h) - delta(sigma=sigma - h)) / (2 * h),
+        "volga": (vega(sigma + h) - vega(sigma - h)) / (2 * h),
+        "charm": -(delta(T=T + h) - delta(T=T - h)) / (2 * h),
+    }
+    assert set(greeks) == set(GREEKS)
+    for name in GREEKS:
+        assert np.allclose(greeks[name], expected[name], rtol=1e-4, atol=1e-5), name
+
+def test_solve_chain_greeks_reuse_converged_d1_d2():
+    chain, sigma = make_chain()
+    ivs, d1, d2 = implied_vol_batch(chain.market_price(), S, chain.strike, chain.T, r=R, is_call=chain.is_call,
+                                    return_d=True)
+    _, _, expected_d1, expected_d2 = black_scholes_batch(S, chain.strike, chain.T, R, ivs, chain.is_call)
+    assert np.allclose(d1, expected_d1) and np.allclose(d2, expected_d2)
+    ivs, _, _, _, newton = solve_chain(chain, R, greeks=True)
+    _, _, _, _, rational = solve_chain(chain, R, solver="rational", greeks=True)
+    reference = bsm_greeks(S, chain.strike, chain.T, R, sigma, chain.is_call)
+    for name in GREEKS:
+        assert np.allclose(newton[name], reference[name], rtol=1e-5, atol=1e-6), name
+        assert np.allclose(rational[name], reference[name], rtol=1e-5, atol=1e-6), name
+    assert len(solve_chain(chain, R)) == 4
+
+def test_greek_surface_uses_materialized_greeks(monkeypatch):
+    chain, _ = make_chain()
+    ivs, mny, ttes, is_call, greeks = solve_chain(chain, R, greeks=True)
+    record = type("Record", (), dict(
+        as_of=SurfaceStore.date.today(), grid=None,
+        points={"iv": ivs.tolist(), "moneyness": mny.tolist(), "tte": ttes.tolist(), "is_call": is_call.tolist(),
+                "greeks": {name: values.tolist() for name, values in greeks.items()}}))
+    monkeypatch.setattr(SurfaceStore, "load_materialized_surface", lambda ticker: SurfaceStore.MaterializedSurface(record))
+    figure = json.loads(generate_graph("DeltaSurface", {"Ticker": "TEST", "Contract Type": "puts"}))
+    assert figure["layout"]["title"]["text"] == "Delta (puts) Surface for TEST"
+    z = decode_typed_array(figure["data"][0]["z"])
+    assert z.shape == (50, 50) and (z < 0).all() and (z > -1).all()
+    with pytest.raises(ValueError):
+        generate_graph("GammaSurface", {"Ticker": "TEST", "Surface Fit": "smile"})
+
+def test_unknown_contract_type_is_a_bad_request(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "generate_graph", lambda *args: pytest.fail("should not compute"))
+    monkeypatch.setattr(app_module, "data_version", lambda graph_type, parameters: "v1")
+    http = app_module.app.test_client()
+    for contract_type in ("straddles", "", None):
+        response = http.post("/compute", json={"graphType": "GammaSurface",
+                                               "parameters": {"Contract Type": contract_type}})
+        assert response.status_code == 400 and "Contract Type" in response.get_json()["error"]
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+# Also run directly for the throughput table, outside Tests/conftest.py.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from IVSurface import BSMCompute
+from IVSurface.BSMCompute import (
+    SIGMA_LOWER, SIGMA_UPPER, black_scholes_batch, implied_vol_batch, implied_vol_call, implied_vol_put,
+    no_arbitrage_mask
+)
+from IVSurface.RationalIV import implied_vol_rational
+from IVSurface.DataSourcing import ChainArrays
+
+def make_chain(n, seed=0, S=100.0):
+    """
+    Synthetic chain priced from known vols, covering log-moneyness in
+    [-2, 2], one day to three years, and 5%-200% volatility.
+    """
+    rng = np.random.default_rng(seed)
+    K = S * np.exp(rng.uniform(-2, 2, n))
+    T = rng.uniform(1 / 365, 3, n)
+    sigma = rng.uniform(0.05, 2.0, n)
+    r = rng.uniform(0.0, 0.08, n)
+    is_call = rng.random(n) < 0.5
+    price, _, _, _ = black_scholes_batch(S, K, T, r, sigma, is_call)
+    # Keep contracts whose time value is resolvable in double precision.
+    discounted_K = K * np.exp(-r * T)
+    intrinsic = np.where(is_call, np.maximum(S - discounted_K, 0), np.maximum(discounted_K - S, 0))
+    keep = ((price - intrinsic) > 1e-6 * price) & (price > 1e-8)
+    return price[keep], S, K[keep], T[keep], r[keep], is_call[keep], sigma[keep]
+
+def test_batch_newton_reprices_every_contract():
+    price, S, K, T, r, is_call, sigma = make_chain(50_000, seed=4)
+    ivs, d1, d2 = implied_vol_batch(price, S, K, T, r, is_call, return_d=True)
+    assert not np.isnan(ivs).any()
+    repriced, _, d1_check, d2_check = black_scholes_batch(S, K, T, r, ivs, is_call)
+    assert np.max(np.abs(repriced - price)) < 1e-8
+    assert np.median(np.abs(ivs / sigma - 1)) < 1e-10
+    # The d1/d2 kept are those of the returned sigma.
+    assert np.allclose(d1, d1_check) and np.allclose(d2, d2_check)
+
+def test_no_arbitrage_mask_bounds():
+    S, T, r = 100.0, 0.5, 0.04
+    K = np.array([80.0, 80.0, 80.0, 120.0, 120.0, 120.0, 100.0, 100.0, 100.0])
+    is_call = np.array([True, True, True, False, False, False, True, True, True])
+    discounted = K * np.exp(-r * T)
+    price = np.array([
+        S - discounted[0] + 1.0,  # call inside the bounds
+        S - discounted[1],        # call at intrinsic value
+        S,                        # call at the spot
+        discounted[3] - S + 1.0,  # put inside the bounds
+        discounted[4] - S - 0.5,  # put below intrinsic value
+        discounted[5],            # put at the discounted strike
+        np.nan, -1.0, 5.0,
+    ])
+    T = np.array([T] * 8 + [0.0])  # the last has expired
+    assert no_arbitrage_mask(price, S, K, T, r, is_call).tolist() == [
+        True, False, False, True, False, False, False, False, False,
+    ]
+    ivs = implied_vol_batch(price, S, K, T, r, is_call)
+    assert np.isnan(ivs).tolist() == [False, True, True, False, True, True, True, True, True]
+
+def test_batch_newton_bisects_when_a_step_leaves_the_bracket(monkeypatch):
+    # Far out of the money at a high vol: from the 0.3 start the price and
+    # vega are almost zero, so the Newton step overshoots the bracket.
+    S, K, T, sigma = 100.0, np.array([200.0]), np.array([0.05]), 2.5
+    price = black_scholes_batch(S, K, T, 0.0, sigma, True)[0]
+    assert implied_vol_call(price[0], S, K[0], T[0], tol=1e-10) == 0.3
+    tried = []
+    def spy(S, K, T, r, sigma, is_call):
+        tried.append(sigma.copy())
+        return black_scholes_batch(S, K, T, r, sigma, is_call)
+    monkeypatch.setattr(BSMCompute, "black_scholes_batch", spy)
+    ivs = implied_vol_batch(price, S, K, T, 0.0, True)
+    assert tried[1][0] == 0.5 * (0.3 + SIGMA_UPPER) and SIGMA_LOWER < tried[2][0] < SIGMA_UPPER
+    assert np.isclose(ivs[0], sigma, rtol=1e-9)
+
+def test_rational_recovers_sigma_to_machine_precision():
+    price, S, K, T, r, is_call, sigma = make_chain(50_000)
+    ivs = implied_vol_rational(price, S, K, T, r, is_call)
+    assert not np.isnan(ivs).any()
+    assert np.max(np.abs(ivs / sigma - 1)) < 1e-9
+
+def test_rational_agrees_with_newton_reference():
+    price, S, K, T, r, is_call, sigma = make_chain(300, seed=1)
+    rational = implied_vol_rational(price, S, K, T, r, is_call)
+    reference = np.array([
+        implied_vol_call(p, S, k, t, r=rr, tol=1e-10) if c else implied_vol_put(p, S, k, t, r=rr, tol=1e-10)
+        for p, k, t, rr, c in zip(price, K, T, r, is_call)
+    ])
+    # The reference starts at sigma = 0.3 and can stall on the 1e-8 floor for
+    # high vols, so compare only where it reprices the market.
+    repriced, vega, _, _ = black_scholes_batch(S, K, T, r, reference, is_call)
+    converged = np.abs(repriced - price) < 1e-9
+    assert converged.sum() > 50
+    # A 1e-9 price residual leaves roughly 1e-9 / vega of slack in sigma
+    # (unbounded where the reference stalled at zero vega).
+    with np.errstate(divide="ignore"):
+        slack = 1e-6 * reference + 1e-9 / vega
+    assert (np.abs(rational - reference)[converged] <= slack[converged]).all()
+
+def test_rational_is_more_accurate_than_batch_newton():
+    price, S, K, T, r, is_call, sigma = make_chain(50_000, seed=2)
+    rational = implied_vol_rational(price, S, K, T, r, is_call)
+    newton = implied_vol_batch(price, S, K, T, r, is_call)
+    rational_err = np.nanmax(np.abs(rational / sigma - 1))
+    newton_err = np.nanmax(np.abs(newton / sigma - 1))
+    assert rational_err <= newton_err
+
+def test_rejects_prices_outside_no_arbitrage_bounds():
+    S, K, T, r = 100.0, np.array([80.0, 120.0, 100.0]), 0.5, 0.03
+    price = np.array([19.0, 100.0, np.nan])  # below intrinsic, above S, missing
+    assert np.isnan(implied_vol_rational(price, S, K, T, r, True)).all()
+    assert np.isnan(implied_vol_batch(price, S, K, T, r, True)).all()
+
+def test_compute_implied_vols_solver_option(monkeypatch):
+    price, S, K, T, r, is_call, sigma = make_chain(2_000, seed=3)
+    chain = ChainArrays(ticker="TEST", spot=S, expiration=np.full(len(K), np.datetime64("NaT")), T=T,
+                        strike=K, bid=price, ask=price, last=price, is_call=is_call)
+    monkeypatch.setattr(BSMCompute, "get_risk_free_rate", lambda T: r)
+    monkeypatch.setattr(BSMCompute, "load_chain", lambda *args, **kwargs: chain)
+
+    ivs_newton, _, _ = BSMCompute.compute_implied_vols("TEST", "calls", solver="newton")
+    ivs_rational, _, _ = BSMCompute.compute_implied_vols("TEST", "calls", solver="rational")
+    assert len(ivs_rational) >= len(ivs_newton) > 0
+    # Calls and puts are solved together in one pass.
+    ivs, _, _, solved_call = BSMCompute.solve_chain(chain, r, solver="rational")
+    assert solved_call.any() and (~solved_call).any()
+    assert np.allclose(ivs, sigma[~np.isnan(implied_vol_rational(price, S, K, T, r, is_call))], rtol=1e-9)
+    with pytest.raises(ValueError):
+        BSMCompute.compute_implied_vols("TEST", "calls", solver="bogus")
+
+def compare_solvers(n=100_000, reference_n=500):
+    """
+    Accuracy and speed of the scalar reference, the batch Newton solver and
+    the rational engine on the same synthetic chain.
+    """
+    price, S, K, T, r, is_call, sigma = make_chain(n)
+    rows = []
+    start = time.perf_counter()
+    reference = np.array([
+        implied_vol_call(p, S, k, t, r=rr) if c else implied_vol_put(p, S, k, t, r=rr)
+        for p, k, t, rr, c in zip(price[:reference_n], K[:reference_n], T[:reference_n], r[:reference_n], is_call[:reference_n])
+    ])
+    elapsed = time.perf_counter() - start
+    rows.append(("scalar newton (reference)", reference_n, elapsed, np.abs(reference / sigma[:reference_n] - 1)))
+    for name, solver in (("batch newton", implied_vol_batch), ("rational", implied_vol_rational)):
+        start = time.perf_counter()
+        ivs = solver(price, S, K, T, r, is_call)
+        elapsed = time.perf_counter() - start
+        rows.append((name, len(price), elapsed, np.abs(ivs / sigma - 1)))
+    return rows
+
+def test_speed_comparison():
+    rows = compare_solvers(n=20_000, reference_n=200)
+    per_option = {name: elapsed / count for name, count, elapsed, _ in rows}
+    assert per_option["rational"] < per_option["scalar newton (reference)"]
+    assert per_option["batch newton"] < per_option["scalar newton (reference)"]
+
+if __name__ == "__main__":
+    for name, count, elapsed, err in compare_solvers():
+        print(
+            f"{name:<26} {count:>7} options  {count / elapsed:>12,.0f} options/s  "
+            f"median rel err {np.nanmedian(err):.1e}  max rel err {np.nanmax(err):.1e}  "
+            f"unsolved {np.isnan(err).mean():.2%}"
+        )
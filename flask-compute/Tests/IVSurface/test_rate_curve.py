@@ -0,0 +1,94 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from sqlalchemy import event
+from db import engine, Base, SessionLocal, YieldData, IVSurfaceData, get_surface_version
+from IVSurface import RateCurve
+from IVSurface.DataSourcing import get_risk_free_rate
+from IVSurface.SurfaceStore import load_materialized_surface
+import graphs
+
+CURVE = {"3month": 5.0, "5year": 4.0, "10year": 4.3, "30year": 4.6}
+
+def add_yields(closes, day):
+    session = SessionLocal()
+    for label, close in closes.items():
+        session.add(YieldData(label=label, ticker=label, date=day, close=close, fetch_date=datetime.utcnow()))
+    session.commit()
+    session.close()
+
+@pytest.fixture
+def yields(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setitem(RateCurve._state, "curve", None)
+    add_yields({label: close + 1.0 for label, close in CURVE.items()}, date.today() - timedelta(days=1))
+    add_yields(CURVE, date.today())
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_curve_interpolates_latest_yields_monotonically(yields):
+    curve = RateCurve.get_rate_curve()
+    assert np.allclose(curve.maturities, [0.25, 5, 10, 30])
+    assert np.allclose(curve.rates, 2 * np.log1p(np.array(list(CURVE.values())) / 200))
+    T = np.array([0.01, 0.25, 1.0, 2.0, 5.0, 7.0, 10.0, 40.0])
+    rates = curve(T)
+    # Flat beyond the quoted tenors and never outside neighbouring quotes.
+    assert rates[0] == rates[1] and rates[-1] == curve.rates[-1]
+    assert (np.diff(rates[1:5]) <= 0).all() and curve.rates[1] <= rates[5] <= curve.rates[2]
+    chain_T = np.repeat(T, 3)
+    assert np.array_equal(get_risk_free_rate(chain_T), np.repeat(rates, 3))
+    assert get_risk_free_rate() == pytest.approx(curve.rates[0])
+
+def test_curve_as_of_a_day_uses_that_days_yields(yields):
+    previous = RateCurve.load_rate_curve(as_of=date.today() - timedelta(days=1))
+    assert np.allclose(previous.rates, 2 * np.log1p((np.array(list(CURVE.values())) + 1.0) / 200))
+    assert len(RateCurve.load_rate_curve(as_of=date.today() - timedelta(days=2)).rates) == 0
+
+def test_curve_is_cached_until_yields_change(yields):
+    first = RateCurve.get_rate_curve()
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert RateCurve.get_rate_curve() is first
+        assert statements == []
+        # An invalidation re-checks the version but keeps an unchanged curve.
+        RateCurve.invalidate_rate_curve()
+        assert RateCurve.get_rate_curve() is first
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    add_yields({"3month": 3.0}, date.today() + timedelta(days=1))
+    assert RateCurve.get_rate_curve() is first
+    RateCurve.invalidate_rate_curve()
+    assert RateCurve.get_rate_curve().rates[0] == pytest.approx(2 * np.log1p(0.015))
+
+def test_yield_changes_invalidate_surface_versions(yields):
+    version = graphs.data_version("IVMap", {"Ticker": "TEST"})
+    assert graphs.data_version("DeltaSurface", {"Ticker": "TEST"}) == version
+    session = SessionLocal()
+    session.add(IVSurfaceData(ticker="TEST", as_of=date.today(), data_version=get_surface_version("TEST"),
+                              points={"iv": [0.2], "moneyness": [1.0], "tte": [0.5], "is_call": [True]},
+                              fetch_date=datetime.utcnow()))
+    session.commit()
+    session.close()
+    assert load_materialized_surface("TEST") is not None
+    # No option or underlying rows change, only the rates behind the IVs.
+    add_yields({"3month": 3.0}, date.today() + timedelta(days=1))
+    assert graphs.data_version("IVMap", {"Ticker": "TEST"}) != version
+    assert load_materialized_surface("TEST") is None
+
+def test_default_rate_without_yields(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setitem(RateCurve._state, "curve", None)
+    try:
+        assert np.allclose(RateCurve.get_rate_curve()(np.array([0.5, 2.0])), RateCurve.DEFAULT_RATE)
+    finally:
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,88 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from IVSurface import SurfaceFit
+from IVSurface.IVmap import GRID_SIZE, MAX_GRID_SIZE, grid_surface, parse_grid_size
+from benchmark_surface_fit import synthetic_chain, true_iv
+
+def test_smile_fit_recovers_known_surface():
+    ivs, mny, ttes = synthetic_chain(noise=0.0)
+    grid_mny, grid_ttes, grid_ivs = grid_surface(ivs, mny, ttes, size=30, method="smile")
+    tri = SurfaceFit.get_triangulation(mny, ttes)
+    inside = (tri.delaunay.find_simplex(tri.scale(grid_mny, grid_ttes)) >= 0).reshape(grid_mny.shape)
+    assert not np.isnan(grid_ivs).any()
+    assert np.abs(grid_ivs - true_iv(grid_mny, grid_ttes))[inside].max() < 5e-3
+
+def test_smile_fit_models_calls_and_puts_in_strike_space():
+    # A skewed smile in log(K/S); calls plot it mirrored (S/K), puts as is.
+    skew = lambda k: 0.2 - 0.1 * k + 0.3 * k ** 2
+    k = np.tile(np.linspace(-0.3, 0.3, 13), 4)
+    T = np.repeat([0.1, 0.3, 0.6, 1.0], 13)
+    mny = np.concatenate([np.exp(-k), np.exp(k)])
+    is_call = np.repeat([True, False], len(k))
+    ivs = np.concatenate([skew(k), skew(k)])
+    ttes = np.concatenate([T, T])
+    grid_mny, _, calls = grid_surface(ivs[is_call], mny[is_call], ttes[is_call], size=15, method="smile",
+                                      is_call=is_call[is_call])
+    assert np.allclose(calls, skew(-np.log(grid_mny)), atol=2e-3)
+    grid_mny, _, both = grid_surface(ivs, mny, ttes, size=15, method="smile", is_call=is_call)
+    x = np.log(grid_mny)
+    assert np.allclose(both, 0.5 * (skew(-x) + skew(x)), atol=2e-3)
+
+def test_default_fit_is_griddata():
+    assert SurfaceFit.SURFACE_FIT == "griddata" or os.getenv("IV_SURFACE_FIT")
+
+def test_delaunay_reuses_triangulation_and_fills_hull():
+    ivs, mny, ttes = synthetic_chain()
+    SurfaceFit._triangulations.clear()
+    _, _, first = grid_surface(ivs, mny, ttes, size=20, method="delaunay")
+    tri = SurfaceFit.get_triangulation(mny, ttes)
+    _, _, second = grid_surface(2 * ivs, mny, ttes, size=20, method="delaunay")
+    assert SurfaceFit.get_triangulation(mny, ttes) is tri and len(SurfaceFit._triangulations) == 1
+    assert not np.isnan(first).any()
+    assert np.allclose(second, 2 * first)
+
+def test_delaunay_fills_where_griddata_leaves_nan():
+    ivs, mny, ttes = synthetic_chain(expiries=6, strikes=20)
+    _, _, legacy = grid_surface(ivs, mny, ttes, size=15, method="griddata")
+    _, _, cached = grid_surface(ivs, mny, ttes, size=15, method="delaunay")
+    assert np.isnan(legacy).any()
+    assert np.isfinite(cached).all()
+
+def test_unknown_fit_raises():
+    ivs, mny, ttes = synthetic_chain(expiries=3, strikes=10)
+    with pytest.raises(ValueError):
+        grid_surface(ivs, mny, ttes, method="bicubic")
+
+def test_grid_size_is_validated():
+    assert parse_grid_size(None) == parse_grid_size("") == GRID_SIZE
+    assert parse_grid_size(" 80 ") == parse_grid_size(80) == 80
+    for value in ("abc", "-3", 1, MAX_GRID_SIZE + 1, "12.5", True):
+        with pytest.raises(ValueError):
+            parse_grid_size(value)
+
+def test_invalid_grid_size_is_a_bad_request(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "generate_graph", lambda *args: pytest.fail("should not compute"))
+    monkeypatch.setattr(app_module, "data_version", lambda graph_type, parameters: "v1")
+    http = app_module.app.test_client()
+    for graph_type, size in (("IVMap", "abc"), ("DeltaSurface", -3)):
+        response = http.post("/compute", json={"graphType": graph_type, "parameters": {"Grid Size": size}})
+        assert response.status_code == 400 and "Grid Size" in response.get_json()["error"]
+
+def test_unknown_surface_fit_is_a_bad_request(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "generate_graph", lambda *args: pytest.fail("should not compute"))
+    monkeypatch.setattr(app_module, "data_version", lambda graph_type, parameters: "v1")
+    http = app_module.app.test_client()
+    # The smile fit is IV-only.
+    for graph_type, fit in (("IVMap", "bicubic"), ("DeltaSurface", "smile")):
+        response = http.post("/compute", json={"graphType": graph_type, "parameters": {"Surface Fit": fit}})
+        assert response.status_code == 400 and "Surface Fit" in response.get_json()["error"]
@@ -0,0 +1,84 @@
+import os
+import sys
+from datetime import date, datetime, timedelta
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+import pytest
+from db import engine, Base, SessionLocal, OptionData, UnderlyingData, IVSurfaceData
+from IVSurface import RateCurve
+from IVSurface.BSMCompute import black_scholes_batch
+from IVSurface.SurfaceStore import materialize_iv_surface, load_materialized_surface
+
+S = 100.0
+EXPIRY_DAYS = (30, 90, 180, 365)
+STRIKES = np.linspace(80.0, 120.0, 9)
+
+def true_iv(K):
+    return 0.2 + 0.3 * np.log(K / S) ** 2
+
+@pytest.fixture
+def chain(monkeypatch):
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setitem(RateCurve._state, "curve", None)
+    today = date.today()
+    fetch = datetime.combine(today, datetime.min.time())
+    session = SessionLocal()
+    session.add(UnderlyingData(ticker="TEST", date=today, close=S, fetch_date=fetch))
+    for days in EXPIRY_DAYS:
+        for option_type in ("calls", "puts"):
+            prices = black_scholes_batch(S, STRIKES, days / 365.0, RateCurve.DEFAULT_RATE, true_iv(STRIKES),
+                                         option_type == "calls")[0]
+            for strike, price in zip(STRIKES, prices):
+                session.add(OptionData(ticker="TEST", expiration_date=today + timedelta(days=days),
+                                       option_type=option_type, strike=float(strike), bid=float(price),
+                                       ask=float(price), last_price=float(price), fetch_date=fetch))
+    session.commit()
+    session.close()
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+def test_materialize_round_trips_points_grid_and_greeks(chain):
+    count = materialize_iv_surface("TEST")
+    surface = load_materialized_surface("TEST")
+    assert count == len(surface.ivs) == 2 * len(EXPIRY_DAYS) * len(STRIKES)
+    assert surface.as_of == date.today()
+    strikes = np.where(surface.is_call, S / surface.mny, S * surface.mny)
+    assert np.allclose(surface.ivs, true_iv(strikes), atol=1e-4)
+    assert all(axis.shape == surface.grid[0].shape for axis in surface.grid)
+    assert set(surface.greeks) >= {"delta", "gamma", "vega"}
+    # Materializing again replaces the record instead of adding one.
+    materialize_iv_surface("TEST")
+    session = SessionLocal()
+    try:
+        assert session.query(IVSurfaceData).count() == 1
+    finally:
+        session.close()
+
+def test_slice_by_expiry_range(chain):
+    materialize_iv_surface("TEST")
+    surface = load_materialized_surface("TEST")
+    end = (date.today() + timedelta(days=100)).isoformat()
+    ivs, mny, ttes, is_call = surface.slice(end_date=end)
+    assert np.allclose(np.unique(np.round(ttes * 365)), [30, 90]) and len(ivs) == len(mny) == 4 * len(STRIKES)
+    assert is_call.sum() == 2 * len(STRIKES)
+    start = (date.today() + timedelta(days=200)).isoformat()
+    _, _, ttes, _ = surface.slice(start_date=start)
+    assert np.allclose(np.unique(np.round(ttes * 365)), [365])
+    delta, _, _ = surface.slice_greek("delta", end_date=end, is_call=False)
+    assert len(delta) == 2 * len(STRIKES) and (delta < 0).all()
+
+def test_record_is_ignored_once_option_rows_change(chain):
+    materialize_iv_surface("TEST")
+    assert load_materialized_surface("TEST") is not None
+    session = SessionLocal()
+    session.add(OptionData(ticker="TEST", expiration_date=date.today() + timedelta(days=30), option_type="calls",
+                           strike=125.0, bid=0.1, ask=0.2, last_price=0.15,
+                           fetch_date=datetime.combine(date.today(), datetime.min.time())))
+    session.commit()
+    session.close()
+    assert load_materialized_surface("TEST") is None
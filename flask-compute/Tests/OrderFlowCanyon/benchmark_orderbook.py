@@ -0,0 +1,91 @@
+"""
+Time create_orderbook against the original row-by-row builder on a
+synthetic mbp-10 frame.
+
+    python Tests/OrderFlowCanyon/benchmark_orderbook.py --rows 1000000
+
+The original builder is timed on --legacy-rows rows and scaled linearly
+to --rows (it is O(rows) and takes minutes at 1M); pass
+--legacy-rows equal to --rows to time it in full.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from OrderFlowCanyon.utils import create_orderbook
+
+def synthetic_mbp10(rows, depth=10, seed=0):
+    """
+    mbp-10 shaped frame: a random-walk mid with levels one cent apart and
+    uint32 sizes, like Databento's to_df() output.
+    """
+    rng = np.random.default_rng(seed)
+    mid = 250 + np.cumsum(rng.normal(0, 0.005, rows))
+    columns = {
+        "ts_event": pd.date_range("2025-01-02 14:30", periods=rows, freq="1ms", tz="UTC"),
+        "action": rng.choice(list("AMCT"), rows),
+        "side": rng.choice(list("AB"), rows),
+        "depth": rng.integers(0, depth, rows).astype(np.uint8),
+        "price": mid,
+        "size": rng.integers(1, 500, rows).astype(np.uint32),
+        "ts_in_delta": rng.integers(1_000, 200_000, rows).astype(np.int32),
+    }
+    for i in range(depth):
+        columns[f"bid_px_{i:02d}"] = np.round(mid - 0.01 * (i + 1), 2)
+        columns[f"ask_px_{i:02d}"] = np.round(mid + 0.01 * (i + 1), 2)
+        columns[f"bid_sz_{i:02d}"] = rng.integers(1, 1_000, rows).astype(np.uint32)
+        columns[f"ask_sz_{i:02d}"] = rng.integers(1, 1_000, rows).astype(np.uint32)
+        columns[f"bid_ct_{i:02d}"] = rng.integers(1, 10, rows).astype(np.uint32)
+        columns[f"ask_ct_{i:02d}"] = rng.integers(1, 10, rows).astype(np.uint32)
+    return pd.DataFrame(columns)
+
+def create_orderbook_legacy(df):
+    """
+    The original builder: 40 df.iloc lookups per snapshot.
+    """
+    times, ask_vols_t, bid_vols_t, ask_prices_t, bid_prices_t = [], [], [], [], []
+    for ti in range(0, len(df), 10):
+        ask_vols, bid_vols, ask_prices, bid_prices = [], [], [], []
+        for i in range(10):
+            ask_vols.append(df.iloc[ti][f'ask_sz_0{i}'])
+            bid_vols.append(df.iloc[ti][f'bid_sz_0{i}'])
+            bid_prices.append(df.iloc[ti][f'bid_px_0{i}'])
+            ask_prices.append(df.iloc[ti][f'ask_px_0{i}'])
+        ask_vols_t.append(ask_vols)
+        bid_vols_t.append(bid_vols)
+        ask_prices_t.append(ask_prices)
+        bid_prices_t.append(bid_prices)
+        times.append([df.iloc[ti]['ts_in_delta']] * 10)
+    return (np.array(ask_prices_t), np.array(bid_prices_t), np.cumsum(np.array(ask_vols_t), axis=1),
+            np.cumsum(np.array(bid_vols_t), axis=1), np.array(times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--legacy-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    df = synthetic_mbp10(args.rows)
+    start = time.perf_counter()
+    create_orderbook(df)
+    vectorized = time.perf_counter() - start
+
+    sample = df.iloc[:args.legacy_rows]
+    start = time.perf_counter()
+    create_orderbook_legacy(sample)
+    legacy = (time.perf_counter() - start) * args.rows / len(sample)
+
+    scaled = "" if len(sample) == args.rows else f" (scaled from {len(sample)} rows)"
+    print(f"rows: {args.rows}")
+    print(f"legacy:     {legacy:10.3f}s{scaled}")
+    print(f"vectorized: {vectorized:10.3f}s")
+    print(f"speedup:    {legacy / vectorized:10.0f}x")
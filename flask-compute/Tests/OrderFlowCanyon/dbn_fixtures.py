@@ -0,0 +1,65 @@
+"""
+Write rows of order_book.csv as a Databento mbp-10 DBN/zstd file, the
+format OrderBookStore downloads and read_dbn_chunks decodes.
+
+    python Tests/OrderFlowCanyon/dbn_fixtures.py
+
+regenerates fixtures/tsla_mbp10.dbn.zst.
+"""
+import os
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import zstandard
+import databento_dbn as dbn
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+FIXTURE = os.path.join(current_dir, "fixtures", "tsla_mbp10.dbn.zst")
+FIXTURE_START = pd.Timestamp("2025-01-02 14:30", tz="UTC")
+FIXTURE_ROWS = 500
+
+def fixed_price(value):
+    return dbn.UNDEF_PRICE if pd.isna(value) else int(round(value * dbn.FIXED_PRICE_SCALE))
+
+def write_mbp10(path, book, start, end, symbol="TSLA", dataset="XNAS.ITCH"):
+    """
+    `book` rows (order_book.csv columns) as records with ts_recv spread
+    evenly over [start, end).
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    interval = SimpleNamespace(start_date=start.date(), end_date=(end + pd.Timedelta(days=1)).date(), symbol="1")
+    metadata = dbn.Metadata(
+        dataset=dataset, start=start.value, end=end.value, schema=dbn.Schema.MBP_10,
+        stype_in=dbn.SType.RAW_SYMBOL, stype_out=dbn.SType.INSTRUMENT_ID, symbols=[symbol],
+        mappings=[SimpleNamespace(raw_symbol=symbol, intervals=[interval])],
+    )
+    stamps = np.linspace(start.value, end.value, len(book), endpoint=False).astype(np.int64)
+    encoded = bytearray(metadata.encode())
+    for ts_recv, row in zip(stamps, book.itertuples(index=False)):
+        row = row._asdict()
+        levels = [
+            dbn.BidAskPair(
+                bid_px=fixed_price(row[f"bid_px_{i:02d}"]), ask_px=fixed_price(row[f"ask_px_{i:02d}"]),
+                bid_sz=int(row[f"bid_sz_{i:02d}"]), ask_sz=int(row[f"ask_sz_{i:02d}"]),
+                bid_ct=int(row[f"bid_ct_{i:02d}"]), ask_ct=int(row[f"ask_ct_{i:02d}"]),
+            )
+            for i in range(10)
+        ]
+        record = dbn.MBP10Msg(
+            publisher_id=1, instrument_id=1, ts_event=int(ts_recv) - int(row["ts_in_delta"]),
+            price=fixed_price(row["price"]), size=int(row["size"]), action=dbn.Action(row["action"]),
+            side=dbn.Side(row["side"]), depth=int(row["depth"]), ts_recv=int(ts_recv),
+            ts_in_delta=int(row["ts_in_delta"]), levels=levels,
+        )
+        encoded += bytes(record)
+    with open(path, "wb") as f:
+        f.write(zstandard.ZstdCompressor().compress(bytes(encoded)))
+
+def load_book(rows):
+    return pd.read_csv(os.path.join(current_dir, "order_book.csv")).iloc[:rows]
+
+
+if __name__ == "__main__":
+    os.makedirs(os.path.dirname(FIXTURE), exist_ok=True)
+    write_mbp10(FIXTURE, load_book(FIXTURE_ROWS), FIXTURE_START, FIXTURE_START + pd.Timedelta(hours=6, minutes=30))
+    print(f"Wrote {FIXTURE} ({os.path.getsize(FIXTURE):,} bytes)")
@@ -0,0 +1,70 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from OrderFlowCanyon.downsample import bucket_orderbook
+from benchmark_orderbook import synthetic_mbp10
+
+def chunks(df, size):
+    return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+def reference(df, start, width, mode):
+    """
+    The same aggregation through a pandas groupby.
+    """
+    books = {
+        "apx": df[[f"ask_px_{i:02d}" for i in range(10)]].to_numpy(),
+        "avc": df[[f"ask_sz_{i:02d}" for i in range(10)]].to_numpy().cumsum(axis=1),
+        "bvc": df[[f"bid_sz_{i:02d}" for i in range(10)]].to_numpy().cumsum(axis=1),
+    }
+    bucket = (df["ts_event"] - start) // width
+    if mode == "last":
+        rows = df.groupby(bucket.values).tail(1).index
+    else:
+        depth = books["avc"][:, -1] + books["bvc"][:, -1]
+        rows = pd.Series(depth, index=df.index).groupby(bucket.values).idxmax().values
+    if mode == "mean":
+        return pd.DataFrame(books["apx"]).groupby(bucket.values).mean().to_numpy()
+    return books["apx"][df.index.get_indexer(rows)]
+
+@pytest.mark.parametrize("mode", ["last", "mean", "max-depth"])
+def test_matches_groupby_and_ignores_chunking(mode):
+    df = synthetic_mbp10(20_000)
+    start, end = df["ts_event"].iloc[0], df["ts_event"].iloc[-1] + pd.Timedelta(1, "ms")
+    whole = bucket_orderbook([df], start, end, resolution=100, mode=mode, time_column="ts_event", oversample=1)
+    chunked = bucket_orderbook(chunks(df, 777), start, end, resolution=100, mode=mode, time_column="ts_event", oversample=1)
+    width = (end - start) / 100
+    expected = reference(df, start, pd.Timedelta(int(np.ceil(width.value)), "ns"), mode)
+    assert whole[0].shape == (100, 10)
+    assert np.allclose(whole[0], expected)
+    for a, b in zip(whole, chunked):
+        assert np.allclose(a.astype(float), b.astype(float))
+
+def test_output_size_is_fixed_and_skips_idle_time():
+    day = synthetic_mbp10(50_000)
+    session_open = day["ts_event"].iloc[0]
+    day["ts_event"] = pd.date_range(session_open, session_open + pd.Timedelta(hours=6.5), periods=len(day))
+    # The same session on two days with a night in between.
+    second = day.copy()
+    second["ts_event"] = second["ts_event"] + pd.Timedelta(days=1)
+    both = pd.concat([day, second], ignore_index=True)
+    start = day["ts_event"].iloc[0].normalize()
+    end = start + pd.Timedelta(days=2)
+    for frame in (day.iloc[::5], day, both):
+        apx, bpx, avc, bvc, times = bucket_orderbook(chunks(frame, 10_000), start, end, time_column="ts_event")
+        assert apx.shape == times.shape == (500, 10)
+    # Idle buckets are dropped, so each session gets half the rows (give or
+    # take the row that straddles the night).
+    first_session = (times[:, 0] < np.datetime64(second["ts_event"].iloc[0].tz_convert(None))).sum()
+    assert abs(first_session - 250) <= 1
+
+def test_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        bucket_orderbook([], "2025-01-02", "2025-01-03", mode="median")
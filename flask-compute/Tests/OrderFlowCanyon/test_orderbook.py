@@ -0,0 +1,30 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+from OrderFlowCanyon.utils import create_orderbook
+from benchmark_orderbook import create_orderbook_legacy, synthetic_mbp10
+
+def test_matches_legacy_builder_on_recorded_book():
+    df = pd.read_csv(os.path.join(current_dir, "order_book.csv")).iloc[:2_000]
+    for new, old in zip(create_orderbook(df), create_orderbook_legacy(df)):
+        assert new.shape == old.shape
+        assert np.array_equal(new, old)
+
+def test_matches_legacy_builder_on_databento_dtypes():
+    df = synthetic_mbp10(503)
+    for new, old in zip(create_orderbook(df), create_orderbook_legacy(df)):
+        assert new.dtype == old.dtype
+        assert np.array_equal(new, old)
+
+def test_stride_and_depth():
+    df = synthetic_mbp10(1_000)
+    apx, bpx, avc, bvc, times = create_orderbook(df, stride=3, depth=5)
+    assert apx.shape == bpx.shape == avc.shape == bvc.shape == times.shape == (334, 5)
+    assert np.array_equal(avc[:, -1], df[[f"ask_sz_0{i}" for i in range(5)]].to_numpy()[::3].sum(axis=1))
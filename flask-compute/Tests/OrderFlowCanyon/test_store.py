@@ -0,0 +1,92 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.dirname(os.path.dirname(current_dir))
+if root_dir not in sys.path:
+    sys.path.insert(0, root_dir)
+
+pytest.importorskip("databento")
+from OrderFlowCanyon.store import OrderBookStore, read_dbn_chunks
+from OrderFlowCanyon import data
+from dbn_fixtures import FIXTURE, FIXTURE_ROWS, FIXTURE_START, load_book, write_mbp10
+
+class FakeTimeseries:
+    """
+    Stands in for databento.Historical().timeseries: get_range copies the
+    fixture file recorded for the requested day to `path`.
+    """
+    def __init__(self, fixtures):
+        self.fixtures = fixtures
+        self.calls = []
+
+    def get_range(self, dataset, schema, symbols, start, end, path):
+        self.calls.append((symbols[0], start.date()))
+        with open(self.fixtures[start.date()], "rb") as src, open(path, "wb") as dst:
+            dst.write(src.read())
+
+class FakeClient:
+    def __init__(self, fixtures):
+        self.timeseries = FakeTimeseries(fixtures)
+
+def test_read_dbn_chunks_decodes_the_fixture():
+    book = load_book(FIXTURE_ROWS)
+    frames = list(read_dbn_chunks(FIXTURE, 200))
+    assert [len(f) for f in frames] == [200, 200, 100]
+    frame = pd.concat(frames)
+    assert frame.index.name == "ts_recv" and str(frame.index.tz) == "UTC"
+    assert frame.index.is_monotonic_increasing and frame.index[0] == FIXTURE_START
+    assert (frame["symbol"] == "TSLA").all()
+    for column in ("bid_px_00", "ask_px_09", "bid_sz_03", "ask_ct_05", "ts_in_delta"):
+        assert np.allclose(frame[column].to_numpy(dtype=float), book[column].to_numpy(dtype=float)), column
+
+@pytest.fixture
+def fixtures(tmp_path):
+    """
+    The recorded mbp-10 book replayed as DBN/zstd files over three days:
+    one past day split across its two halves, the day before, and today
+    (incomplete).
+    """
+    book = load_book(3_000)
+    today = pd.Timestamp.now(tz="UTC").normalize()
+    files = {}
+    for offset in (2, 1, 0):
+        day = today - pd.Timedelta(days=offset)
+        path = tmp_path / "fixtures" / f"{day:%Y-%m-%d}.dbn.zst"
+        path.parent.mkdir(exist_ok=True)
+        write_mbp10(path, book, day, day + pd.Timedelta(hours=23))
+        files[day.date()] = path
+    return files, today
+
+def make_store(tmp_path, files):
+    return OrderBookStore(root=str(tmp_path / "store"), client=FakeClient(files))
+
+def test_complete_days_are_served_from_disk(tmp_path, fixtures):
+    files, today = fixtures
+    store = make_store(tmp_path, files)
+    start, end = today - pd.Timedelta(days=2), today
+    first = pd.concat(store.iter_frames("TSLA", start, end, chunk_rows=700))
+    second = pd.concat(store.iter_frames("TSLA", start + pd.Timedelta(hours=12), end, chunk_rows=700))
+    assert len(first) == 6_000
+    assert second.index.min() >= start + pd.Timedelta(hours=12)
+    assert len(store.client.timeseries.calls) == 2
+    assert os.path.exists(store.path("TSLA", start))
+
+def test_current_day_is_never_cached(tmp_path, fixtures):
+    files, today = fixtures
+    store = make_store(tmp_path, files)
+    for _ in range(2):
+        frames = list(store.iter_frames("TSLA", today, today + pd.Timedelta(days=1)))
+    assert sum(len(f) for f in frames) == 3_000
+    assert len(store.client.timeseries.calls) == 2
+    assert not os.path.exists(store.path("TSLA", today))
+
+def test_get_data_reads_through_store(tmp_path, fixtures):
+    files, today = fixtures
+    store = make_store(tmp_path, files)
+    apx, bpx, avc, bvc, times = data.get_data("TSLA", today - pd.Timedelta(days=2), today, store=store, resolution=200)
+    assert apx.shape == times.shape == (200, 10)
+    assert len(store.client.timeseries.calls) == 2
@@ -0,0 +1,6 @@
+import os
+
+# Tests create and drop tables, so they always run against a private
+# in-memory SQLite database, whatever the shell's DATABASE_URL says.
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.pop("DATABASE_REPLICA_URL", None)
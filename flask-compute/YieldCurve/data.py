@@ -3,7 +3,8 @@ import numpy as np
 import pandas as pd
 import os
 import sys
-from db import SessionLocal, YieldData
+from db import read_session, YieldData
+import timing
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
@@ -23,15 +24,15 @@ def parse_maturity(label):
     return int(num_match.group()) if num_match else label
 
 def get_yield_data(start_date, end_date):
-    session = SessionLocal()
-    try:
+    with timing.span("db"), read_session() as session:
         records = session.query(YieldData).filter(
             YieldData.date >= start_date,
             YieldData.date <= end_date
         ).all()
-        if not records:
-            return np.array([]), np.array([]), np.array([])
-        
+    if not records:
+        return np.array([]), np.array([]), np.array([])
+
+    with timing.span("convert"):
         data = []
         for r in records:
             maturity = parse_maturity(r.label)
@@ -41,19 +42,17 @@ def get_yield_data(start_date, end_date):
                 "yield": float(r.close)
             })
         df = pd.DataFrame(data)
-        
+
         pivot_yield = df.pivot(index='date', columns='maturity', values='yield')
         desired_maturities = [3, 60, 120, 360]
         available = [m for m in desired_maturities if m in pivot_yield.columns]
         pivot_yield = pivot_yield[available] if available else pd.DataFrame()
-        
+
         if pivot_yield.empty:
             return np.array([]), np.array([]), np.array([])
-        
-        return (
-            pivot_yield.columns.to_numpy(),
-            pivot_yield.index.to_numpy(),
-            pivot_yield.to_numpy()
-        )
-    finally:
-        session.close()
\ No newline at end of file
+
+    return (
+        pivot_yield.columns.to_numpy(),
+        pivot_yield.index.to_numpy(),
+        pivot_yield.to_numpy()
+    )
\ No newline at end of file
@@ -1,31 +1,38 @@
+import logging
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from .data import get_yield_data
+import timing
+
+logger = logging.getLogger(__name__)
 
 def generate_yield_curve_html(issuer, start_date, end_date):
     x, y, z = get_yield_data(start_date, end_date)
-    print(f"Yield data dimensions - X: {len(x)}, Y: {len(y)}, Z: {z.shape}")
-    print(x, y, z)
-    fig = go.Figure(data=[
-        go.Surface(
-            z=z,
-            x=x, 
-            y=y,
-            colorscale="Viridis",
-            colorbar=dict(title="Yield (%)")
+    logger.debug("Yield data dimensions - X: %d, Y: %d, Z: %s", len(x), len(y), z.shape)
+    return yield_curve_figure_json(x, y, z)
+
+def yield_curve_figure_json(x, y, z):
+    with timing.span("serialize"):
+        fig = go.Figure(data=[
+            go.Surface(
+                z=z,
+                x=x, 
+                y=y,
+                colorscale="Viridis",
+                colorbar=dict(title="Yield (%)")
+            )
+        ])
+        fig.update_layout(
+            title="3D Interest Rate Term Structure",
+            scene=dict(
+                xaxis=dict(title="Maturity (Months)"),
+                yaxis=dict(title="Date"),
+                zaxis=dict(title="Yield (%)")
+            ),
+            margin=dict(l=0, r=0, b=0, t=50)
         )
-    ])
-    fig.update_layout(
-        title="3D Interest Rate Term Structure",
-        scene=dict(
-            xaxis=dict(title="Maturity (Months)"),
-            yaxis=dict(title="Date"),
-            zaxis=dict(title="Yield (%)")
-        ),
-        margin=dict(l=0, r=0, b=0, t=50)
-    )
-    return fig.to_json()
+        return fig.to_json()
 
 if __name__ == "__main__":
     import datetime
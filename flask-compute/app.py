@@ -1,62 +1,264 @@
 import sys
 import os
-from flask import Flask, request, jsonify
+import logging
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 
 IVSURFACE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, IVSURFACE_PATH)
 
+from graphs import GRAPH_TYPES, generate_graph, data_version, validate_parameters
+from compute_cache import result_cache, make_key
+from payloads import MEDIA_TYPES, negotiate_format, is_figure, encode_payload
+import compression
+from workers import compute_pool, ComputeTimeout
+from jobs import job_runner, JobStoreFull, JOB_TIMEOUT
+import db
+import warmup
+import timing
+
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+)
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 CORS(app)
 
+# Endpoints whose requests are traced into Server-Timing and /metrics.
+TRACED_ENDPOINTS = ('compute', 'submit_job', 'get_job_result')
+
+def cached(key, build, store=True):
+    """
+    `build()` through result_cache; with `store` false (data_version None)
+    it is always built and never kept.
+    """
+    if not store:
+        return build()
+    with timing.span("cache"):
+        value = result_cache.get(key)
+    if value is None:
+        value = build()
+        result_cache.set(key, value)
+    return value
+
+@app.before_request
+def start_trace():
+    g.db_scope = db.begin_scope()
+    if request.endpoint in TRACED_ENDPOINTS:
+        g.timing_token = timing.start_trace(timing.sampled())
+        g.graph_type = None
+
+@app.after_request
+def add_server_timing(response):
+    trace = timing.current() if 'timing_token' in g else None
+    if trace is not None:
+        trace.add("total", trace.elapsed())
+        response.headers['Server-Timing'] = timing.server_timing(trace)
+        timing.histograms.observe_trace(trace, g.graph_type or 'none')
+    return response
+
+@app.teardown_request
+def end_trace(exc):
+    db.end_scope(g.pop('db_scope', None))
+    token = g.pop('timing_token', None)
+    if token is not None:
+        timing.end_trace(token)
+
+def request_format(data=None):
+    return negotiate_format((data or {}).get('format') or request.args.get('format'), request.headers.get('Accept'))
+
+def validate_graph_request(data):
+    """
+    Error response for a malformed /compute or /jobs body, else None.
+    """
+    if not data:
+        logger.warning("Missing request body")
+        return jsonify({"error": "Missing request body"}), 400
+    if data.get('graphType') not in GRAPH_TYPES:
+        logger.warning("Invalid graph type: %s", data.get('graphType'))
+        return jsonify({"error": "Invalid graph type"}), 400
+    g.graph_type = data['graphType']
+    try:
+        validate_parameters(data['graphType'], data.get('parameters') or {})
+    except ValueError as e:
+        logger.warning("Invalid parameters: %s", e)
+        return jsonify({"error": str(e)}), 400
+    return None
+
+def figure_response(fig_json, graph_type, parameters, version, fmt):
+    coding = compression.negotiate_encoding(request.headers.get('Accept-Encoding'))
+    store = version is not None
+    if fmt == 'json' or not is_figure(fig_json):
+        if coding is None or len(fig_json) < compression.COMPRESS_MIN_BYTES:
+            return vary_on_encoding(jsonify({"plotly_json": fig_json}))
+        size, chunks, mimetype = len(fig_json), compression.iter_json_body(fig_json), 'application/json'
+    else:
+        def encode():
+            with timing.span("encode"):
+                return encode_payload(fig_json, fmt)
+        payload = cached(make_key(graph_type, parameters, version, variant=fmt), encode, store=store)
+        if coding is None or len(payload) < compression.COMPRESS_MIN_BYTES:
+            return vary_on_encoding(Response(payload, mimetype=MEDIA_TYPES[fmt]))
+        size, chunks, mimetype = len(payload), compression.iter_bytes(payload), MEDIA_TYPES[fmt]
+    level = compression.compression_level(coding, graph_type)
+    key = make_key(graph_type, parameters, version, variant=f"{fmt}.{coding}{level}") if store else None
+    with timing.span("cache"):
+        body = result_cache.get(key) if store else None
+    if body is None and size < compression.STREAM_MIN_BYTES:
+        with timing.span("compress"):
+            body = compression.compress(b"".join(chunks), coding, level)
+        if store:
+            result_cache.set(key, body)
+    if body is None:
+        body = stream_compressed(key, chunks, coding, level)
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Encoding'] = coding
+    return vary_on_encoding(response)
+
+def vary_on_encoding(response):
+    response.vary.add('Accept-Encoding')
+    return response
+
+def stream_compressed(key, chunks, coding, level):
+    """
+    Compress while sending (chunked transfer encoding) and cache the body
+    under `key`, unless it is None, once it has been sent in full.
+    """
+    blocks = []
+    for block in compression.iter_compressed(chunks, coding, level):
+        blocks.append(block)
+        yield block
+    if key is not None:
+        result_cache.set(key, b"".join(blocks))
+
 @app.route('/compute', methods=['POST'])
 def compute():
     try:
         data = request.json
-        print("✅ Received Data:", data)  # Debugging line
-        if not data:
-            print("❌ Missing request body")
-            return jsonify({"error": "Missing request body"}), 400
+        logger.debug("Received data: %s", data)
+        error = validate_graph_request(data)
+        if error:
+            return error
+
+        parameters = data.get('parameters', {})
+        graph_type = data.get('graphType')
+
+        try:
+            fmt = request_format(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        version = data_version(graph_type, parameters)
+        key = make_key(graph_type, parameters, version)
+        try:
+            fig_json = cached(key, lambda: compute_pool.run(key, graph_type, parameters, generate_graph),
+                              store=version is not None)
+        except ComputeTimeout as e:
+            logger.warning("Compute timed out: %s", e)
+            return jsonify({"error": "Computation timed out", "details": str(e)}), 504
+        return figure_response(fig_json, graph_type, parameters, version, fmt)
+
+    except Exception as e:
+        logger.exception("Internal Server Error")
+        return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
+def job_status(job):
+    status = {
+        "job_id": job['id'],
+        "graphType": job['graphType'],
+        "status": job['status'],
+        "progress": compute_pool.progress(job['key']) if job['status'] == 'running' else None,
+        "error": job['error'],
+    }
+    if job['status'] == 'done':
+        status["result_url"] = f"/jobs/{job['id']}/result"
+    return status
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Same body as /compute; responds at once with a job id to poll at
+    /jobs/<id> and fetch from /jobs/<id>/result.
+    """
+    try:
+        data = request.json
+        error = validate_graph_request(data)
+        if error:
+            return error
         parameters = data.get('parameters', {})
         graph_type = data.get('graphType')
+        version = data_version(graph_type, parameters)
+        key = make_key(graph_type, parameters, version)
+
+        sample = timing.sampled()
 
-        print("✅ Graph Type:", graph_type)  # Debugging line
-        print("✅ Parameters:", parameters)  # Debugging line
-
-        if graph_type == 'IVMap':
-            from IVSurface.IVmap import generate_iv_surface_html
-            print("✅ Generating IV Surface") 
-            fig_json = generate_iv_surface_html(
-                parameters.get('Ticker', 'AAPL'),
-                parameters.get('Start Date'),
-                parameters.get('End Date')
-            )
-        elif graph_type == 'OrderFlowCanyon':
-            from OrderFlowCanyon.main import generate_order_flow_html
-            fig_json = generate_order_flow_html(
-                parameters.get('Ticker', 'AAPL'),
-                parameters.get('Start Date'),
-                parameters.get('End Date')
-            )
-        elif graph_type == 'USFixedIncomeYield':
-            from YieldCurve.main import generate_yield_curve_html
-            fig_json = generate_yield_curve_html(
-                parameters.get('Issuer', 'US Treasury'),
-                parameters.get('Start Date'),
-                parameters.get('End Date')
-            )
-        else:
-            print("❌ Invalid graph type")
-            return jsonify({"error": "Invalid graph type"}), 400
-
-        return jsonify({"plotly_json": fig_json})
+        def build():
+            # Jobs outlive their request, so they are traced on their own.
+            with timing.tracing(sample) as trace:
+                result = cached(key, lambda: compute_pool.run(key, graph_type, parameters, generate_graph,
+                                                              timeout=JOB_TIMEOUT), store=version is not None)
+            if trace is not None:
+                trace.add("total", trace.elapsed())
+                timing.histograms.observe_trace(trace, f"{graph_type}:job")
+            return result
+        try:
+            job = job_runner.submit(build, result=result_cache.get(key) if version is not None else None,
+                                    graphType=graph_type,
+                                    parameters=parameters, version=version, key=key)
+        except JobStoreFull as e:
+            return jsonify({"error": "Too many jobs", "details": str(e)}), 503
+        logger.info("Job %s queued for %s", job['id'], graph_type)
+        return jsonify(job_status(job)), 202
 
     except Exception as e:
-        print("🔥 Internal Server Error:", str(e))  # Debugging line
+        logger.exception("Internal Server Error")
         return jsonify({"error": "Internal Server Error", "details": str(e)}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_runner.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job_status(job))
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """
+    The finished graph, in the same formats as /compute.
+    """
+    job = job_runner.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job['status'] == 'failed':
+        return jsonify({"error": "Job failed", "details": job['error']}), 500
+    if job['status'] != 'done':
+        return jsonify(job_status(job)), 409
+    try:
+        fmt = request_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return figure_response(job['result'], job['graphType'], job['parameters'], job['version'], fmt)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Per-stage latency histograms of traced requests and database pool
+    metrics (Prometheus text format).
+    """
+    return Response(timing.histograms.render() + db.pool_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/health/ready', methods=['GET'])
+def ready():
+    """
+    200 once start-up warm-up has finished, 503 before; the body carries
+    the warm-up timings either way.
+    """
+    return jsonify(warmup.status()), 200 if warmup.is_ready() else 503
 
 if __name__ == '__main__':
+    warmup.start_warmup(pool=compute_pool)
     port = int(os.environ.get("PORT", 5001))  # Use Railway's assigned port
     app.run(host="0.0.0.0", port=port)  # Bind to all interfaces
@@ -0,0 +1,116 @@
+import json
+import os
+import zlib
+
+from graphs import GRAPH_TYPES
+
+try:
+    import zstandard
+except ImportError:  # gzip only
+    zstandard = None
+
+# Content-Encodings in server preference order, used when the client
+# weights them equally.
+CODINGS = ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+ZSTD_LEVEL = int(os.getenv('ZSTD_LEVEL', 3))
+# Per graph type overrides, e.g. "OrderFlowCanyon=1,IVMap=9".
+GZIP_LEVELS = os.getenv('GZIP_LEVELS', '')
+ZSTD_LEVELS = os.getenv('ZSTD_LEVELS', '')
+# Bodies smaller than this are sent uncompressed.
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+# Bodies at least this large are compressed while they are sent, in
+# STREAM_CHUNK_BYTES pieces, instead of before the first byte goes out.
+STREAM_MIN_BYTES = int(os.getenv('STREAM_MIN_BYTES', 256 * 1024))
+STREAM_CHUNK_BYTES = int(os.getenv('STREAM_CHUNK_BYTES', 64 * 1024))
+
+def parse_levels(spec, default, name):
+    levels = {graph_type: default for graph_type in GRAPH_TYPES}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        graph_type, _, value = item.partition('=')
+        if graph_type.strip() not in levels:
+            raise ValueError(f"Unknown graph type in {name}: {graph_type}")
+        levels[graph_type.strip()] = int(value)
+    return levels
+
+LEVELS = {
+    'gzip': parse_levels(GZIP_LEVELS, GZIP_LEVEL, 'GZIP_LEVELS'),
+    'zstd': parse_levels(ZSTD_LEVELS, ZSTD_LEVEL, 'ZSTD_LEVELS'),
+}
+
+def compression_level(coding, graph_type):
+    return LEVELS[coding].get(graph_type, GZIP_LEVEL if coding == 'gzip' else ZSTD_LEVEL)
+
+def negotiate_encoding(accept_encoding=''):
+    """
+    Content-Encoding for an Accept-Encoding header: the acceptable coding
+    with the highest q-value, ties going to CODINGS order. None means
+    identity.
+    """
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = [piece.strip() for piece in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.lower()] = q
+    best, best_q = None, 0.0
+    for coding in CODINGS:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def compressor(coding, level):
+    """
+    Incremental compressor for `coding`.
+    Returns a tuple: (compress(chunk), flush(final=False))
+    where flush() ends the current block so the bytes so far can be sent.
+    """
+    if coding == 'gzip':
+        obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return obj.compress, lambda final=False: obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+    if coding == 'zstd' and zstandard is not None:
+        obj = zstandard.ZstdCompressor(level=level).compressobj()
+        return obj.compress, lambda final=False: obj.flush(
+            zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    raise ValueError(f"Unsupported content coding: {coding}")
+
+def compress(data, coding, level):
+    compress_chunk, flush = compressor(coding, level)
+    return compress_chunk(data) + flush(final=True)
+
+def iter_compressed(chunks, coding, level):
+    """
+    Compressed bytes of `chunks`, one flushed block per chunk so each is
+    ready to send as soon as it is compressed.
+    """
+    compress_chunk, flush = compressor(coding, level)
+    for chunk in chunks:
+        block = compress_chunk(chunk) + flush()
+        if block:
+            yield block
+    yield flush(final=True)
+
+def iter_json_body(fig_json, chunk_size=STREAM_CHUNK_BYTES):
+    """
+    The {"plotly_json": fig_json} response body, escaped piecewise so the
+    first chunk is ready before the whole string is.
+    """
+    yield b'{"plotly_json":"'
+    for start in range(0, len(fig_json), chunk_size):
+        yield json.dumps(fig_json[start:start + chunk_size])[1:-1].encode('ascii')
+    yield b'"}\n'
+
+def iter_bytes(payload, chunk_size=STREAM_CHUNK_BYTES):
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    for start in range(0, len(payload), chunk_size):
+        yield payload[start:start + chunk_size]
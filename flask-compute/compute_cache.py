@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+CACHE_MAX_ENTRIES = int(os.getenv('COMPUTE_CACHE_MAX_ENTRIES', 128))
+CACHE_MAX_BYTES = int(os.getenv('COMPUTE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+CACHE_DIR = os.getenv('COMPUTE_CACHE_DIR')
+CACHE_DISK_MAX_BYTES = int(os.getenv('COMPUTE_CACHE_DISK_MAX_BYTES', 1024 * 1024 * 1024))
+
+def normalize_parameters(parameters):
+    """
+    Canonical form of request parameters: blank values are dropped and
+    strings are stripped, so equivalent requests share a cache entry.
+    """
+    normalized = {}
+    for name, value in (parameters or {}).items():
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            continue
+        normalized[name.strip()] = value
+    return normalized
+
+def make_key(graph_type, parameters, version, variant=None):
+    payload = json.dumps(
+        [graph_type, normalize_parameters(parameters), str(version), variant],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class MemoryCache:
+    """
+    In-process LRU bounded by both entry count and total payload bytes.
+    """
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        nbytes = len(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = value
+            self.size += nbytes
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+class DiskCache:
+    """
+    One file per entry under `directory`. Reads refresh the file's mtime,
+    and writes evict the least recently used files beyond `max_bytes`.
+    """
+    def __init__(self, directory, max_bytes=CACHE_DISK_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.cache")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+# Disk entries are tagged so binary payloads round-trip as bytes.
+_TEXT, _BYTES = b's', b'b'
+
+class ResultCache:
+    """
+    Memory tier in front of an optional disk tier. Values are strings or
+    bytes; disk hits are promoted into memory.
+    """
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            raw = self.disk.get(key)
+            if raw is not None:
+                if raw[:1] == _BYTES:
+                    value = raw[1:]
+                else:
+                    # Entries written before tagging are untagged text.
+                    value = (raw[1:] if raw[:1] == _TEXT else raw).decode('utf-8')
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, _BYTES + value if isinstance(value, bytes) else _TEXT + value.encode('utf-8'))
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+result_cache = ResultCache(disk=DiskCache(CACHE_DIR) if CACHE_DIR else None)
+
+def invalidate():
+    """
+    Drop every cached result. daily_update calls this after writing rows so
+    that the shared disk tier does not keep entries for superseded data.
+    """
+    result_cache.clear()
@@ -1,135 +1,196 @@
 import os
-import requests
+import time
 from datetime import datetime
-from db import SessionLocal, OptionData, UnderlyingData, YieldData
+from functools import partial
+from db import SessionLocal, OptionData, UnderlyingData, YieldData, IngestWatermark, bulk_upsert, primary_reads
+from IVSurface.ChainArchive import archive_option_data
+from IVSurface.RateCurve import invalidate_rate_curve
+from IVSurface.SurfaceStore import materialize_iv_surfaces
+from fetcher import AlphaVantageClient, run_concurrently, FETCH_WORKERS
+import compute_cache
 
 ALPHA_VANTAGE_API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
+TICKERS = [t.strip() for t in os.getenv("DAILY_UPDATE_TICKERS", "AAPL,GOOGL,MSFT").split(",") if t.strip()]
+
+client = AlphaVantageClient(ALPHA_VANTAGE_API_KEY)
+
+def current_fetch_date():
+    """
+    Day-granular fetch stamp; part of the option_data conflict key, so one
+    snapshot is kept per contract per day.
+    """
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+def ingest(model, rows, conflict_columns, label):
+    """
+    Bulk insert `rows`, skipping ones already stored, and report the counts
+    and time taken for the table.
+    """
+    start = time.perf_counter()
+    inserted, skipped = bulk_upsert(model, rows, conflict_columns)
+    elapsed = time.perf_counter() - start
+    print(f"{model.__tablename__} [{label}]: {inserted} inserted, {skipped} skipped in {elapsed:.2f}s")
+    return {"table": model.__tablename__, "inserted": inserted, "skipped": skipped, "seconds": elapsed}
+
+def get_watermark(source, series):
+    """
+    Newest date already ingested for `series` of `source`, or None.
+    """
+    session = SessionLocal()
+    try:
+        return session.query(IngestWatermark.last_date).filter(
+            IngestWatermark.source == source, IngestWatermark.series == series
+        ).scalar()
+    finally:
+        session.close()
+
+def advance_watermark(source, series, rows, date_column):
+    """
+    Move the watermark of `series` up to the newest `date_column` among the
+    rows just ingested; left alone when there are none.
+    """
+    if not rows:
+        return
+    bulk_upsert(
+        IngestWatermark,
+        [{"source": source, "series": series, "last_date": max(row[date_column] for row in rows),
+          "updated_at": datetime.utcnow()}],
+        ["source", "series"],
+        update_columns=["last_date", "updated_at"]
+    )
 
 def fetch_stock_data(ticker):
-    url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={ticker}&apikey={ALPHA_VANTAGE_API_KEY}&outputsize=compact"
-    response = requests.get(url)
-    return response.json()
+    return client.query(function="TIME_SERIES_DAILY", symbol=ticker, outputsize="compact")
 
-def update_underlying_data(ticker):
-    data = fetch_stock_data(ticker)
+def update_underlying_data(ticker, data=None):
+    if data is None:
+        data = fetch_stock_data(ticker)
     time_series = data.get("Time Series (Daily)", {})
-    session = SessionLocal()
+    fetch_date = current_fetch_date()
     try:
-        for date_str, daily_data in time_series.items():
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-            exists = session.query(UnderlyingData).filter(UnderlyingData.ticker == ticker, UnderlyingData.date == date_obj).first()
-            if not exists:
-                close_price = float(daily_data["4. close"])
-                record = UnderlyingData(
-                    ticker=ticker,
-                    date=date_obj,
-                    close=close_price,
-                    fetch_date=datetime.utcnow().strftime("%Y-%m-%d")
-                )
-                session.add(record)
-        session.commit()
+        # ISO dates compare as strings, so older entries are never parsed.
+        mark = get_watermark("underlying", ticker)
+        mark = mark.isoformat() if mark else ""
+        rows = [
+            {
+                "ticker": ticker,
+                "date": datetime.strptime(date_str, "%Y-%m-%d").date(),
+                "close": float(daily_data["4. close"]),
+                "fetch_date": fetch_date
+            }
+            for date_str, daily_data in time_series.items() if date_str > mark
+        ]
+        result = ingest(UnderlyingData, rows, ["ticker", "date"], ticker)
+        advance_watermark("underlying", ticker, rows, "date")
+        return result
     except Exception as e:
-        session.rollback()
         print(f"Error updating underlying data for {ticker}: {e}")
-    finally:
-        session.close()
 
 def fetch_option_data(ticker):
-    url = f"https://www.alphavantage.co/query?function=HISTORICAL_OPTIONS&symbol={ticker}&apikey={ALPHA_VANTAGE_API_KEY}"
-    response = requests.get(url)
-    return response.json()
+    return client.query(function="HISTORICAL_OPTIONS", symbol=ticker)
 
-def update_option_data(ticker):
-    data = fetch_option_data(ticker)
-    session = SessionLocal()
+def update_option_data(ticker, data=None):
+    """
+    Store today's chain for `ticker`. The download is skipped when today's
+    chain is already stored, since there is one snapshot per day.
+    """
+    fetch_date = current_fetch_date()
+    if data is None:
+        mark = get_watermark("options", ticker)
+        if mark is not None and mark >= fetch_date.date():
+            print(f"option_data [{ticker}]: chain for {fetch_date.date()} already stored")
+            return {"table": OptionData.__tablename__, "inserted": 0, "skipped": 0, "seconds": 0.0}
+        data = fetch_option_data(ticker)
     try:
+        rows = []
         for option in data.get("data", []):
-            expiration_str = option.get("expiration")
-            exp_date = datetime.strptime(expiration_str, "%Y-%m-%d").date()
-            
             option_type = option.get("type", "").lower()
-            mapped_type = "calls" if option_type == "call" else "puts" if option_type == "put" else option_type
-
-            strike = float(option.get("strike", 0))
-            bid = float(option.get("bid", 0))
-            ask = float(option.get("ask", 0))
-            last_price = float(option.get("last", 0))
-            
-            exists = session.query(OptionData).filter(
-                OptionData.ticker == ticker,
-                OptionData.expiration_date == exp_date,
-                OptionData.option_type == mapped_type,
-                OptionData.strike == strike
-            ).first()
-            
-            if not exists:
-                record = OptionData(
-                    ticker=ticker,
-                    expiration_date=exp_date,
-                    option_type=mapped_type,
-                    strike=strike,
-                    bid=bid,
-                    ask=ask,
-                    last_price=last_price,
-                    fetch_date=datetime.utcnow().strftime("%Y-%m-%d")
-                )
-                session.add(record)
-        
-        session.commit()
+            rows.append({
+                "ticker": ticker,
+                "expiration_date": datetime.strptime(option.get("expiration"), "%Y-%m-%d").date(),
+                "option_type": "calls" if option_type == "call" else "puts" if option_type == "put" else option_type,
+                "strike": float(option.get("strike", 0)),
+                "bid": float(option.get("bid", 0)),
+                "ask": float(option.get("ask", 0)),
+                "last_price": float(option.get("last", 0)),
+                "fetch_date": fetch_date
+            })
+        result = ingest(OptionData, rows, ["ticker", "expiration_date", "option_type", "strike", "fetch_date"], ticker)
+        advance_watermark("options", ticker, [{"date": fetch_date.date()}] if rows else [], "date")
+        return result
     except Exception as e:
-        session.rollback()
         print(f"Error updating options data for {ticker}: {e}")
-    finally:
-        session.close()
 
 def fetch_yield_data(ticker):
-    url = f"https://www.alphavantage.co/query?function=TREASURY_YIELD&sinterval=daily&maturity={ticker}&apikey={ALPHA_VANTAGE_API_KEY}"
-    response = requests.get(url)
-    return response.json()
-
-def update_yield_data():
-    yields_info = {
-        "^IRX": "3month",
-        "^FVX": "5year",
-        "^TNX": "10year",
-        "^TYX": "30year"
-    }
-    
-    session = SessionLocal()
+    return client.query(function="TREASURY_YIELD", sinterval="daily", maturity=ticker)
+
+YIELDS_INFO = {
+    "^IRX": "3month",
+    "^FVX": "5year",
+    "^TNX": "10year",
+    "^TYX": "30year"
+}
+
+def update_yield_data(data=None):
+    """
+    `data` maps maturity to its Alpha Vantage payload; missing maturities
+    are fetched concurrently.
+    """
+    data = dict(data or {})
+    missing = [m for m in YIELDS_INFO.values() if m not in data]
+    if missing:
+        data.update(run_concurrently([(m, partial(fetch_yield_data, m)) for m in missing]))
+
+    fetch_date = current_fetch_date()
     try:
-        for ticker, maturity in yields_info.items():
-            data = fetch_yield_data(maturity)
-            print(data)
-            yield_list = data.get("data", [])
-            
-            for entry in yield_list:
-                date_obj = datetime.strptime(entry["date"], "%Y-%m-%d").date()
-                exists = session.query(YieldData).filter(
-                    YieldData.ticker == ticker, 
-                    YieldData.date == date_obj
-                ).first()
-                if not exists:
-                    close_price = float(entry["value"])
-                    record = YieldData(
-                        label=maturity,
-                        ticker=ticker,
-                        date=date_obj,
-                        close=close_price,
-                        fetch_date=datetime.utcnow().strftime("%Y-%m-%d")
-                    )
-                    session.add(record)
-            session.commit()
+        rows = []
+        new_rows = {}
+        for ticker, maturity in YIELDS_INFO.items():
+            mark = get_watermark("yields", maturity)
+            mark = mark.isoformat() if mark else ""
+            # Stored entries are skipped unparsed; "." marks a day without a quote.
+            new_rows[maturity] = []
+            for entry in (data[maturity] or {}).get("data", []):
+                if entry["date"] <= mark or entry["value"] == ".":
+                    continue
+                new_rows[maturity].append({
+                    "label": maturity,
+                    "ticker": ticker,
+                    "date": datetime.strptime(entry["date"], "%Y-%m-%d").date(),
+                    "close": float(entry["value"]),
+                    "fetch_date": fetch_date
+                })
+            rows += new_rows[maturity]
+        result = ingest(YieldData, rows, ["ticker", "date"], "treasuries")
+        for maturity, series_rows in new_rows.items():
+            advance_watermark("yields", maturity, series_rows, "date")
+        if rows:
+            # Surfaces materialized after the update are solved on the new curve.
+            invalidate_rate_curve()
+        return result
     except Exception as e:
-        session.rollback()
         print(f"Error updating yield data: {e}")
-    finally:
-        session.close()
 
 
-if __name__ == "__main__":
-    tickers = ["AAPL", "GOOGL", "MSFT"]
+def run_daily_update(tickers=TICKERS, max_workers=FETCH_WORKERS):
+    """
+    Fetch and ingest every ticker concurrently. All jobs share the client's
+    connection pool and rate limiter, so throughput tracks the API quota
+    rather than request latency.
+    """
+    jobs = []
     for ticker in tickers:
-        update_underlying_data(ticker)
-        update_option_data(ticker)
-    update_yield_data()
+        jobs.append((f"{ticker} underlying", partial(update_underlying_data, ticker)))
+        jobs.append((f"{ticker} options", partial(update_option_data, ticker)))
+    jobs.append(("treasury yields", update_yield_data))
+    return run_concurrently(jobs, max_workers=max_workers)
+
+
+if __name__ == "__main__":
+    run_daily_update()
+    # Archiving and materializing read back what was just written.
+    with primary_reads():
+        archive_option_data()
+        materialize_iv_surfaces()
+    compute_cache.invalidate()
     print("Daily update complete.")
\ No newline at end of file
@@ -1,14 +1,189 @@
-from sqlalchemy import create_engine, Column, Integer, String, Numeric, Date, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import contextvars
 import os
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, select, func, Column, Integer, String, Numeric, Date, DateTime, JSON, Index
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, sessionmaker
+import timing
 
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Read-only compute queries go here when set; writes always use DATABASE_URL.
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))
+# QueuePool settings, per engine and per process. SQLite keeps its own pools.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') != '0'
+
+class PoolMetrics:
+    """
+    Checkout, connect and invalidation counts per engine from pool events,
+    plus how long read_connection() waited for a connection.
+    """
+    def __init__(self):
+        self.counts = {}
+        self.engines = {}
+        self.wait = timing.Histograms(name='db_pool_wait_seconds', labels=('pool', 'operation'),
+                                      description='Time spent waiting for a pooled database connection.')
+        self._lock = threading.Lock()
+
+    def watch(self, name, engine):
+        self.engines[name] = engine
+        for event_name in ('checkout', 'connect', 'invalidate'):
+            event.listen(engine.pool, event_name, lambda *args, key=(name, event_name): self.count(key))
 
-engine = create_engine(DATABASE_URL)
+    def count(self, key):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def render(self):
+        lines = ['# HELP db_pool_events_total Pool checkouts, new connections and invalidations.',
+                 '# TYPE db_pool_events_total counter']
+        with self._lock:
+            for (name, event_name), n in sorted(self.counts.items()):
+                lines.append(f'db_pool_events_total{{pool="{name}",event="{event_name}"}} {n}')
+        lines += ['# HELP db_pool_connections Pool size and connections by state.',
+                  '# TYPE db_pool_connections gauge']
+        for name, engine in self.engines.items():
+            for state in ('size', 'checkedin', 'checkedout', 'overflow'):
+                # QueuePool only; SQLite's pools do not track these.
+                value = getattr(engine.pool, state, None)
+                if callable(value):
+                    lines.append(f'db_pool_connections{{pool="{name}",state="{state}"}} {value()}')
+        return '\n'.join(lines) + '\n' + self.wait.render()
+
+def make_engine(url):
+    if make_url(url).get_backend_name() == 'sqlite':
+        return create_engine(url)
+    return create_engine(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT,
+                         pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING)
+
+engine = make_engine(DATABASE_URL)
+read_engine = make_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+pool_metrics = PoolMetrics()
+pool_metrics.watch('primary', engine)
+if read_engine is not engine:
+    pool_metrics.watch('replica', read_engine)
+
+def dispose_engines(close=False):
+    """
+    Drop pooled connections, e.g. those inherited across a fork.
+    """
+    engine.dispose(close=close)
+    if read_engine is not engine:
+        read_engine.dispose(close=close)
+
+class _Scope:
+    __slots__ = ('connection',)
+
+    def __init__(self):
+        self.connection = None
+
+_scope = contextvars.ContextVar('db_scope', default=None)
+_primary_reads = contextvars.ContextVar('db_primary_reads', default=False)
+
+def begin_scope():
+    """
+    Start a scope in which read_connection() hands out one connection,
+    checked out on first use. Returns the token for end_scope(), or None
+    when a scope is already open.
+    """
+    if _scope.get() is not None:
+        return None
+    return _scope.set(_Scope())
+
+def end_scope(token):
+    if token is None:
+        return
+    scope = _scope.get()
+    _scope.reset(token)
+    if scope.connection is not None:
+        scope.connection.close()
+
+@contextmanager
+def request_scope():
+    token = begin_scope()
+    try:
+        yield
+    finally:
+        end_scope(token)
+
+@contextmanager
+def primary_reads():
+    """
+    Route read_connection() to the primary, for readers that must see rows
+    they have just written (daily_update).
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+def _checkout(target, name):
+    started = time.perf_counter()
+    connection = target.connect()
+    waited = time.perf_counter() - started
+    pool_metrics.wait.observe(name, 'checkout', waited)
+    timing.add('pool', waited)
+    return connection
+
+@contextmanager
+def read_connection():
+    """
+    Connection for read-only compute queries: the replica when one is
+    configured, and inside a request scope the scope's shared connection.
+    """
+    target = engine if _primary_reads.get() else read_engine
+    name = 'primary' if target is engine else 'replica'
+    scope = _scope.get()
+    if scope is None or _primary_reads.get():
+        connection = _checkout(target, name)
+        try:
+            yield connection
+        finally:
+            connection.close()
+        return
+    if scope.connection is None:
+        scope.connection = _checkout(target, name)
+    try:
+        yield scope.connection
+    finally:
+        # Reads need no transaction between statements; do not sit idle in one.
+        if scope.connection.in_transaction():
+            scope.connection.rollback()
+
+def release_connection():
+    """
+    Return the scope's connection to the pool before a long wait, e.g. on
+    the compute pool; the next read checks one out again.
+    """
+    scope = _scope.get()
+    if scope is not None and scope.connection is not None:
+        scope.connection.close()
+        scope.connection = None
+
+@contextmanager
+def read_session():
+    """
+    ORM session on read_connection(); closing it leaves the connection to
+    its scope.
+    """
+    with read_connection() as connection:
+        session = Session(bind=connection)
+        try:
+            yield session
+        finally:
+            session.close()
+
 class OptionData(Base):
     __tablename__ = 'option_data'
     id = Column(Integer, primary_key=True, index=True)
@@ -20,6 +195,21 @@ class OptionData(Base):
     ask = Column(Numeric)
     last_price = Column(Numeric)
     fetch_date = Column(DateTime)
+    __table_args__ = (
+        Index('uq_option_data_contract_fetch', 'ticker', 'expiration_date', 'option_type', 'strike', 'fetch_date', unique=True),
+        # load_chain and get_data_version: ticker and latest fetch_date first
+        Index('ix_option_data_ticker_fetch', 'ticker', 'fetch_date', 'option_type', 'expiration_date'),
+    )
+
+class IVSurfaceData(Base):
+    __tablename__ = 'iv_surface_data'
+    id = Column(Integer, primary_key=True, index=True)
+    ticker = Column(String, index=True)
+    as_of = Column(Date)
+    data_version = Column(String)
+    points = Column(JSON)  # solved (moneyness, tte, iv) points and their Greeks for calls and puts
+    grid = Column(JSON)  # default 50x50 interpolated surface
+    fetch_date = Column(DateTime)
 
 class UnderlyingData(Base):
     __tablename__ = 'underlying_data'
@@ -28,6 +218,13 @@ class UnderlyingData(Base):
     date = Column(Date)
     close = Column(Numeric)
     fetch_date = Column(DateTime)
+    __table_args__ = (
+        # Also serves get_underlying_price (latest date for one ticker) by
+        # scanning backwards, so no separate (ticker, date DESC) index.
+        Index('uq_underlying_data_ticker_date', 'ticker', 'date', unique=True),
+        # get_data_version: latest fetch_date of one ticker
+        Index('ix_underlying_data_ticker_fetch', 'ticker', 'fetch_date'),
+    )
 
 class YieldData(Base):
     __tablename__ = 'yield_data'
@@ -37,10 +234,97 @@ class YieldData(Base):
     date = Column(Date)
     close = Column(Numeric)
     fetch_date = Column(DateTime)
+    __table_args__ = (
+        Index('uq_yield_data_ticker_date', 'ticker', 'date', unique=True),
+        # get_yield_data: date range across all maturities
+        Index('ix_yield_data_date', 'date'),
+        # get_data_version: latest fetch_date of any maturity
+        Index('ix_yield_data_fetch_date', 'fetch_date'),
+    )
+
+class IngestWatermark(Base):
+    __tablename__ = 'ingest_watermark'
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String)  # underlying, options or yields
+    series = Column(String)  # ticker or Treasury maturity
+    last_date = Column(Date)  # newest date ingested for the series
+    updated_at = Column(DateTime)
+    __table_args__ = (
+        Index('uq_ingest_watermark_source_series', 'source', 'series', unique=True),
+    )
+
+def data_version_queries(ticker=None):
+    """
+    The get_data_version statements, one (max fetch_date, max id) row each.
+    Each maximum is its own subquery so it is a single index seek instead
+    of a scan of the stored history; a cache hit still runs these.
+    """
+    def stamp(model, *where):
+        return select(
+            select(func.max(model.fetch_date)).where(*where).scalar_subquery(),
+            select(func.max(model.id)).where(*where).scalar_subquery(),
+        )
+    if ticker is None:
+        return [stamp(YieldData)]
+    return [
+        stamp(OptionData, OptionData.ticker == ticker),
+        stamp(UnderlyingData, UnderlyingData.ticker == ticker),
+    ]
+
+def get_data_version(ticker=None):
+    """
+    Stamp of the stored data behind a computation: latest fetch_date and
+    highest id of the option and underlying rows for `ticker`, or of the
+    yield rows when no ticker is given. Any daily_update write changes it.
+    """
+    with read_connection() as conn:
+        return "|".join(f"{fetch_date}#{max_id}" for stmt in data_version_queries(ticker)
+                        for fetch_date, max_id in conn.execute(stmt))
+
+def get_surface_version(ticker):
+    """
+    Stamp of the data behind an IV or Greek surface: the option and
+    underlying rows of `ticker`, plus the yields its risk-free rates come
+    from.
+    """
+    return f"{get_data_version(ticker)}|{get_data_version(None)}"
+
+def bulk_upsert(model, rows, conflict_columns, update_columns=(), batch_size=BULK_BATCH_SIZE):
+    """
+    Set-based INSERT ... ON CONFLICT in batches of `batch_size` rows.
+    Rows clashing with `conflict_columns` are skipped, or have
+    `update_columns` overwritten when given. Uses the PostgreSQL dialect in
+    production and the SQLite one (same syntax) in tests.
+    Returns a tuple: (rows written, rows skipped)
+    """
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    # One statement may not touch the same row twice, so collapse duplicates.
+    unique_rows = list({tuple(row[c] for c in conflict_columns): row for row in rows}.values())
+    stmt = insert(model)
+    if update_columns:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={c: stmt.excluded[c] for c in update_columns}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+    # Compiled once; executemany sends each batch as one multi-row VALUES.
+    stmt = stmt.returning(model.id).execution_options(insertmanyvalues_page_size=batch_size)
+    written = 0
+    with engine.begin() as conn:
+        for start in range(0, len(unique_rows), batch_size):
+            written += len(conn.execute(stmt, unique_rows[start:start + batch_size]).fetchall())
+    return written, len(rows) - written
 
 def init_db():
     print(DATABASE_URL, 'DATABASE_URL')
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables; bring their indexes up to date.
+    from migrations import upgrade
+    upgrade()
 
 if __name__ == "__main__":
     init_db()
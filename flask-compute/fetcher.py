@@ -0,0 +1,112 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+
+ALPHA_VANTAGE_BASE_URL = os.getenv("ALPHA_VANTAGE_BASE_URL", "https://www.alphavantage.co/query")
+ALPHA_VANTAGE_RPM = float(os.getenv("ALPHA_VANTAGE_RPM", 75))
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 8))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", 4))
+
+# Alpha Vantage answers throttled calls with HTTP 200 and one of these keys.
+THROTTLE_KEYS = ("Note", "Information")
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, holding at most
+    `capacity`. acquire() blocks until a token is available. `clock` and
+    `sleep` can be replaced by fakes in tests.
+    """
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                # Slack for float rounding: after sleeping exactly `wait`,
+                # the refill can fall a hair short of a whole token.
+                if self.tokens >= 1 - 1e-9:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+class RateLimitedError(Exception):
+    pass
+
+class AlphaVantageClient:
+    """
+    Pooled Alpha Vantage session shared by all fetch threads. Every call
+    takes a token from one bucket sized to the account's per-minute quota,
+    and retries with exponential backoff on connection errors, 429/5xx
+    responses and throttle notices.
+    """
+    def __init__(self, api_key=None, base_url=ALPHA_VANTAGE_BASE_URL, requests_per_minute=ALPHA_VANTAGE_RPM,
+                 pool_size=FETCH_WORKERS, retries=FETCH_RETRIES, backoff=1.0, timeout=60):
+        self.api_key = api_key if api_key is not None else os.getenv("ALPHA_VANTAGE_API_KEY")
+        self.base_url = base_url
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(requests_per_minute / 60.0, capacity=max(1, int(requests_per_minute // 60)))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def query(self, **params):
+        params["apikey"] = self.api_key
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise RateLimitedError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                data = response.json()
+                if any(key in data for key in THROTTLE_KEYS) and len(data) == 1:
+                    raise RateLimitedError(next(iter(data.values())))
+                return data
+            except (requests.ConnectionError, requests.Timeout, RateLimitedError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * (1 + random.random())
+                print(f"Retrying {params.get('function')} {params.get('symbol', params.get('maturity', ''))} in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+def run_concurrently(jobs, max_workers=FETCH_WORKERS):
+    """
+    Run (name, callable) jobs on a thread pool, printing per-job progress
+    and timing. Returns {name: result}; failed jobs map to None.
+    """
+    results = {}
+    start = time.perf_counter()
+
+    def timed(fn):
+        job_start = time.perf_counter()
+        return fn(), time.perf_counter() - job_start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(timed, fn): name for name, fn in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                results[name], elapsed = future.result()
+                print(f"[{done}/{len(futures)}] {name} done in {elapsed:.2f}s")
+            except Exception as e:
+                results[name] = None
+                print(f"[{done}/{len(futures)}] {name} failed: {e}")
+    print(f"{len(futures)} jobs finished in {time.perf_counter() - start:.2f}s")
+    return results
@@ -0,0 +1,98 @@
+from datetime import date, datetime, timezone
+
+# Surfaces of one BSMCompute Greek, solved alongside the IV surface.
+GREEK_GRAPH_TYPES = {
+    'DeltaSurface': 'delta',
+    'GammaSurface': 'gamma',
+    'VegaSurface': 'vega',
+    'ThetaSurface': 'theta',
+    'VannaSurface': 'vanna',
+}
+GRAPH_TYPES = ('IVMap', 'OrderFlowCanyon', 'USFixedIncomeYield') + tuple(GREEK_GRAPH_TYPES)
+
+def generate_graph(graph_type, parameters):
+    """
+    Dispatch a /compute request to its generator and return the Plotly JSON.
+    Generators are imported lazily so a request only pays for its own graph.
+    """
+    if graph_type == 'IVMap':
+        from IVSurface.IVmap import generate_iv_surface_html
+        return generate_iv_surface_html(
+            parameters.get('Ticker', 'AAPL'),
+            parameters.get('Start Date'),
+            parameters.get('End Date'),
+            fit=parameters.get('Surface Fit'),
+            grid_size=parameters.get('Grid Size'),
+            as_of=parameters.get('As Of')
+        )
+    elif graph_type in GREEK_GRAPH_TYPES:
+        from IVSurface.IVmap import generate_greek_surface_html
+        return generate_greek_surface_html(
+            parameters.get('Ticker', 'AAPL'),
+            GREEK_GRAPH_TYPES[graph_type],
+            parameters.get('Start Date'),
+            parameters.get('End Date'),
+            contract_type=parameters.get('Contract Type', 'calls'),
+            fit=parameters.get('Surface Fit'),
+            grid_size=parameters.get('Grid Size')
+        )
+    elif graph_type == 'OrderFlowCanyon':
+        from OrderFlowCanyon.main import generate_order_flow_html
+        return generate_order_flow_html(
+            parameters.get('Ticker', 'AAPL'),
+            parameters.get('Start Date'),
+            parameters.get('End Date'),
+            parameters.get('Aggregation')
+        )
+    elif graph_type == 'USFixedIncomeYield':
+        from YieldCurve.main import generate_yield_curve_html
+        return generate_yield_curve_html(
+            parameters.get('Issuer', 'US Treasury'),
+            parameters.get('Start Date'),
+            parameters.get('End Date')
+        )
+    raise ValueError(f"Invalid graph type: {graph_type}")
+
+def validate_parameters(graph_type, parameters):
+    """
+    Raise ValueError for parameters a generator would reject, so they are
+    answered with a 400 before any computation is queued.
+    """
+    if graph_type == 'IVMap' or graph_type in GREEK_GRAPH_TYPES:
+        if parameters.get('Grid Size') not in (None, ''):
+            from IVSurface.IVmap import parse_grid_size
+            parse_grid_size(parameters['Grid Size'])
+        if parameters.get('Surface Fit') not in (None, ''):
+            if graph_type == 'IVMap':
+                from IVSurface.SurfaceFit import SURFACE_FITS as fits
+            else:
+                from IVSurface.IVmap import GREEK_SURFACE_FITS as fits
+            if parameters['Surface Fit'] not in fits:
+                raise ValueError(f"Surface Fit must be one of {sorted(fits)}.")
+    if graph_type in GREEK_GRAPH_TYPES and parameters.get('Contract Type', 'calls') not in ('calls', 'puts'):
+        raise ValueError("Contract Type must be 'calls' or 'puts'.")
+
+def data_version(graph_type, parameters):
+    """
+    Stamp identifying the stored data a graph is computed from. It changes
+    whenever daily_update writes new rows, so cached results keyed on it
+    are never served stale. None means the data is still changing and the
+    result must not be cached.
+    """
+    from db import get_data_version, get_surface_version
+    if graph_type == 'IVMap' or graph_type in GREEK_GRAPH_TYPES:
+        return get_surface_version(parameters.get('Ticker', 'AAPL'))
+    elif graph_type == 'USFixedIncomeYield':
+        return get_data_version(None)
+    # Order flow comes from Databento's historical API, where complete UTC
+    # days never change. A range reaching into today is still filling in.
+    # Default date ranges are relative to today, so they are reused within
+    # a day.
+    end_date = parameters.get('End Date')
+    if end_date in (None, ''):
+        return date.today().isoformat()
+    from OrderFlowCanyon.store import to_utc
+    end = to_utc(end_date)
+    if end > to_utc(datetime.now(timezone.utc).date()):
+        return None
+    return end.isoformat()
@@ -0,0 +1,30 @@
+import os
+
+# gunicorn app:app -c gunicorn.conf.py
+#
+# One web process with request threads; the CPU-bound graph generation runs
+# in its COMPUTE_WORKERS process pool (workers.py). Keeping a single web
+# process means the result cache and in-flight deduplication see every
+# request. Raise WEB_CONCURRENCY only to spread request handling itself.
+bind = f"0.0.0.0:{os.getenv('PORT', 5001)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', 16))
+# Longer than COMPUTE_TIMEOUT so slow graphs get a 504 instead of a killed
+# worker.
+timeout = int(float(os.getenv('COMPUTE_TIMEOUT', 60))) + 30
+graceful_timeout = 30
+preload_app = True
+
+def post_fork(server, worker):
+    # The preloaded app may have opened database connections in the master.
+    from db import dispose_engines
+    dispose_engines()
+    # /health/ready answers 503 until this finishes.
+    import warmup
+    from workers import compute_pool
+    warmup.start_warmup(pool=compute_pool)
+
+def worker_exit(server, worker):
+    from workers import compute_pool
+    compute_pool.shutdown()
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_TTL = float(os.getenv('JOB_TTL', 900))
+JOB_MAX_ENTRIES = int(os.getenv('JOB_MAX_ENTRIES', 256))
+JOB_THREADS = int(os.getenv('JOB_THREADS', 8))
+# Jobs exist for graphs slower than an HTTP request, so they get a longer
+# budget than COMPUTE_TIMEOUT.
+JOB_TIMEOUT = float(os.getenv('JOB_TIMEOUT', 900))
+
+logger = logging.getLogger(__name__)
+
+class JobStoreFull(Exception):
+    pass
+
+class JobStore:
+    """
+    In-memory job records, results included. Finished jobs expire `ttl`
+    seconds after they finish; beyond `max_entries` the oldest finished
+    jobs are dropped first, and new jobs are refused if every slot holds a
+    running one.
+    """
+    def __init__(self, max_entries=JOB_MAX_ENTRIES, ttl=JOB_TTL, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        now = self.clock()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] is not None and now - job['finished'] > self.ttl]:
+            del self._jobs[job_id]
+        if len(self._jobs) >= self.max_entries:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job['finished'] is not None]:
+                del self._jobs[job_id]
+                if len(self._jobs) < self.max_entries:
+                    break
+
+    def create(self, **fields):
+        job = dict(fields, id=uuid.uuid4().hex, status='queued', created=self.clock(),
+                   finished=None, result=None, error=None)
+        with self._lock:
+            self._expire()
+            if len(self._jobs) >= self.max_entries:
+                raise JobStoreFull(f"{self.max_entries} jobs are already running")
+            self._jobs[job['id']] = job
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if fields.get('status') in ('done', 'failed'):
+                fields['finished'] = self.clock()
+            job.update(fields)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+class JobRunner:
+    """
+    Runs build() for each submitted job on a background thread pool and
+    records its outcome in `store`.
+    """
+    def __init__(self, store=None, threads=JOB_THREADS):
+        self.store = store if store is not None else JobStore()
+        self.threads = threads
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='job')
+            return self._executor
+
+    def _run(self, job_id, build):
+        self.store.update(job_id, status='running')
+        try:
+            result = build()
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self.store.update(job_id, status='failed', error=str(e))
+        else:
+            self.store.update(job_id, status='done', result=result)
+
+    def submit(self, build, result=None, **fields):
+        """
+        New job record; `build` runs in the background unless `result` is
+        already known (e.g. from the result cache).
+        """
+        job = self.store.create(**fields)
+        if result is not None:
+            self.store.update(job['id'], status='done', result=result)
+        else:
+            self.executor.submit(self._run, job['id'], build)
+        return self.store.get(job['id'])
+
+job_runner = JobRunner()
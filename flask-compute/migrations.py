@@ -0,0 +1,93 @@
+from datetime import date, timedelta
+from sqlalchemy import inspect, select, text
+from db import engine, Base, UnderlyingData, YieldData, data_version_queries
+from IVSurface.DataSourcing import chain_query
+
+# Composite indexes serving the hot read paths; see hot_queries().
+HOT_PATH_INDEXES = (
+    'ix_option_data_ticker_fetch',
+    'ix_underlying_data_ticker_fetch',
+    'ix_yield_data_date',
+    'ix_yield_data_fetch_date',
+)
+# Indexes no query uses any more, by table; upgrade() drops them.
+RETIRED_INDEXES = {
+    'option_data': ('ix_option_data_ticker_type_expiration',),
+}
+
+def upgrade():
+    """
+    Create every index declared on the models that is missing from the
+    database and drop the RETIRED_INDEXES. Safe to rerun; tables created
+    before an index was added to the models pick it up here.
+    """
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = _existing_indexes(table.name)
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+        for name in RETIRED_INDEXES.get(table.name, ()):
+            if name in existing:
+                with engine.begin() as conn:
+                    conn.execute(text(f'DROP INDEX {name}'))
+    return created
+
+def downgrade():
+    """
+    Drop the HOT_PATH_INDEXES. Used by the index benchmark for its
+    "before" timings.
+    """
+    dropped = []
+    for table in Base.metadata.sorted_tables:
+        existing = _existing_indexes(table.name)
+        for index in table.indexes:
+            if index.name in HOT_PATH_INDEXES and index.name in existing:
+                index.drop(bind=engine)
+                dropped.append(index.name)
+    return dropped
+
+def _existing_indexes(table_name):
+    return {ix['name'] for ix in inspect(engine).get_indexes(table_name)}
+
+def hot_queries(ticker='AAPL', today=None):
+    """
+    The statements behind DataSourcing.load_chain, the option stamp of
+    db.get_data_version, DataSourcing.get_underlying_price and
+    YieldCurve.data.get_yield_data.
+    """
+    today = today or date.today()
+    return {
+        'option_chain': chain_query(ticker, end_date=(today + timedelta(days=180)).isoformat(), today=today),
+        'option_version': data_version_queries(ticker)[0],
+        'underlying_price': select(UnderlyingData).where(
+            UnderlyingData.ticker == ticker
+        ).order_by(UnderlyingData.date.desc()).limit(1),
+        'yield_range': select(YieldData).where(
+            YieldData.date >= today - timedelta(days=365),
+            YieldData.date <= today,
+        ),
+    }
+
+def explain(stmt):
+    """
+    Query plan for `stmt` as a list of lines, in the dialect's own format.
+    """
+    compiled = stmt.compile(bind=engine, compile_kwargs={'literal_binds': True})
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with engine.connect() as conn:
+        rows = conn.execute(text(prefix + str(compiled))).fetchall()
+    return [str(row[-1]) for row in rows]
+
+def print_plans(ticker='AAPL'):
+    for name, stmt in hot_queries(ticker).items():
+        print(f"{name}:")
+        for line in explain(stmt):
+            print(f"    {line}")
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    print("Created indexes:", upgrade() or "none")
+    print_plans()
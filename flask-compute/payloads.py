@@ -0,0 +1,167 @@
+import base64
+import json
+import numpy as np
+
+FORMATS = ('json', 'bdata', 'arrow')
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'bdata': 'application/vnd.plotly.v1+json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+ARRAY_KEYS = ('x', 'y', 'z', 'surfacecolor')
+# float64 arrays are sent as float32 when no element moves by more than this
+# fraction of the array's range, far below a pixel at any plot size.
+FLOAT32_SPAN_TOL = 1e-5
+# Plotly.js typed arrays have no 64-bit integer dtype.
+INT_DTYPES = (np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32)
+
+def negotiate_format(requested=None, accept=''):
+    """
+    Response format from an explicit `format` parameter, else from the
+    Accept header; plain clients get the original JSON-in-JSON response.
+    """
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}.")
+        return requested
+    for fmt in ('arrow', 'bdata'):
+        if MEDIA_TYPES[fmt] in (accept or ''):
+            return fmt
+    return 'json'
+
+def is_figure(fig_json):
+    """
+    Generators return an HTML message instead of a figure when there is
+    no data; those are always sent in the default format.
+    """
+    return fig_json.lstrip().startswith('{')
+
+def decode_typed_array(value):
+    """
+    ndarray from a Plotly typed-array dict ({"dtype", "bdata", "shape"}) or
+    a plain list; None for anything non-numeric.
+    """
+    if isinstance(value, dict) and 'bdata' in value:
+        array = np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype'])
+        if 'shape' in value:
+            array = array.reshape([int(n) for n in str(value['shape']).split(',')])
+        return array
+    if isinstance(value, list):
+        try:
+            array = np.asarray(value)
+            if array.dtype.kind not in 'iuf':
+                array = array.astype(float)
+        except (TypeError, ValueError):
+            return None
+        return array if array.dtype.kind in 'iu' or not np.isnan(array).all() else None
+    return None
+
+def encode_typed_array(array):
+    value = {'dtype': array.dtype.str[1:], 'bdata': base64.b64encode(array.tobytes()).decode('ascii')}
+    if array.ndim > 1:
+        value['shape'] = ', '.join(str(n) for n in array.shape)
+    return value
+
+def compact_array(array):
+    """
+    Smallest dtype that represents `array` within FLOAT32_SPAN_TOL.
+    """
+    if array.dtype.kind == 'f':
+        finite = array[np.isfinite(array)]
+        if array.dtype != np.float32 and finite.size:
+            with np.errstate(over='ignore'):
+                error = np.abs(finite.astype(np.float32) - finite).max()
+            if error <= FLOAT32_SPAN_TOL * (finite.max() - finite.min()):
+                return array.astype(np.float32)
+        return array
+    if array.dtype.kind in 'iu':
+        for dtype in INT_DTYPES:
+            info = np.iinfo(dtype)
+            if array.size == 0 or (array.min() >= info.min and array.max() <= info.max):
+                return array.astype(dtype)
+        return array.astype(np.float64)
+    return array
+
+def collapse_axes(trace, arrays):
+    """
+    Surfaces accept 1-D x/y; a meshgrid's repeated rows or columns are
+    dropped.
+    """
+    if trace.get('type') != 'surface':
+        return
+    x, y = arrays.get('x'), arrays.get('y')
+    if x is not None and x.ndim == 2 and (x == x[:1]).all():
+        arrays['x'] = x[0]
+    if y is not None and y.ndim == 2 and (y == y[:, :1]).all():
+        arrays['y'] = y[:, 0]
+
+def split_figure(fig_json):
+    """
+    The figure without its trace arrays, and the compacted arrays keyed by
+    (trace index, attribute).
+    """
+    figure = json.loads(fig_json)
+    arrays = {}
+    for i, trace in enumerate(figure.get('data', [])):
+        trace_arrays = {}
+        for key in ARRAY_KEYS:
+            array = decode_typed_array(trace.get(key))
+            if array is not None:
+                trace_arrays[key] = array
+        collapse_axes(trace, trace_arrays)
+        for key, array in trace_arrays.items():
+            del trace[key]
+            arrays[(i, key)] = compact_array(array)
+    return figure, arrays
+
+def to_bdata(fig_json):
+    """
+    The figure as a JSON object (not a JSON string) with every trace array
+    as a base64 typed array, float32 where lossless enough.
+    """
+    figure, arrays = split_figure(fig_json)
+    for (i, key), array in arrays.items():
+        figure['data'][i][key] = encode_typed_array(array)
+    return json.dumps(figure, separators=(',', ':'))
+
+def to_arrow(fig_json):
+    """
+    Arrow IPC stream with one column per trace array, named "<trace>.<attr>"
+    and holding the flattened values with their shape in the field
+    metadata. The rest of the figure is JSON in the schema metadata.
+    """
+    import pyarrow as pa
+    figure, arrays = split_figure(fig_json)
+    fields, columns = [], []
+    for (i, key), array in arrays.items():
+        values = pa.array(array.ravel())
+        fields.append(pa.field(f'{i}.{key}', pa.list_(values.type),
+                               metadata={'shape': ','.join(str(n) for n in array.shape)}))
+        columns.append(pa.ListArray.from_arrays(pa.array([0, len(values)], pa.int32()), values))
+    schema = pa.schema(fields, metadata={'figure': json.dumps(figure, separators=(',', ':'))})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+    return sink.getvalue().to_pybytes()
+
+def from_arrow(payload):
+    """
+    Plotly figure dict rebuilt from a to_arrow payload.
+    """
+    import pyarrow as pa
+    table = pa.ipc.open_stream(payload).read_all()
+    figure = json.loads(table.schema.metadata[b'figure'])
+    for field in table.schema:
+        i, key = field.name.split('.', 1)
+        shape = [int(n) for n in field.metadata[b'shape'].decode().split(',')]
+        values = table.column(field.name).chunk(0).values.to_numpy(zero_copy_only=False)
+        figure['data'][int(i)][key] = values.reshape(shape)
+    return figure
+
+ENCODERS = {
+    'bdata': to_bdata,
+    'arrow': to_arrow,
+}
+
+def encode_payload(fig_json, fmt):
+    return ENCODERS[fmt](fig_json)
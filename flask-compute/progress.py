@@ -0,0 +1,22 @@
+import contextvars
+from contextlib import contextmanager
+
+_reporter = contextvars.ContextVar('progress_reporter', default=None)
+
+def report(stage, done=None, total=None):
+    """
+    Progress of the current computation, e.g. report("solving", 12, 40)
+    after 12 of 40 expiries. A no-op unless the caller is inside
+    reporting(), so graph code can call it unconditionally.
+    """
+    callback = _reporter.get()
+    if callback is not None:
+        callback({'stage': stage, 'done': done, 'total': total})
+
+@contextmanager
+def reporting(callback):
+    token = _reporter.set(callback)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
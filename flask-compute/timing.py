@@ -0,0 +1,152 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Fraction of requests traced. Untraced requests skip span bookkeeping
+# entirely and are left out of the histograms.
+TIMING_SAMPLE_RATE = float(os.getenv('TIMING_SAMPLE_RATE', 1.0))
+# Upper bounds, in seconds, of the latency histogram buckets.
+HISTOGRAM_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_trace = contextvars.ContextVar('timing_trace', default=None)
+
+class Trace:
+    """
+    Total seconds per span name for one request, in first-seen order.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+def sampled(sample_rate=TIMING_SAMPLE_RATE):
+    return sample_rate >= 1 or random.random() < sample_rate
+
+def start_trace(sample=True):
+    """
+    Begin a trace in the current context if `sample` holds. Returns the
+    token for end_trace().
+    """
+    return _trace.set(Trace() if sample else None)
+
+def end_trace(token):
+    trace = _trace.get()
+    _trace.reset(token)
+    return trace
+
+@contextmanager
+def tracing(sample=True):
+    token = start_trace(sample)
+    try:
+        yield _trace.get()
+    finally:
+        end_trace(token)
+
+def current():
+    return _trace.get()
+
+class span:
+    """
+    Time a block into the current trace under `name`:
+
+        with span("solve"):
+            ...
+
+    Costs one context variable lookup when the request is not traced.
+    """
+    __slots__ = ('name', 'trace', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.trace = _trace.get()
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(self.name, time.perf_counter() - self.started)
+        return False
+
+def add(name, seconds):
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+def merge(spans):
+    """
+    Fold spans recorded elsewhere, e.g. in a worker process, into the
+    current trace.
+    """
+    trace = _trace.get()
+    if trace is not None and spans:
+        for name, seconds in spans.items():
+            trace.add(name, seconds)
+
+def server_timing(trace):
+    """
+    Server-Timing header value: "db;dur=12.3, solve;dur=40.1, ...".
+    """
+    return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in trace.spans.items())
+
+class Histograms:
+    """
+    Cumulative latency histograms keyed by a pair of label values, by
+    default (stage, graph type), rendered in the Prometheus text format.
+    """
+    def __init__(self, buckets=HISTOGRAM_BUCKETS, name='compute_stage_seconds', labels=('stage', 'graph_type'),
+                 description='Time spent per stage of graph requests.'):
+        self.buckets = buckets
+        self.name = name
+        self.labels = labels
+        self.description = description
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, graph_type, seconds):
+        with self._lock:
+            series = self._series.get((stage, graph_type))
+            if series is None:
+                series = self._series[(stage, graph_type)] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def observe_trace(self, trace, graph_type):
+        for stage, seconds in trace.spans.items():
+            self.observe(stage, graph_type, seconds)
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            for (stage, graph_type), (counts, total, count) in series:
+                labels = f'{self.labels[0]}="{stage}",{self.labels[1]}="{graph_type}"'
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound:g}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'{self.name}_sum{{{labels}}} {total:.6f}')
+                lines.append(f'{self.name}_count{{{labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+histograms = Histograms()
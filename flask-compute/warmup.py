@@ -0,0 +1,165 @@
+import importlib
+import logging
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+from graphs import GRAPH_TYPES, GREEK_GRAPH_TYPES
+
+# Graph types to warm at start-up, e.g. "IVMap,USFixedIncomeYield"; empty
+# to skip warm-up and report ready at once.
+WARMUP_GRAPH_TYPES = os.getenv('WARMUP_GRAPH_TYPES', ','.join(GRAPH_TYPES))
+# Run each graph's numeric code and Plotly serialization on a tiny
+# synthetic input, so first-call costs (validators, ufunc dispatch, spline
+# setup) are paid before the first request.
+WARMUP_SYNTHETIC = os.getenv('WARMUP_SYNTHETIC', '1') != '0'
+
+COMMON_MODULES = ('numpy', 'pandas', 'sqlalchemy', 'plotly.graph_objects', 'pyarrow')
+GRAPH_MODULES = {
+    'IVMap': ('scipy.interpolate', 'scipy.spatial', 'IVSurface.IVmap'),
+    'OrderFlowCanyon': ('databento', 'OrderFlowCanyon.main'),
+    'USFixedIncomeYield': ('YieldCurve.main',),
+}
+GRAPH_MODULES.update({graph_type: GRAPH_MODULES['IVMap'] for graph_type in GREEK_GRAPH_TYPES})
+
+logger = logging.getLogger(__name__)
+
+_state = {'ready': False, 'started': None, 'seconds': None, 'graph_types': [],
+          'imports': {}, 'steps': {}, 'errors': {}}
+_lock = threading.Lock()
+
+def parse_graph_types(spec):
+    graph_types = [name.strip() for name in spec.split(',') if name.strip()]
+    unknown = set(graph_types) - set(GRAPH_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown graph types in WARMUP_GRAPH_TYPES: {sorted(unknown)}")
+    return graph_types
+
+def _record(section, name, seconds=None, error=None):
+    with _lock:
+        if error is not None:
+            _state['errors'][name] = error
+        else:
+            _state[section][name] = round(seconds, 4)
+
+def timed(section, name, fn):
+    started = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        logger.warning("Warm-up %s failed: %s", name, e)
+        _record(section, name, error=f"{type(e).__name__}: {e}")
+        return False
+    _record(section, name, time.perf_counter() - started)
+    return True
+
+def warm_imports(graph_types):
+    """
+    Import every module the graph types need, timing each. Modules are
+    imported in order, so a package's cost is charged to the first module
+    that pulls it in.
+    """
+    modules = list(COMMON_MODULES)
+    for graph_type in graph_types:
+        modules += [name for name in GRAPH_MODULES[graph_type] if name not in modules]
+    for name in modules:
+        timed('imports', name, lambda: importlib.import_module(name))
+
+def warm_database():
+    from sqlalchemy import text
+    from db import read_connection
+    with read_connection() as conn:
+        conn.execute(text("SELECT 1"))
+
+def warm_rate_curve():
+    from IVSurface.RateCurve import get_rate_curve
+    get_rate_curve()
+
+def warm_iv_map():
+    from IVSurface.BSMCompute import black_scholes_batch, implied_vol_batch
+    from IVSurface.IVmap import grid_surface, surface_figure_json
+    T = np.repeat(np.linspace(0.05, 1.0, 5), 20)
+    K = np.tile(np.linspace(80.0, 120.0, 20), 5)
+    is_call = K >= 100.0
+    sigma = 0.2 + 0.5 * np.log(K / 100.0) ** 2
+    price = black_scholes_batch(100.0, K, T, 0.04, sigma, is_call)[0]
+    ivs = implied_vol_batch(price, 100.0, K, T, r=0.04, is_call=is_call)
+    surface_figure_json("WARMUP", *grid_surface(ivs, K / 100.0, T, size=10))
+
+def warm_greek_surface():
+    from IVSurface.BSMCompute import bsm_greeks
+    from IVSurface.IVmap import grid_surface, surface_figure_json
+    T = np.repeat(np.linspace(0.05, 1.0, 5), 20)
+    K = np.tile(np.linspace(80.0, 120.0, 20), 5)
+    delta = bsm_greeks(100.0, K, T, 0.04, 0.2, True)["delta"]
+    surface_figure_json("WARMUP", *grid_surface(delta, 100.0 / K, T, size=10, method="delaunay"), quantity="Delta")
+
+def warm_order_flow():
+    from OrderFlowCanyon.downsample import bucket_orderbook
+    from OrderFlowCanyon.main import order_flow_figure_json
+    from OrderFlowCanyon.utils import DEPTH, level_columns
+    rows = 200
+    index = pd.date_range("2024-01-02 14:30", periods=rows, freq="s", tz="UTC", name="ts_recv")
+    levels = np.arange(DEPTH) * 0.01
+    frame = pd.DataFrame(index=index)
+    for field, values in (('ask_px', 100.01 + levels), ('bid_px', 99.99 - levels),
+                          ('ask_sz', np.full(DEPTH, 100)), ('bid_sz', np.full(DEPTH, 100))):
+        for column, value in zip(level_columns(field), values):
+            frame[column] = value
+    book = bucket_orderbook([frame], index[0], index[-1] + pd.Timedelta(seconds=1), resolution=20)
+    order_flow_figure_json("WARMUP", *book)
+
+def warm_yield_curve():
+    from YieldCurve.main import yield_curve_figure_json
+    maturities = np.array([1, 3, 6, 12, 24, 60, 120, 360])
+    dates = pd.date_range("2024-01-02", periods=5).strftime("%Y-%m-%d").to_numpy()
+    yield_curve_figure_json(maturities, dates, np.linspace(4.0, 5.0, 40).reshape(5, 8))
+
+SYNTHETIC = {
+    'IVMap': warm_iv_map,
+    'OrderFlowCanyon': warm_order_flow,
+    'USFixedIncomeYield': warm_yield_curve,
+}
+SYNTHETIC.update({graph_type: warm_greek_surface for graph_type in GREEK_GRAPH_TYPES})
+
+def run_warmup(graph_types=WARMUP_GRAPH_TYPES, database=True, synthetic=WARMUP_SYNTHETIC, pool=None):
+    """
+    Imports, database connection and synthetic computations for
+    `graph_types`, then marks the process ready. When `pool` is a process
+    pool, the synthetic runs happen in its workers instead of here.
+    Failures are recorded in status() and do not hold back readiness.
+    """
+    if isinstance(graph_types, str):
+        graph_types = parse_graph_types(graph_types)
+    started = time.perf_counter()
+    with _lock:
+        _state.update(ready=False, started=time.time(), graph_types=list(graph_types))
+    if graph_types:
+        warm_imports(graph_types)
+        if database:
+            timed('steps', 'database', warm_database)
+            if 'IVMap' in graph_types or set(graph_types) & set(GREEK_GRAPH_TYPES):
+                timed('steps', 'rate_curve', warm_rate_curve)
+        if pool is not None:
+            timed('steps', 'compute_pool', pool.warm_up)
+        if synthetic and (pool is None or pool.workers == 0):
+            for graph_type in graph_types:
+                timed('steps', graph_type, SYNTHETIC[graph_type])
+    with _lock:
+        _state.update(ready=True, seconds=round(time.perf_counter() - started, 4))
+    logger.info("Warm-up done in %ss for %s", _state['seconds'], ', '.join(graph_types) or 'no graph types')
+    return status()
+
+def start_warmup(**kwargs):
+    thread = threading.Thread(target=run_warmup, kwargs=kwargs, name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+def is_ready():
+    return _state['ready']
+
+def status():
+    with _lock:
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in _state.items()}
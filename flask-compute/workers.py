@@ -0,0 +1,221 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from graphs import GRAPH_TYPES, GREEK_GRAPH_TYPES, generate_graph
+from progress import reporting
+import timing
+
+# 0 runs graphs on a thread pool in the web process (tests, local debugging).
+COMPUTE_WORKERS = int(os.getenv('COMPUTE_WORKERS', os.cpu_count() or 1))
+COMPUTE_TIMEOUT = float(os.getenv('COMPUTE_TIMEOUT', 60))
+# Graphs of one type computed at once, e.g. "IVMap=2,OrderFlowCanyon=1".
+# Types not listed may use every worker. The Greek surfaces solve the same
+# chains as IVMap, so by default they are capped like it.
+COMPUTE_LIMITS = os.getenv('COMPUTE_LIMITS', ','.join(
+    f'{graph_type}=2' for graph_type in ('IVMap', 'OrderFlowCanyon') + tuple(GREEK_GRAPH_TYPES)))
+
+logger = logging.getLogger(__name__)
+
+class ComputeTimeout(TimeoutError):
+    pass
+
+def parse_limits(spec, workers):
+    limits = {graph_type: max(1, workers) for graph_type in GRAPH_TYPES}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        graph_type, _, value = item.partition('=')
+        if graph_type.strip() not in limits:
+            raise ValueError(f"Unknown graph type in COMPUTE_LIMITS: {graph_type}")
+        limits[graph_type.strip()] = max(1, int(value))
+    return limits
+
+# Set in each worker process by warm_worker.
+_progress_queue = None
+
+def warm_worker(progress_queue=None):
+    """
+    Process pool initializer: drop the database connections inherited from
+    the parent across fork, then warm up the configured graph types (see
+    warmup.py) so the first request on this worker does not pay for them.
+    """
+    global _progress_queue
+    _progress_queue = progress_queue
+    from db import dispose_engines
+    from warmup import run_warmup
+    dispose_engines()
+    run_warmup()
+
+def run_task(key, fn, graph_type, parameters, progress_queue=None, sample=False):
+    """
+    fn(graph_type, parameters) with progress.report() updates sent back to
+    the pool as (key, update). All of its reads share one database
+    connection.
+    Returns a tuple: (result, timing spans or None when not sampled)
+    """
+    from db import request_scope
+    progress_queue = progress_queue or _progress_queue
+    callback = (lambda update: progress_queue.put((key, update))) if progress_queue is not None else None
+    with reporting(callback), timing.tracing(sample) as trace, request_scope():
+        result = fn(graph_type, parameters)
+    return result, trace.spans if trace is not None else None
+
+class ComputePool:
+    """
+    Runs graph generation off the request thread.
+
+    Identical requests (same key) in flight at the same time share one
+    computation. Each graph type holds at most `limits[graph_type]` workers,
+    so slow IV surfaces cannot starve the cheap yield curves. A request that
+    waits more than `timeout` seconds gets ComputeTimeout; the computation
+    itself keeps running and still completes for the others waiting on it.
+    """
+    def __init__(self, workers=COMPUTE_WORKERS, timeout=COMPUTE_TIMEOUT, limits=COMPUTE_LIMITS):
+        self.workers = workers
+        self.timeout = timeout
+        self.limits = parse_limits(limits, workers) if isinstance(limits, str) else dict(limits)
+        self._slots = {graph_type: threading.BoundedSemaphore(n) for graph_type, n in self.limits.items()}
+        self._inflight = {}
+        self._progress = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._queue = None
+
+    @property
+    def executor(self):
+        # Created on first use so forking web servers start it in each
+        # worker rather than sharing one across fork.
+        with self._lock:
+            context = multiprocessing.get_context()
+            if self._queue is None:
+                self._queue = context.Queue() if self.workers > 0 else queue.Queue()
+                threading.Thread(target=self._listen, args=(self._queue,), daemon=True).start()
+            if self._executor is None:
+                if self.workers > 0:
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=context,
+                                                         initializer=warm_worker, initargs=(self._queue,))
+                else:
+                    self._executor = ThreadPoolExecutor(max(1, max(self.limits.values())))
+            return self._executor
+
+    def _listen(self, progress_queue):
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            key, update = item
+            with self._lock:
+                if key in self._inflight:
+                    self._progress[key] = update
+
+    def progress(self, key):
+        """
+        Latest progress.report() update of the computation for `key`, or
+        None if it has not reported or is no longer running.
+        """
+        with self._lock:
+            return self._progress.get(key)
+
+    def _reset(self, executor):
+        """
+        Drop a pool whose worker died (e.g. killed for memory) so the next
+        request starts a fresh one.
+        """
+        if executor is None:
+            return
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _start(self, key, graph_type, parameters, fn, timeout):
+        """
+        Future for `key`, submitting it once a slot for `graph_type` frees up.
+        Returns a tuple: (future, shared)
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, True
+        slot = self._slots[graph_type]
+        if not slot.acquire(timeout=timeout):
+            raise ComputeTimeout(f"No {graph_type} worker free within {timeout:g}s")
+        executor = self.executor
+        with self._lock:
+            # Another request may have started the same key while we queued.
+            future = self._inflight.get(key)
+            if future is not None:
+                slot.release()
+                return future, True
+            # Threads are handed the queue; processes got it at start-up.
+            task_queue = None if self.workers > 0 else self._queue
+            try:
+                future = executor.submit(run_task, key, fn, graph_type, parameters, task_queue,
+                                         timing.current() is not None)
+            except BaseException:
+                slot.release()
+                raise
+            self._inflight[key] = future
+
+        def done(_):
+            slot.release()
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+                    self._progress.pop(key, None)
+        future.add_done_callback(done)
+        return future, False
+
+    def run(self, key, graph_type, parameters, fn=generate_graph, timeout=None):
+        """
+        Result of fn(graph_type, parameters), computed in the pool. `fn`
+        must be importable by name when the pool uses processes. The
+        caller's scoped database connection goes back to the pool while it
+        waits.
+        """
+        from db import release_connection
+        release_connection()
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        try:
+            future, shared = self._start(key, graph_type, parameters, fn, timeout)
+        except BrokenProcessPool:
+            self._reset(self._executor)
+            raise
+        remaining = timeout - (time.perf_counter() - started)
+        try:
+            with timing.span("compute"):
+                result, spans = future.result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            raise ComputeTimeout(f"{graph_type} took longer than {timeout:g}s") from None
+        except BrokenProcessPool:
+            self._reset(self._executor)
+            raise
+        if shared:
+            logger.info("Shared in-flight %s computation", graph_type)
+        timing.merge(spans)
+        return result
+
+    def warm_up(self):
+        """
+        Start every worker and wait for their warm-up.
+        Returns the number of distinct workers that answered.
+        """
+        executor = self.executor
+        futures = [executor.submit(os.getpid) for _ in range(max(self.workers, 1))]
+        return len({future.result() for future in futures})
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            progress_queue, self._queue = self._queue, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if progress_queue is not None:
+            progress_queue.put(None)
+
+compute_pool = ComputePool()